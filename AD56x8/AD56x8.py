@@ -24,10 +24,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
 from ctypes import Structure, Union, c_uint
 
-import Adafruit_GPIO as GPIO
-import Adafruit_GPIO.SPI as SPI
+from AD56x8.backend import MSBFIRST
+from AD56x8.bitbang import FastBitBang
 
 '''
 AD56x8 Register, Commands and Modes Definitions
@@ -41,6 +45,12 @@ Register Structures are written LSB first here for convenience.
 
 MAX_CHANNELS = 8
 
+# Maximum SCLK frequency of the serial interface
+MAX_CLOCK_HZ = 50000000
+
+# SPI clock used when neither the caller nor the backend sets one
+DEFAULT_CLOCK_HZ = 5000000
+
 
 # 32 bit structure for quickly making a list of bytes for writes
 class SPI32(Structure):
@@ -158,6 +168,19 @@ IREF_MODE = {'ON': 0b1,
 LDAC_MODE = {'SW': 0b1,
              'HW': 0b0}
 
+# Every frame carries a 20 bit DATA field below the 4 bit ADDR and CMD fields
+FRAME_DATA_BITS = 20
+FRAME_DATA_MASK = (1 << FRAME_DATA_BITS) - 1
+
+# Precomputed CMD and ADDR fields of a frame, indexed [command][address]
+FRAME_PREFIX = tuple(tuple((command << 24) | (address << FRAME_DATA_BITS)
+                           for address in range(16))
+                     for command in range(16))
+
+# Channel name or number to ADDR field lookup
+CHANNEL_ADDRESS = dict(DAC_CHANNELS)
+CHANNEL_ADDRESS.update((addr, addr) for addr in DAC_CHANNELS.values())
+
 AD56x8_MODEL_PARAMS = {'AD5628-1':
                         {'DATA_WIDTH': 12, 'VREF': 2.5, 'PU_DAC_MULT': 0.0},
                        'AD5628-3':
@@ -172,9 +195,25 @@ AD56x8_MODEL_PARAMS = {'AD5628-1':
                         {'DATA_WIDTH': 16, 'VREF': 5.0, 'PU_DAC_MULT': 0.5}}
 
 
+def encode_frame(command, address=0, data=0):
+    """Encode a 32 bit frame for the AD56x8 input shift register.
+
+    Args:
+        command (const): command constant
+        address (int): ADDR field, 0x0 thru 0x7 or 0xF for all channels
+        data (int): 20 bit DATA field, already shifted into position
+
+    Returns:
+        int: frame value, bit-identical to the register structures above
+    """
+
+    return FRAME_PREFIX[command][address] | (data & FRAME_DATA_MASK)
+
+
 class AD56x8(object):
 
-    def __init__(self, dac_model, clk=None, cs=None, do=None, spi=None, gpio=None):
+    def __init__(self, dac_model, clk=None, cs=None, do=None, spi=None, gpio=None,
+                 shadow=False, clock_hz=None):
         """The constructor for the AD56x8 class.
 
         Args:
@@ -184,14 +223,27 @@ class AD56x8(object):
             Adafruit-GPIO Specific Args
             clk (int): DAC value to selected channel
             cs (str, int): Platform specific pin selection for CS
-            do (str, int): Platform specific pin selection for DO
+            do (str, int, list): Platform specific pin selection for DO, or
+                a list of DO pins of DACs sharing CLK and CS
             spi (str, int): Platform specific pin selection for CS
             gpio (str, int): Platform specific selection for platform GPIO
 
+            shadow (bool): keep a shadow copy of the register state and skip
+                frames which would not change it
+            clock_hz (int): SPI clock, up to the MAX_CLOCK_HZ limit of the part;
+                by default the backend's clock_hz is kept if it has one,
+                otherwise DEFAULT_CLOCK_HZ is set
+
         Attributes:
             DATA_WIDTH (int): Width of DAC value in bits
             VREF (float): Internal VREF voltage
             PU_DAC_MULT (float): Default power-up DAC output value
+            shadow (ShadowRegisters): shadow register state and counters of
+                sent and elided frames, None unless enabled
+            metrics (Metrics): frame, error and latency counters, None
+                unless enabled by enable_metrics()
+            ramps (RampEngine): background slew-limited ramps, None unless
+                enabled by enable_ramps()
 
         Attributes are set for the specific DAC model upon construction, which
         are useful for calculating the DAC value to write for a desired
@@ -220,18 +272,83 @@ class AD56x8(object):
         if spi is not None:
             self._spi = spi
         elif clk is not None and cs is not None and do is not None:
-            # Default to platform GPIO if not provided.
+            # Default to platform GPIO if not provided; Adafruit_GPIO is
+            # only imported here, so custom backends do not need it
             if gpio is None:
+                import Adafruit_GPIO as GPIO
                 gpio = GPIO.get_platform_gpio()
-            self._spi = SPI.BitBang(gpio, clk, do, None, cs)
+            self._spi = FastBitBang(gpio, clk, cs, do)
         else:
             raise ValueError('Must specify either hardware spi or clk, \
                                 cs, and do for software SPI!')
 
+        # Shift applied to DAC values to reach the MSB end of the DATA field
+        self._data_shift = FRAME_DATA_BITS - self.DATA_WIDTH
+
+        # Frames collected by an open batch(), None when writing directly
+        self._batch = None
+
+        # Values staged for the next flush() and values last flushed, by ADDR
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flushed = {}
+
+        # LDAC register as last written, all channels HW at power-up
+        self._ldac_mask = 0
+
+        # Metrics collector, None unless enable_metrics() was called
+        self.metrics = None
+
+        # Ramp service, None unless enable_ramps() was called
+        self.ramps = None
+
+        self.shadow = None
+        if shadow:
+            from AD56x8.shadow import ShadowRegisters
+            self.shadow = ShadowRegisters()
+
         # SPI Configurations
-        self._spi.set_clock_hz(5000000)
+        if clock_hz is None:
+            # Keep a clock the backend was already configured with
+            if not isinstance(getattr(self._spi, 'clock_hz', None),
+                              (int, float)):
+                self._spi.set_clock_hz(DEFAULT_CLOCK_HZ)
+        elif not 0 < clock_hz <= MAX_CLOCK_HZ:
+            raise ValueError('{}: SPI clock must be at most {} Hz'
+                             .format(self.device, MAX_CLOCK_HZ))
+        else:
+            self._spi.set_clock_hz(clock_hz)
         self._spi.set_mode(0)
-        self._spi.set_bit_order(SPI.MSBFIRST)
+        self._spi.set_bit_order(MSBFIRST)
+
+    def _channel_address(self, channel, error):
+        """Resolve a channel name or number to its ADDR field.
+
+        Args:
+            channel (str, int): DAC Channel given either by:
+                Name (DAC_A thru DAC_H and ALL_DAC)
+                Integer in range(MAX_CHANNELS)
+            error (str): error prefix used when the channel is unknown
+        """
+
+        address = CHANNEL_ADDRESS.get(channel)
+        if address is None:
+            raise self._validation_error(
+                error, '{}: {}: Bad DAC channel selection'
+                .format(self.device, error))
+        return address
+
+    def _validation_error(self, error, message):
+        """Count a rejected command in the metrics and return its exception.
+
+        Args:
+            error (str): error category, e.g. 'LDAC Error'
+            message (str): exception message
+        """
+
+        if self.metrics is not None:
+            self.metrics.record_error(error)
+        return ValueError(message)
 
     def _Input_Reg_helper(self, command, channel, value):
         """Helper function to for handling setting an Input Register.
@@ -248,27 +365,20 @@ class AD56x8(object):
         output voltage.
         """
 
-        i = Input()
-        if command == CMD_WRITE_INPUT_REG_N or \
-                command == CMD_WRITE_INPUT_RE_N_UPDATE_ALL:
-            i.reg.CMD = command
-        else:
-            raise ValueError('{}: Input Reg Error: Bad command selection'
-                             .format(self.device))
+        if command != CMD_WRITE_INPUT_REG_N and \
+                command != CMD_WRITE_INPUT_RE_N_UPDATE_ALL:
+            raise self._validation_error(
+                'Input Reg Error', '{}: Input Reg Error: Bad command selection'
+                .format(self.device))
 
         # Allow use of the channel name OR number for selection
-        if channel in DAC_CHANNELS:
-            i.reg.ADDR = DAC_CHANNELS[channel]
-        elif channel in DAC_CHANNELS.values():
-            i.reg.ADDR = channel
-        else:
-            raise ValueError('{}: Input Reg Error: Bad DAC channel selection'
-                             .format(self.device))
+        address = self._channel_address(channel, 'Input Reg Error')
+        if self._flushed:
+            self._forget_flushed((address,))
 
         # Shift data up to MSB end of the DATA field
-        i.reg.DATA = value << (20 - self.DATA_WIDTH)
-
-        self._write32(i.value)
+        self._write32(FRAME_PREFIX[command][address] |
+                      ((value << self._data_shift) & FRAME_DATA_MASK))
 
     def write_to_Input_Reg(self, channel, value):
         """Set Input Register of specified channel.
@@ -299,19 +409,10 @@ class AD56x8(object):
         output voltage.
         """
 
-        # Input mode register structure instance, load with command
-        i = Input()
-        i.reg.CMD = CMD_UPDATE_DAC_REG_N
-
         # Allow use of the channel name or number for selection
-        if channel in DAC_CHANNELS:
-            i.reg.ADDR = DAC_CHANNELS[channel]
-        elif channel in DAC_CHANNELS.values():
-            i.reg.ADDR = channel
-        else:
-            raise ValueError('{}: Input Reg Error: Bad DAC channel selection'
-                             .format(self.device))
-        self._write32(i.value)
+        address = self._channel_address(channel, 'Input Reg Error')
+
+        self._write32(FRAME_PREFIX[CMD_UPDATE_DAC_REG_N][address])
 
     def write_to_Input_Reg_update_all(self, channel, value):
         """Update all DAC registers from Input Registers
@@ -329,8 +430,146 @@ class AD56x8(object):
 
         self._Input_Reg_helper(CMD_WRITE_INPUT_RE_N_UPDATE_ALL, channel, value)
 
-    def power_down_mode(self, mode, channel):
-        """Set power down mode for DAC.
+    def write_to_Input_Regs_update_all(self, channels, values):
+        """Set Input Registers of several channels, then update all DAC
+        registers so every output changes together.
+
+        The last channel is written with the update all command, the others
+        with a plain Input Register write, and all frames go out in one
+        bulk transfer.
+
+        Args:
+            channels (sequence): DAC Channels given either by:
+                Name (DAC_A thru DAC_H and ALL_DAC)
+                Integer in range(MAX_CHANNELS)
+            values (sequence of int): DAC value for each channel
+        """
+
+        if len(channels) != len(values):
+            raise self._validation_error(
+                'Input Reg Error', '{}: Input Reg Error: {} values given for '
+                '{} channels'.format(self.device, len(values), len(channels)))
+        if not channels:
+            return
+
+        addresses = [self._channel_address(channel, 'Input Reg Error')
+                     for channel in channels]
+        self._forget_flushed(addresses)
+        self._Input_Regs_update_all_helper(addresses, values)
+
+    def _Input_Regs_update_all_helper(self, addresses, values):
+        """Helper function to write several Input Registers in one transfer,
+        updating all DAC registers with the last frame.
+
+        Args:
+            addresses (list of int): ADDR field of each channel
+            values (sequence of int): DAC value for each channel
+        """
+
+        shift = self._data_shift
+        prefixes = FRAME_PREFIX[CMD_WRITE_INPUT_REG_N]
+        frames = [prefixes[address] | ((value << shift) & FRAME_DATA_MASK)
+                  for address, value in zip(addresses, values)]
+        frames[-1] = FRAME_PREFIX[CMD_WRITE_INPUT_RE_N_UPDATE_ALL][addresses[-1]] | \
+            ((values[-1] << shift) & FRAME_DATA_MASK)
+
+        self._write_frame_list(frames)
+
+    def stage(self, channel, value):
+        """Stage a DAC value for the next flush(); the last value staged for
+        a channel wins. Safe to call from several threads.
+
+        Args:
+            channel (str, int): DAC Channel given either by:
+                Name (DAC_A thru DAC_H and ALL_DAC)
+                Integer in range(MAX_CHANNELS)
+            value (int): DAC value to selected channel
+        """
+
+        address = self._channel_address(channel, 'Input Reg Error')
+        with self._pending_lock:
+            if address == DAC_CHANNELS['ALL_DAC']:
+                for address in range(MAX_CHANNELS):
+                    self._pending[address] = value
+            else:
+                self._pending[address] = value
+
+    def flush(self):
+        """Write the staged values of channels which changed since they were
+        last flushed, and update all DAC registers with the final frame so
+        every output changes together.
+
+        Returns:
+            int: number of channels written
+        """
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+
+        flushed = self._flushed
+        changed = sorted(address for address, value in pending.items()
+                         if flushed.get(address) != value)
+        if not changed:
+            return 0
+
+        values = [pending[address] for address in changed]
+        try:
+            self._Input_Regs_update_all_helper(changed, values)
+        except Exception:
+            # Stage the values again, unless newer ones were staged since
+            with self._pending_lock:
+                pending.update(self._pending)
+                self._pending = pending
+            raise
+        flushed.update(zip(changed, values))
+        return len(changed)
+
+    def _forget_flushed(self, addresses):
+        """Drop flushed values overwritten by direct Input Register writes."""
+
+        if self._flushed:
+            for address in addresses:
+                if address == DAC_CHANNELS['ALL_DAC']:
+                    self._flushed.clear()
+                else:
+                    self._flushed.pop(address, None)
+
+    def _channel_mask(self, channel, mask, error):
+        """Resolve a channel selection to an 8 bit channel mask.
+
+        Args:
+            channel (str, int, iterable): DAC Channel given either by:
+                Name (DAC_A thru DAC_H, or ALL_DAC for every channel)
+                Integer in range(MAX_CHANNELS)
+                A list, tuple or set of names and/or integers
+            mask (int): channel bit mask, bit N selecting channel N; used
+                instead of channel
+            error (str): error prefix used when the selection is invalid
+        """
+
+        if mask is not None:
+            if channel is not None or not 0 <= mask <= 0xff:
+                raise self._validation_error(
+                    error, '{}: {}: Bad DAC channel mask'
+                    .format(self.device, error))
+            return mask
+
+        if isinstance(channel, (list, tuple, set, frozenset, range)):
+            channels = channel
+        else:
+            channels = (channel,)
+
+        mask = 0
+        for channel in channels:
+            address = self._channel_address(channel, error)
+            if address == DAC_CHANNELS['ALL_DAC']:
+                mask = 0xff
+            else:
+                mask |= 1 << address
+        return mask
+
+    def power_down_mode(self, mode, channel=None, mask=None):
+        """Set power down mode for one or more DAC channels in one frame.
 
         Args:
             mode (str): Power Mode:
@@ -338,32 +577,25 @@ class AD56x8(object):
                 '1K_GND': 1kOhm pulldown to GND
                 '100K_GND': 100kOhm pulldown to GND
                 'TRISTATE'
-            channel (str, int): DAC Channel given either by:
+            channel (str, int, iterable): DAC Channel given either by:
                 Name (DAC_A thru DAC_H and ALL_DAC)
                 Integer in range(MAX_CHANNELS)
+                A list, tuple or set of names and/or integers
+            mask (int): channel bit mask, used instead of channel
         """
 
-        # Power Down mode register structure instance, load with command
-        power_down_cmd = PowerDown()
-        power_down_cmd.reg.CMD = CMD_PWR_DOWN_UP_DAC
-
         # Allow use of the channel name or number for selection
-        if channel in DAC_CHANNELS:
-            power_down_cmd.reg.PD_CH_SEL = (1 << DAC_CHANNELS[channel]) & 0xff
-        elif channel in DAC_CHANNELS.values():
-            power_down_cmd.reg.PD_CH_SEL = (1 << channel) & 0xff
-        else:
-            raise ValueError('{self.device}: Input Reg Error: \
-                            Bad DAC channel selection'.format(self.device))
+        ch_sel = self._channel_mask(channel, mask, 'Input Reg Error')
 
         if mode not in PD_MODES:
-            raise ValueError('{}: Power Mode Error: Power down modes must be \
+            raise self._validation_error(
+                'Power Mode Error', '{}: Power Mode Error: Power down modes must be \
                              NORMAL, 1K/GND, 100K/GND or TRISTATE'
                              .format(self.device))
-        else:
-            power_down_cmd.reg.PD_MODE = PD_MODES[mode]
 
-        self._write32(power_down_cmd.value)
+        # PD_MODE sits above the 8 bit PD_CH_SEL field
+        self._write32(FRAME_PREFIX[CMD_PWR_DOWN_UP_DAC][0] |
+                      (PD_MODES[mode] << 8) | ch_sel)
 
     def clear_code_mode(self, mode):
         """Set clear code mode for DAC
@@ -376,60 +608,58 @@ class AD56x8(object):
                 'NOP': no operation
         """
 
-        # Clear Code register structure instance, load with command
-        clear_code_cmd = ClearCode()
-        clear_code_cmd.reg.CMD = CMD_LOAD_CLEAR_CODE_REG
-
         if mode not in CLEAR_CODES:
-            raise ValueError('{}: Clear Codes Error: Clear code must be \
+            raise self._validation_error(
+                'Clear Codes Error', '{}: Clear Codes Error: Clear code must be \
                              0x0000, 0x8000 or 0xFFFF'
                              .format(self.device))
 
-        clear_code_cmd.reg.CC_MODE = CLEAR_CODES[mode]
-
-        self._write32(clear_code_cmd.value)
+        self._write32(FRAME_PREFIX[CMD_LOAD_CLEAR_CODE_REG][0] |
+                      CLEAR_CODES[mode])
 
-    def LDAC_mode(self, mode, channel):
+    def LDAC_mode(self, mode, channel=None, mask=None):
         """Configure DAC to Load DAC Registers by command HW or SW command,
-        by channel
+        for one or more channels in one frame
+
+        The LDAC register holds the mode of every channel; channels not
+        selected keep the mode last set by this driver (HW after a reset).
 
         Args:
             mode (str): LDAC Mode:
                 'SW': Software Commanded Load of DAC Register
                 'HW': Hardware (/LDAC pin) Commanded Load of DAC Register
-            channel (str, int): DAC Channel given either by:
+            channel (str, int, iterable): DAC Channel given either by:
                 Name (DAC_A thru DAC_H and ALL_DAC)
                 Integer in range(MAX_CHANNELS)
+                A list, tuple or set of names and/or integers
+            mask (int): channel bit mask, used instead of channel
         """
 
-        # LDAC register structure instance, load with command
-        ldac_cmd = LDAC()
-        ldac_cmd.reg.CMD = CMD_LOAD_LDAC_REG
-
         if mode not in LDAC_MODE:
-            raise ValueError('{}: LDAC Error: LDAC mode must be HW or SW'
-                             .format(self.device))
+            raise self._validation_error(
+                'LDAC Error', '{}: LDAC Error: LDAC mode must be HW or SW'
+                .format(self.device))
+
+        # Allow use of the channel name or number for selection
+        selected = self._channel_mask(channel, mask, 'LDAC Error')
+
+        if LDAC_MODE[mode]:
+            self._ldac_mask |= selected
         else:
-            # Allow use of the channel name or number for selection
-            if channel in DAC_CHANNELS:
-                ldac_cmd.reg.LDAC_MODE_CH = \
-                    (LDAC_MODE[mode] << DAC_CHANNELS[channel]) & 0xff
-            elif channel in DAC_CHANNELS.values():
-                ldac_cmd.reg.LDAC_MODE_CH = (LDAC_MODE[mode] << channel) & 0xff
-            else:
-                raise ValueError('{}: LDAC Error: Bad DAC channel selection'
-                                 .format(self.device))
+            self._ldac_mask &= ~selected
 
-        self._write32(ldac_cmd.value)
+        self._write32(FRAME_PREFIX[CMD_LOAD_LDAC_REG][0] | self._ldac_mask)
 
     def reset(self):
-        """Reset device to power-up defaults."""
+        """Reset device to power-up defaults.
 
-        # Input register structure instance, load with reset command
-        i = Input()
-        i.reg.CMD = CMD_RESET
+        Shadow register state, if enabled, and flushed values are forgotten.
+        """
+
+        self._flushed.clear()
+        self._ldac_mask = 0
 
-        self._write32(i.value)
+        self._write32(FRAME_PREFIX[CMD_RESET][0])
 
     def internal_ref_mode(self, mode):
         """Configure internal reference mode register.
@@ -440,17 +670,296 @@ class AD56x8(object):
                 'OFF': Internal Reference Off
         """
 
-        # Reference Setup register structure instance, load with command
-        ref_setup_cmd = RefSetup()
-        ref_setup_cmd.reg.CMD = CMD_SETUP_INT_REF_REG
-
         if mode not in IREF_MODE:
-            raise ValueError('{}: IREF mode must be ON or OFF'
-                             .format(self.device))
+            raise self._validation_error(
+                'IREF Error', '{}: IREF mode must be ON or OFF'
+                .format(self.device))
+
+        self._write32(FRAME_PREFIX[CMD_SETUP_INT_REF_REG][0] |
+                      IREF_MODE[mode])
+
+    def enable_tracing(self, tracer, name=None):
+        """Record every frame written to the SPI bus in a FrameTracer.
+
+        Args:
+            tracer (FrameTracer): ring buffer receiving the frames
+            name (str): device name in the trace, defaults to the model
+        """
+
+        from AD56x8.trace import TracingBackend
+
+        self.disable_tracing()
+        device = tracer.register(name if name is not None else self.device)
+        self._spi = TracingBackend(self._spi, tracer, device)
+
+    def disable_tracing(self):
+        """Stop recording frames; the SPI write path is left unwrapped."""
+
+        from AD56x8.trace import TracingBackend
+
+        self._unwrap_spi(TracingBackend)
+
+    def enable_metrics(self, name=None):
+        """Count frames per command, channel writes, validation errors and
+        SPI write latency.
+
+        Args:
+            name (str): device label of the metrics, defaults to the model
+
+        Returns:
+            Metrics: the collector, also available as the metrics attribute
+        """
+
+        from AD56x8.metrics import Metrics, MetricsBackend
+
+        self.disable_metrics()
+        self.metrics = Metrics(name if name is not None else self.device)
+        self._spi = MetricsBackend(self._spi, self.metrics)
+        return self.metrics
+
+    def disable_metrics(self):
+        """Stop collecting metrics; the SPI write path is left unwrapped."""
+
+        from AD56x8.metrics import MetricsBackend
+
+        self._unwrap_spi(MetricsBackend)
+        self.metrics = None
+
+    def enable_ramps(self, slew, rate=1000.0, initial=None):
+        """Start a background service ramping outputs at a limited slew
+        rate, see the ramp module.
+
+        Args:
+            slew (float): default slew rate in codes per second
+            rate (float): updates per second while ramping
+            initial (dict, sequence): starting DAC value per channel, needed
+                unless the shadow knows the DAC registers
+
+        Returns:
+            RampEngine: the service, also available as the ramps attribute
+        """
+
+        from AD56x8.ramp import RampEngine
 
-        ref_setup_cmd.reg.IREF = IREF_MODE[mode]
+        self.disable_ramps()
+        self.ramps = RampEngine(self, slew, rate=rate, initial=initial)
+        return self.ramps
 
-        self._write32(ref_setup_cmd.value)
+    def disable_ramps(self):
+        """Cancel running ramps and stop the ramp service."""
+
+        if self.ramps is not None:
+            self.ramps.stop()
+            self.ramps = None
+
+    def ramp_to(self, targets, slew=None):
+        """Ramp channels to target DAC values without blocking.
+
+        Args:
+            targets (dict): target DAC value by channel name or number
+            slew (float): codes per second, defaults to the service's
+
+        Returns:
+            Future: completes when every channel reached its target
+        """
+
+        if self.ramps is None:
+            raise self._validation_error(
+                'Ramp Error', '{}: Ramp Error: Ramps are not enabled'
+                .format(self.device))
+        return self.ramps.ramp_to(targets, slew)
+
+    def _unwrap_spi(self, wrapper):
+        """Remove a wrapper backend of the given class from the SPI backend
+        chain, wherever it sits."""
+
+        parent, spi = None, self._spi
+        while not isinstance(spi, wrapper):
+            if not getattr(type(spi), 'wraps_spi', False):
+                return
+            parent, spi = spi, spi.spi
+        if parent is None:
+            self._spi = spi.spi
+        else:
+            parent.spi = spi.spi
+
+    @contextmanager
+    def batch(self):
+        """Collect the frames of every command issued inside the block and
+        submit them to the SPI bus in one bulk transfer on exit.
+
+        Batches nest; frames of an inner batch join the outermost one.
+
+        Example:
+            with dac.batch():
+                for ch in DAC_CH:
+                    dac.write_to_Input_Reg(ch, value)
+                dac.update_DAC_Reg('ALL_DAC')
+        """
+
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = bytearray()
+        try:
+            yield self
+        finally:
+            data, self._batch = self._batch, None
+            if data:
+                self._write_data(bytes(data))
+
+    def write_frames(self, frames):
+        """Write several 32 bit frames in one bulk transfer.
+
+        Args:
+            frames (iterable of int): encoded frames, see encode_frame()
+        """
+
+        frames = list(frames)
+        self._flushed.clear()
+        self._write_frame_list(frames)
+
+        # Keep the LDAC register state consistent, as write_buffer() does
+        for frame in reversed(frames):
+            command = (frame >> 24) & 0xF
+            if command == CMD_RESET:
+                self._ldac_mask = 0
+                break
+            if command == CMD_LOAD_LDAC_REG:
+                self._ldac_mask = frame & 0xFF
+                break
+
+    def write_buffer(self, data, commands=None, chunk=None):
+        """Write pre-encoded frames from any buffer-protocol object.
+
+        Bytes-like data and big-endian 32 bit arrays (e.g. NumPy '>u4', as
+        made by the vectorized module) are passed to the backend as slices
+        of the original buffer. Native little-endian 32 bit arrays are
+        byte swapped one chunk at a time. The frames bypass the shadow
+        registers, which are invalidated, and values last flushed are
+        forgotten.
+
+        Args:
+            data (buffer): C-contiguous big-endian frame bytes, or 32 bit
+                unsigned integer frames
+            commands (iterable of int): allowed command constants; the
+                whole buffer is checked before anything is written
+            chunk (int): frames per backend transfer, default all
+
+        Returns:
+            int: number of frames written
+        """
+
+        view = memoryview(data)
+        if not view.c_contiguous:
+            raise self._validation_error(
+                'Write Error', '{}: Write Error: Frame data must be '
+                'contiguous'.format(self.device))
+
+        swap = False
+        if view.itemsize == 4 and view.format[-1:] in 'IiLl':
+            order = view.format[0] if len(view.format) > 1 else '@'
+            if order in '@=':
+                swap = sys.byteorder == 'little'
+            else:
+                swap = order == '<'
+        elif view.itemsize != 1:
+            raise self._validation_error(
+                'Write Error', '{}: Write Error: Unsupported frame format {!r}'
+                .format(self.device, view.format))
+        view = view.cast('B')
+        if len(view) % 4:
+            raise self._validation_error(
+                'Write Error', '{}: Write Error: Frame data must be a multiple '
+                'of 4 bytes'.format(self.device))
+
+        # Command byte of every frame, copied without per-frame objects
+        head = 3 if swap else 0
+        command_bytes = bytes(view[head::4])
+        if commands is not None and \
+                command_bytes.translate(None, bytes(commands)):
+            raise self._validation_error(
+                'Write Error', '{}: Write Error: Frame command not allowed'
+                .format(self.device))
+
+        count = len(command_bytes)
+        size = 4 * (chunk or count or 1)
+        bulk = self._batch is not None or \
+            getattr(self._spi, 'write_frames', None) is not None
+        for offset in range(0, len(view), size):
+            piece = view[offset:offset + size]
+            if swap:
+                frames = array('I' if array('I').itemsize == 4 else 'L')
+                frames.frombytes(piece)
+                frames.byteswap()
+                piece = frames.tobytes()
+            elif not bulk:
+                piece = bytes(piece)
+            if self._batch is not None:
+                self._batch += piece
+            else:
+                self._write_data(piece)
+
+        # Keep the LDAC register and shadow state consistent
+        ldac = command_bytes.rfind(bytes([CMD_LOAD_LDAC_REG]))
+        if command_bytes.rfind(bytes([CMD_RESET])) > ldac:
+            self._ldac_mask = 0
+        elif ldac >= 0:
+            self._ldac_mask = view[4 * ldac + (0 if swap else 3)]
+        self._flushed.clear()
+        if self.shadow is not None:
+            self.shadow.invalidate()
+        return count
+
+    def _write_frame_list(self, frames):
+        """Helper function to write frames through the shadow registers and
+        any open batch.
+
+        Args:
+            frames (iterable of int): encoded frames
+        """
+
+        if self.shadow is not None:
+            apply = self.shadow.apply
+            frames = [frame for frame in frames if apply(frame)]
+
+        data = b''.join([frame.to_bytes(4, 'big') for frame in frames])
+        if self._batch is not None:
+            self._batch += data
+        elif data:
+            self._write_data(data)
+
+    def _write_data(self, data):
+        """Helper function to write whole frames to the SPI bus.
+
+        SYNC must return high after every 32 bits for the DAC to latch a
+        frame. Backends providing write_frames(data) toggle CS between each
+        4 byte frame themselves within a single transfer; any other backend
+        gets one write() per frame.
+
+        Args:
+            data (bytes): concatenated big-endian 32 bit frames
+        """
+
+        write_frames = getattr(self._spi, 'write_frames', None)
+        try:
+            if write_frames is not None:
+                write_frames(data)
+            else:
+                write = self._spi.write
+                for offset in range(0, len(data), 4):
+                    write(data[offset:offset + 4])
+        except Exception:
+            self._write_failed()
+            raise
+
+    def _write_failed(self):
+        """Forget the shadow state after a failed write; the shadow was
+        updated before the frames went out, and some may never have."""
+
+        if self.shadow is not None:
+            self.shadow.invalidate()
 
     def _write32(self, value):
         """Helper function to write 32 bits to the SPI bus.
@@ -459,9 +968,15 @@ class AD56x8(object):
             value (int): data to be written to the SPI bus
         """
 
-        # 32 Bit structure instance for converting value to an array of bytes
-        w = SPIWrite()
-        w.value = value
-        wba = [w.reg.d, w.reg.c, w.reg.b, w.reg.a]
-
-        self._spi.write(wba)
\ No newline at end of file
+        if self.shadow is not None and not self.shadow.apply(value):
+            return
+
+        # Frames are clocked out MSB first as four big-endian bytes
+        if self._batch is not None:
+            self._batch += value.to_bytes(4, 'big')
+            return
+        try:
+            self._spi.write(value.to_bytes(4, 'big'))
+        except Exception:
+            self._write_failed()
+            raise
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - __main__.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import argparse
+import itertools
+import sys
+
+from AD56x8.AD56x8 import (AD56x8, AD56x8_MODEL_PARAMS, CLEAR_CODES,
+                           IREF_MODE, LDAC_MODE, PD_MODES)
+
+'''
+Command-line tool to configure an AD56x8 and stream samples to it.
+
+    python -m AD56x8 --model AD5628-1 --spi 0.0 --iref ON
+    python -m AD56x8 --model AD5628-1 --spi 0.0 --rate 1000 \\
+        --channels DAC_A,DAC_B --input wave.csv --loop
+    python -m AD56x8 --model AD5668-3 --dry-run --rate 50000 \\
+        --waveform sine --frequency 100 --amplitude 2 --offset 2.5 \\
+        --duration 5
+
+Samples are lines of comma separated values, one per channel, from stdin
+('-') or a CSV file, or codes from a .npy or sample file (see samplefile),
+or one of the cached waveform tables. Values are DAC codes unless --volts
+is given. While streaming, throughput, late samples and jitter are
+printed to stderr. --dry-run drives an emulated DAC instead of hardware.
+'''
+
+
+def _pin(value):
+    return int(value) if value.isdigit() else value
+
+
+def _channels(value):
+    return [_pin(channel) for channel in value.split(',')]
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m AD56x8',
+        description='Configure an AD56x8 DAC and stream samples to it')
+    parser.add_argument('--model', required=True,
+                        choices=sorted(AD56x8_MODEL_PARAMS))
+
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument('--spi', metavar='PORT.DEVICE',
+                         help='Linux spidev bus and chip select, e.g. 0.1')
+    backend.add_argument('--bitbang', metavar='CLK,CS,DO',
+                         help='software SPI on platform GPIO pins')
+    backend.add_argument('--dry-run', action='store_true',
+                         help='drive an emulated DAC')
+    parser.add_argument('--clock-hz', type=int, default=5000000)
+
+    config = parser.add_argument_group('configuration')
+    config.add_argument('--reset', action='store_true',
+                        help='reset the DAC before configuring it')
+    config.add_argument('--iref', choices=sorted(IREF_MODE))
+    config.add_argument('--ldac', choices=sorted(LDAC_MODE),
+                        help='LDAC mode of the streamed channels')
+    config.add_argument('--power-down', choices=sorted(PD_MODES),
+                        help='power down mode of the streamed channels')
+    config.add_argument('--clear-code', choices=sorted(CLEAR_CODES))
+
+    stream = parser.add_argument_group('streaming')
+    source = stream.add_mutually_exclusive_group()
+    source.add_argument('--input', metavar='FILE',
+                        help="'-' for stdin, .csv, .npy or sample file")
+    source.add_argument('--waveform', choices=('sine', 'triangle', 'ramp',
+                                               'step'))
+    stream.add_argument('--rate', type=float, help='sample rate in Hz')
+    stream.add_argument('--channels', type=_channels, default=[0],
+                        help='comma separated channels, default DAC_A')
+    stream.add_argument('--volts', action='store_true',
+                        help='text input values are volts')
+    stream.add_argument('--calibration', metavar='FILE',
+                        help='calibration JSON used to convert volts')
+    stream.add_argument('--frequency', type=float, default=1000.0)
+    stream.add_argument('--amplitude', type=float, default=1.0,
+                        help='waveform peak amplitude in volts')
+    stream.add_argument('--offset', type=float, default=1.25,
+                        help='waveform center voltage')
+    stream.add_argument('--loop', action='store_true',
+                        help='repeat the input; waveforms always repeat')
+    stream.add_argument('--count', type=int, help='samples to play')
+    stream.add_argument('--duration', type=float, help='seconds to play')
+    stream.add_argument('--stats-interval', type=float, default=1.0,
+                        help='seconds between stats lines, 0 for none')
+    return parser
+
+
+def _backend(args):
+    if args.dry_run:
+        from AD56x8.emulator import Emulator
+        return {'spi': Emulator(args.model, history=False)}
+    if args.spi:
+        from AD56x8.linux_spi import SpiDevBackend
+        port, _, device = args.spi.partition('.')
+        return {'spi': SpiDevBackend(int(port), int(device or 0),
+                                     max_speed_hz=args.clock_hz)}
+    clk, cs, do = [_pin(pin) for pin in args.bitbang.split(',')]
+    return {'clk': clk, 'cs': cs, 'do': do}
+
+
+def _configure(dac, args):
+    if args.reset:
+        dac.reset()
+    if args.iref:
+        dac.internal_ref_mode(args.iref)
+    if args.clear_code:
+        dac.clear_code_mode(args.clear_code)
+    if args.ldac:
+        dac.LDAC_mode(args.ldac, args.channels)
+    if args.power_down:
+        dac.power_down_mode(args.power_down, args.channels)
+
+
+class _TextSamples(object):
+    """Lazily parsed lines of comma separated values."""
+
+    def __init__(self, path, width, convert):
+        self.path = path
+        self.width = width
+        self.convert = convert
+
+    def __iter__(self):
+        if self.path == '-':
+            return self._parse(sys.stdin)
+        return self._read_file()
+
+    def _read_file(self):
+        with open(self.path) as f:
+            for sample in self._parse(f):
+                yield sample
+
+    def _parse(self, lines):
+        first = True
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            values = line.split(',')
+            if len(values) != self.width:
+                raise ValueError('{}:{}: {} values for {} channels: {!r}'
+                                 .format(self.path, number, len(values),
+                                         self.width, line))
+            try:
+                sample = self.convert(values)
+            except ValueError:
+                if first:
+                    # Header line
+                    first = False
+                    continue
+                raise ValueError('{}:{}: bad sample: {!r}'
+                                 .format(self.path, number, line))
+            first = False
+            yield sample
+
+
+def _source(dac, args):
+    """Return (re-iterable samples, repeat) for the streaming options."""
+
+    width = len(args.channels)
+    if args.waveform:
+        from AD56x8.waveforms import waveform
+        table = waveform(args.waveform, args.frequency, args.amplitude,
+                         args.offset, args.rate, args.model)
+        if width == 1:
+            return table, True
+        return [(code,) * width for code in table.tolist()], True
+
+    path = args.input
+    if path == '-' or path.lower().endswith(('.csv', '.txt')):
+        if args.volts:
+            from AD56x8.calibration import Calibration
+            calibration = Calibration.load(args.calibration) \
+                if args.calibration else Calibration(args.model)
+            if calibration.device != args.model:
+                raise ValueError('{}: Calibration is for {}'
+                                 .format(args.model, calibration.device))
+            code = calibration.code
+            channels = args.channels
+
+            def convert(values):
+                return tuple(code(channel, float(value))
+                             for channel, value in zip(channels, values))
+        else:
+            top = 1 << dac.DATA_WIDTH
+
+            def convert(values):
+                codes = tuple(int(value, 0) for value in values)
+                if not all(0 <= code < top for code in codes):
+                    raise ValueError('code out of range')
+                return codes
+        if path == '-' and args.loop:
+            raise ValueError('stdin cannot be looped')
+        return _TextSamples(path, width, convert), args.loop
+
+    from AD56x8.samplefile import SampleCursor, SampleFile
+    waveform_file = SampleFile(path)
+    if waveform_file.channels != width:
+        raise ValueError('{}: {} columns for {} channels'
+                         .format(path, waveform_file.channels, width))
+    cursor = SampleCursor(waveform_file)
+    if args.loop:
+        cursor.set_loop()
+    return cursor, False
+
+
+def _repeat(samples, repeat):
+    while True:
+        for sample in samples:
+            yield sample
+        if not repeat:
+            return
+
+
+def _format_stats(stats):
+    rate = stats['achieved_rate']
+    return ('samples {} rate {} late {} jitter mean {:.1f}us std {:.1f}us '
+            'max {:.1f}us'.format(stats['samples'],
+                                  '{:.1f}/s'.format(rate) if rate else '-',
+                                  stats['late'], stats['jitter_mean'] * 1e6,
+                                  stats['jitter_std'] * 1e6,
+                                  stats['jitter_max'] * 1e6))
+
+
+def _stream(dac, args):
+    from AD56x8.playback import Player
+
+    samples, repeat = _source(dac, args)
+    samples = _repeat(samples, repeat)
+    if args.count is not None:
+        samples = itertools.islice(samples, args.count)
+
+    player = Player(dac, samples, args.rate, channels=args.channels)
+    player.start()
+    interval = args.stats_interval or None
+    waited = 0.0
+    try:
+        while player.playing:
+            timeout = interval
+            if args.duration is not None:
+                remaining = args.duration - waited
+                if remaining <= 0:
+                    break
+                timeout = remaining if timeout is None else \
+                    min(timeout, remaining)
+            player.join(timeout)
+            waited += timeout or 0.0
+            if interval and player.playing:
+                print(_format_stats(player.stats.snapshot()),
+                      file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        player.stop()
+    print(_format_stats(player.stats.snapshot()), file=sys.stderr)
+    if player.error is not None:
+        raise player.error
+
+
+def main(argv=None):
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if (args.input or args.waveform) and not args.rate:
+        parser.error('--rate is needed to stream samples')
+
+    try:
+        backend = _backend(args)
+        dac = AD56x8(args.model, clock_hz=args.clock_hz, **backend)
+    except (ValueError, OSError) as e:
+        print('error: {}'.format(e), file=sys.stderr)
+        return 1
+    try:
+        _configure(dac, args)
+        if args.input or args.waveform:
+            _stream(dac, args)
+    except (ValueError, OSError) as e:
+        print('error: {}'.format(e), file=sys.stderr)
+        return 1
+    finally:
+        dac._spi.close()
+
+    if args.dry_run:
+        emulator = backend['spi']
+        print('frames {}'.format(emulator.frames))
+        print('outputs ' + ' '.join('{:.4f}'.format(volts)
+                                    for volts in emulator.outputs()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - aio.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+asyncio front-end for AD56x8 DACs.
+
+Commands are queued in call order and executed by a single writer task on
+a dedicated worker thread, so a slow SPI backend never blocks the event
+loop. Whatever has queued up while the previous transfer was running is
+executed inside one AD56x8.batch(), giving a bulk transfer on backends
+that support it.
+'''
+
+_STOP = object()
+
+
+class AsyncAD56x8(object):
+
+    def __init__(self, dac, max_pending=256, max_batch=64):
+        """Awaitable wrapper around an AD56x8 instance.
+
+        Args:
+            dac (AD56x8): device to drive; it must not be used directly
+                while the wrapper is open
+            max_pending (int): queued commands before callers wait
+            max_batch (int): commands executed per bulk transfer
+
+        Use as an async context manager, or call close() when done:
+
+            async with AsyncAD56x8(dac) as adac:
+                await adac.write_to_Input_Reg('DAC_A', 0x800)
+        """
+
+        self.dac = dac
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self._queue = None
+        self._writer = None
+        self._executor = None
+        self._closing = False
+
+    async def __aenter__(self):
+        self._start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _start(self):
+        if self._closing:
+            raise RuntimeError('AsyncAD56x8: closed')
+        if self._writer is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            self._writer = asyncio.get_running_loop().create_task(
+                self._write_loop())
+
+    async def close(self):
+        """Finish queued commands and stop the writer task.
+
+        The wrapper cannot be reopened; commands submitted once close()
+        has started raise RuntimeError.
+        """
+
+        self._closing = True
+        if self._writer is None:
+            return
+        if not self._writer.done():
+            await self._queue.put(_STOP)
+        # A failed writer has already passed its error to every future
+        await asyncio.wait([self._writer])
+        if not self._writer.cancelled():
+            self._writer.exception()
+        self._executor.shutdown()
+        self._writer = None
+
+    async def _submit(self, func, *args, **kwargs):
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, args, kwargs, future))
+        if self._writer.done():
+            # Queued after the writer stopped; nobody will run it
+            self._fail([], RuntimeError('AsyncAD56x8: closed'))
+        return await future
+
+    def _fail(self, items, error):
+        """Fail the futures of items and of everything still queued."""
+
+        while not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        for item in items:
+            if item is not _STOP and not item[3].done():
+                item[3].set_exception(error)
+
+    def _execute(self, items):
+        """Run commands in the worker thread as a single batch."""
+
+        results = []
+        with self.dac.batch():
+            for func, args, kwargs, _ in items:
+                try:
+                    results.append((True, func(*args, **kwargs)))
+                except Exception as e:
+                    results.append((False, e))
+        return results
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        stopping = False
+        items = []
+        late = []
+        try:
+            while not stopping:
+                items = [await queue.get()]
+                while len(items) < self.max_batch and not queue.empty():
+                    items.append(queue.get_nowait())
+                if _STOP in items:
+                    # Commands queued behind _STOP were submitted during
+                    # close() and are failed below
+                    stopping = True
+                    index = items.index(_STOP)
+                    items, late = items[:index], items[index + 1:]
+                if not items:
+                    continue
+
+                try:
+                    results = await loop.run_in_executor(self._executor,
+                                                         self._execute, items)
+                except Exception as e:
+                    results = [(False, e)] * len(items)
+
+                for (_, _, _, future), (ok, value) in zip(items, results):
+                    if future.cancelled():
+                        continue
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                items = []
+        except BaseException as e:
+            self._closing = True
+            self._fail(items, e if isinstance(e, Exception) else
+                       RuntimeError('AsyncAD56x8: writer stopped'))
+            raise
+        self._fail(late, RuntimeError('AsyncAD56x8: closed'))
+
+    # Awaitable versions of the AD56x8 commands
+
+    async def write_to_Input_Reg(self, channel, value):
+        return await self._submit(self.dac.write_to_Input_Reg, channel, value)
+
+    async def update_DAC_Reg(self, channel):
+        return await self._submit(self.dac.update_DAC_Reg, channel)
+
+    async def write_to_Input_Reg_update_all(self, channel, value):
+        return await self._submit(self.dac.write_to_Input_Reg_update_all,
+                                  channel, value)
+
+    async def write_to_Input_Regs_update_all(self, channels, values):
+        return await self._submit(self.dac.write_to_Input_Regs_update_all,
+                                  channels, values)
+
+    async def power_down_mode(self, mode, channel=None, mask=None):
+        return await self._submit(self.dac.power_down_mode, mode, channel,
+                                  mask=mask)
+
+    async def clear_code_mode(self, mode):
+        return await self._submit(self.dac.clear_code_mode, mode)
+
+    async def LDAC_mode(self, mode, channel=None, mask=None):
+        return await self._submit(self.dac.LDAC_mode, mode, channel,
+                                  mask=mask)
+
+    async def reset(self):
+        return await self._submit(self.dac.reset)
+
+    async def internal_ref_mode(self, mode):
+        return await self._submit(self.dac.internal_ref_mode, mode)
+
+    async def write_frames(self, frames):
+        return await self._submit(self.dac.write_frames, list(frames))
+
+    def stage(self, channel, value):
+        """Stage a value for flush(); does not touch the bus."""
+
+        self.dac.stage(channel, value)
+
+    async def flush(self):
+        return await self._submit(self.dac.flush)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - backend.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+'''
+SPI backend protocol of the AD56x8 driver.
+
+Any object with these methods can be passed as the spi argument of
+AD56x8; Adafruit_GPIO.SPI.SpiDev and SPI.BitBang qualify as they are.
+Subclassing SPIBackend is optional and only provides the defaults.
+
+    set_clock_hz(hz)     SPI clock in Hz
+    set_mode(mode)       SPI mode 0 to 3; the DAC uses mode 0
+    set_bit_order(order) MSBFIRST or LSBFIRST; the DAC uses MSBFIRST
+    write(data)          one transfer with SYNC (chip select) held low
+    write_frames(data)   optional: concatenated 32 bit frames in one
+                         transfer, with SYNC raised after every 4 bytes
+
+The driver only calls write() with exactly one 4 byte frame, and prefers
+write_frames() for several frames when the backend has it. A backend
+whose clock_hz attribute holds a number is taken to be configured already;
+AD56x8 then only changes the clock when given clock_hz.
+'''
+
+# Bit orders, the same values as Adafruit_GPIO.SPI
+MSBFIRST = 0
+LSBFIRST = 1
+
+
+class SPIBackend(object):
+    """Base class of write-only SPI backends with default settings
+    methods that accept and ignore any value."""
+
+    def set_clock_hz(self, hz):
+        pass
+
+    def set_mode(self, mode):
+        pass
+
+    def set_bit_order(self, order):
+        pass
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def write_frames(self, data):
+        """Write concatenated 32 bit frames, one write() per frame."""
+
+        if len(data) % 4:
+            raise ValueError('{}: frame data must be a multiple of 4 bytes'
+                             .format(type(self).__name__))
+        data = bytes(data)
+        for offset in range(0, len(data), 4):
+            self.write(data[offset:offset + 4])
+
+    def close(self):
+        pass
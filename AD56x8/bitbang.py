@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - bitbang.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from AD56x8.backend import LSBFIRST, MSBFIRST, SPIBackend
+
+'''
+Software SPI for AD56x8 DACs with precomputed pin transition tables.
+
+Produces the same pin sequence as Adafruit_GPIO.SPI.BitBang for writes: the
+data pin is set while the clock is at its base level, then the clock is
+pulsed. The per-byte sequence of (pin, level) transitions is computed once
+per bit order, so writing a byte is a single loop of gpio.output calls.
+
+Several DACs may share CLK and SYNC with one data pin each; their frames
+are then clocked out side by side, setting all data pins with one
+gpio.output_pins call per bit.
+'''
+
+# Adafruit_GPIO pin direction
+OUT = 0
+
+
+def _bit_levels(order):
+    """Bit levels of every byte value in transmit order."""
+
+    if order == MSBFIRST:
+        positions = range(7, -1, -1)
+    elif order == LSBFIRST:
+        positions = range(8)
+    else:
+        raise ValueError('Order must be MSBFIRST or LSBFIRST.')
+    return [tuple((byte >> i) & 1 for i in positions) for byte in range(256)]
+
+
+class FastBitBang(SPIBackend):
+
+    def __init__(self, gpio, clk, cs, do):
+        """Software SPI write-only backend.
+
+        Args:
+            gpio (BaseGPIO): Adafruit_GPIO compatible GPIO object
+            clk (str, int): CLK pin
+            cs (str, int): CS (SYNC) pin, active low
+            do (str, int, list): DO pin, or a list of DO pins for several
+                DACs sharing CLK and CS
+        """
+
+        self._gpio = gpio
+        self._clk = clk
+        self._cs = cs
+        self._do = list(do) if isinstance(do, (list, tuple)) else [do]
+
+        for pin in [clk, cs] + self._do:
+            gpio.setup(pin, OUT)
+        # SYNC high to start with device communication off
+        gpio.output(cs, 1)
+
+        self._order = MSBFIRST
+        self._levels = _bit_levels(MSBFIRST)
+        self.set_mode(0)
+
+    def set_clock_hz(self, hz):
+        """Clock speed is set by GPIO timing; ignored like SPI.BitBang."""
+
+        pass
+
+    def set_mode(self, mode):
+        """Set SPI mode; only clock polarity affects writes."""
+
+        if mode < 0 or mode > 3:
+            raise ValueError('Mode must be a value 0, 1, 2, or 3.')
+        self._clock_base = 1 if mode & 0x02 else 0
+        self._gpio.output(self._clk, self._clock_base)
+        self._build_tables()
+
+    def set_bit_order(self, order):
+        """Set MSBFIRST or LSBFIRST bit order."""
+
+        self._levels = _bit_levels(order)
+        self._order = order
+        self._build_tables()
+
+    def _build_tables(self):
+        # Pin transitions for each byte value on a single data pin
+        clk = self._clk
+        base = self._clock_base
+        pulse = ((clk, 1 - base), (clk, base))
+        self._transitions = []
+        for levels in self._levels:
+            sequence = []
+            for level in levels:
+                sequence.append((self._do[0], level))
+                sequence.extend(pulse)
+            self._transitions.append(tuple(sequence))
+
+    def close(self):
+        pass
+
+    def write(self, data):
+        """Write bytes with CS asserted throughout.
+
+        With several data pins the same data is sent to every DAC.
+        """
+
+        gpio = self._gpio
+        gpio.output(self._cs, 0)
+        if len(self._do) == 1:
+            self._write_single(data)
+        else:
+            self._write_parallel([data] * len(self._do))
+        gpio.output(self._cs, 1)
+
+    def write_frames(self, data):
+        """Write concatenated 32 bit frames, toggling CS after each frame."""
+
+        if len(data) % 4:
+            raise ValueError('FastBitBang: frame data must be a multiple of 4 '
+                             'bytes')
+        data = bytes(data)
+        for offset in range(0, len(data), 4):
+            self.write(data[offset:offset + 4])
+
+    def write_parallel(self, streams):
+        """Write different frame data to each data pin at the same time.
+
+        Args:
+            streams (list of bytes-like): one stream of whole 32 bit frames
+                per data pin, all the same length
+        """
+
+        if len(streams) != len(self._do):
+            raise ValueError('FastBitBang: {} streams given for {} data pins'
+                             .format(len(streams), len(self._do)))
+        streams = [bytes(stream) for stream in streams]
+        length = len(streams[0])
+        if length % 4 or any(len(stream) != length for stream in streams):
+            raise ValueError('FastBitBang: streams must hold the same whole '
+                             'number of 4 byte frames')
+
+        output = self._gpio.output
+        for offset in range(0, length, 4):
+            output(self._cs, 0)
+            self._write_parallel([stream[offset:offset + 4]
+                                  for stream in streams])
+            output(self._cs, 1)
+
+    def _write_single(self, data):
+        output = self._gpio.output
+        transitions = self._transitions
+        for byte in data:
+            for pin, level in transitions[byte]:
+                output(pin, level)
+
+    def _write_parallel(self, streams):
+        gpio = self._gpio
+        output = gpio.output
+        output_pins = gpio.output_pins
+        pins = self._do
+        levels = self._levels
+        clk = self._clk
+        base = self._clock_base
+        for column in zip(*streams):
+            for bits in zip(*[levels[byte] for byte in column]):
+                output_pins(dict(zip(pins, bits)))
+                output(clk, 1 - base)
+                output(clk, base)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - bus.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import threading
+import time
+
+from AD56x8.AD56x8 import AD56x8
+from AD56x8.backend import SPIBackend
+
+'''
+Thread-safe sharing of one SPI bus between several AD56x8 devices.
+
+Each device gets a BusPort as its SPI backend. A write first appends its
+frames to the bus queue under a short lock, then takes the bus lock;
+whichever thread holds the bus lock writes everything queued so far, for
+all devices, so threads waiting on the bus get their frames written by the
+current owner instead of queueing for the lock one by one. Consecutive
+frames for the same device are merged into one bulk transfer. Frames of
+one write() call are never interleaved with another device's.
+
+The bus serializes devices, not threads: each AD56x8 handle from attach()
+keeps its own unlocked batch() and LDAC state, so a handle must only be
+used by one thread at a time. Give each thread its own handle.
+
+A device is selected either by the backend's own chip select (one device
+on the shared backend), by a GPIO chip select pin driven per frame, or by
+its own backend object for another chip select on the same bus, e.g.
+/dev/spidev1.1.
+'''
+
+# Adafruit_GPIO pin direction
+OUT = 0
+
+
+class BusPort(SPIBackend):
+    """SPI backend handed to one device on a SharedBus."""
+
+    def __init__(self, bus, name, cs=None, spi=None):
+        self._bus = bus
+        self.name = name
+        self.cs = cs
+        self.spi = spi
+        self.clock_hz = None
+        self.mode = None
+        self.bit_order = None
+
+        self.frames = 0
+        self.writes = 0
+        self.transfers = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def set_clock_hz(self, hz):
+        self.clock_hz = hz
+        if self.spi is not None:
+            self.spi.set_clock_hz(hz)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        if self.spi is not None:
+            self.spi.set_mode(mode)
+
+    def set_bit_order(self, order):
+        self.bit_order = order
+        if self.spi is not None:
+            self.spi.set_bit_order(order)
+
+    def write(self, data):
+        self._bus._submit(self, bytes(data))
+
+    def write_frames(self, data):
+        self._bus._submit(self, bytes(data))
+
+    def stats(self):
+        """Return the port's throughput and bus wait statistics."""
+
+        return {'frames': self.frames,
+                'writes': self.writes,
+                'transfers': self.transfers,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'mean_wait_time': self.wait_time / self.writes
+                if self.writes else 0.0}
+
+
+class SharedBus(object):
+
+    def __init__(self, spi, gpio=None):
+        """Owner of an SPI backend shared by several devices.
+
+        Args:
+            spi: SPI backend for the bus
+            gpio (BaseGPIO): GPIO used for chip select pins given to attach()
+        """
+
+        self._spi = spi
+        self._gpio = gpio
+        self._ports = []
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._bus_lock = threading.Lock()
+        self._settings = None
+
+    def attach(self, dac_model, cs=None, spi=None, name=None, **kwargs):
+        """Create an AD56x8 device on the bus.
+
+        Args:
+            dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+            cs (str, int): GPIO chip select (SYNC) pin of this device
+            spi: backend for a separate chip select on the same bus
+            name (str): label used in stats(), defaults to the port index
+            kwargs: further AD56x8 constructor arguments
+
+        Returns:
+            AD56x8: device whose writes are serialized by the bus; use it
+            from one thread at a time
+
+        Only one device can use the backend's own chip select, i.e. be
+        attached with neither cs nor spi.
+        """
+
+        if cs is None and spi is None and \
+                any(port.cs is None and port.spi is None
+                    for port in self._ports):
+            raise ValueError('SharedBus: another device already uses the '
+                             'backend chip select; give cs or spi')
+        if cs is not None:
+            if self._gpio is None:
+                raise ValueError('SharedBus: a gpio object is needed for '
+                                 'chip select pins')
+            self._gpio.setup(cs, OUT)
+            self._gpio.output(cs, 1)
+
+        port = BusPort(self, name if name is not None else len(self._ports),
+                       cs=cs, spi=spi)
+        self._ports.append(port)
+        return AD56x8(dac_model, spi=port, **kwargs)
+
+    def stats(self):
+        """Return per-device statistics keyed by port name."""
+
+        return dict((port.name, port.stats()) for port in self._ports)
+
+    def _submit(self, port, data):
+        entry = [port, data, time.monotonic(), None]
+        with self._queue_lock:
+            self._queue.append(entry)
+
+        with self._bus_lock:
+            # Our entry is either still queued or was written by the
+            # previous owner of the bus lock
+            with self._queue_lock:
+                pending, self._queue = self._queue, []
+            if pending:
+                self._drain(pending)
+
+        if entry[3] is not None:
+            raise entry[3]
+
+    def _drain(self, pending):
+        start = 0
+        while start < len(pending):
+            port = pending[start][0]
+            end = start + 1
+            while end < len(pending) and pending[end][0] is port:
+                end += 1
+            group = pending[start:end]
+            start = end
+
+            now = time.monotonic()
+            for entry in group:
+                wait = now - entry[2]
+                port.wait_time += wait
+                if wait > port.max_wait_time:
+                    port.max_wait_time = wait
+
+            data = b''.join(entry[1] for entry in group)
+            try:
+                self._write_port(port, data)
+            except Exception as e:
+                for entry in group:
+                    entry[3] = e
+                continue
+            port.frames += len(data) // 4
+            port.writes += len(group)
+            port.transfers += 1
+
+    def _write_port(self, port, data):
+        if port.spi is not None:
+            self._write_frames(port.spi, data)
+            return
+
+        spi = self._spi
+        settings = (port.clock_hz, port.mode, port.bit_order)
+        if settings != self._settings:
+            if port.clock_hz is not None:
+                spi.set_clock_hz(port.clock_hz)
+            if port.mode is not None:
+                spi.set_mode(port.mode)
+            if port.bit_order is not None:
+                spi.set_bit_order(port.bit_order)
+            self._settings = settings
+
+        if port.cs is None:
+            self._write_frames(spi, data)
+            return
+
+        # SYNC must return high after every frame
+        output = self._gpio.output
+        for offset in range(0, len(data), 4):
+            output(port.cs, 0)
+            spi.write(data[offset:offset + 4])
+            output(port.cs, 1)
+
+    @staticmethod
+    def _write_frames(spi, data):
+        write_frames = getattr(spi, 'write_frames', None)
+        if write_frames is not None:
+            write_frames(data)
+        else:
+            for offset in range(0, len(data), 4):
+                spi.write(data[offset:offset + 4])
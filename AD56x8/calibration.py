@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - calibration.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import bisect
+import json
+from array import array
+
+from AD56x8.AD56x8 import (AD56x8_MODEL_PARAMS, CHANNEL_ADDRESS,
+                           CMD_WRITE_AND_UPDATE_N, DAC_CHANNELS,
+                           FRAME_DATA_BITS, FRAME_PREFIX, MAX_CHANNELS)
+
+'''
+Per-channel calibration of AD56x8 outputs.
+
+Each channel's actual output for a code is modelled as
+
+    volts(code) = gain * ideal(code) + offset + correction(code)
+
+where ideal(code) = 2 * VREF * code / 2**DATA_WIDTH, as in the examples,
+and correction interpolates linearly between measured (code, error volts)
+points. From this a lookup table of 2**DATA_WIDTH entries is precomputed
+per channel, mapping evenly spaced voltages over the channel's output
+range to the nearest code, so converting a voltage is one multiply and
+one index. Calibration data is stored as JSON:
+
+    {"model": "AD5628-1", "vref": 2.5,
+     "channels": {"0": {"gain": 1.002, "offset": -0.003,
+                        "points": [[0, 0.001], [4095, -0.002]]}}}
+'''
+
+# Output amplifier gain applied to the reference, as in vectorized
+REF_GAIN = 2
+
+
+class ChannelCalibration(object):
+
+    def __init__(self, gain=1.0, offset=0.0, points=None):
+        """Gain, offset and piecewise-linear error of one channel.
+
+        Args:
+            gain (float): output gain relative to ideal, must be positive
+            offset (float): output offset in volts
+            points (list): (code, error volts) pairs measured after gain
+                and offset, interpolated linearly and held flat outside
+        """
+
+        if gain <= 0:
+            raise ValueError('Calibration: gain must be positive')
+        self.gain = float(gain)
+        self.offset = float(offset)
+        self.points = sorted((int(code), float(error))
+                             for code, error in (points or ()))
+
+    def correction(self, code):
+        """Interpolated error in volts at a code."""
+
+        points = self.points
+        if not points:
+            return 0.0
+        index = bisect.bisect_right(points, (code, float('inf')))
+        if index == 0:
+            return points[0][1]
+        if index == len(points):
+            return points[-1][1]
+        (c0, e0), (c1, e1) = points[index - 1], points[index]
+        return e0 + (e1 - e0) * (code - c0) / (c1 - c0)
+
+    def to_dict(self):
+        return {'gain': self.gain, 'offset': self.offset,
+                'points': [list(point) for point in self.points]}
+
+
+class Calibration(object):
+
+    def __init__(self, dac_model, vref=None, channels=None):
+        """Calibration of every channel of a DAC.
+
+        Args:
+            dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+            vref (float): reference voltage, defaults to the model's VREF
+            channels (dict): ChannelCalibration by channel name or number;
+                channels left out are ideal
+        """
+
+        if dac_model not in AD56x8_MODEL_PARAMS:
+            raise ValueError('AD56x8: DAC model specified not in known set')
+        params = AD56x8_MODEL_PARAMS[dac_model]
+        self.device = dac_model
+        self.DATA_WIDTH = params['DATA_WIDTH']
+        self.vref = params['VREF'] if vref is None else float(vref)
+        self._channels = [ChannelCalibration() for _ in range(MAX_CHANNELS)]
+        self._tables = [None] * MAX_CHANNELS
+        for channel, calibration in (channels or {}).items():
+            self.set_channel(channel, calibration)
+
+    def _address(self, channel):
+        address = CHANNEL_ADDRESS.get(channel)
+        if address is None or address == DAC_CHANNELS['ALL_DAC']:
+            raise ValueError('{}: Calibration Error: Bad DAC channel '
+                             'selection'.format(self.device))
+        return address
+
+    def channel(self, channel):
+        """Return the ChannelCalibration of a channel."""
+
+        return self._channels[self._address(channel)]
+
+    def set_channel(self, channel, calibration):
+        """Replace the calibration of a channel; its table is rebuilt on
+        next use."""
+
+        address = self._address(channel)
+        self._channels[address] = calibration
+        self._tables[address] = None
+
+    def output(self, channel, code):
+        """Modelled output voltage of a channel at a code."""
+
+        calibration = self.channel(channel)
+        ideal = REF_GAIN * self.vref * code / (1 << self.DATA_WIDTH)
+        return calibration.gain * ideal + calibration.offset + \
+            calibration.correction(code)
+
+    def table(self, channel):
+        """Return the lookup table of a channel as (codes, low volts,
+        table entries per volt); built on first use."""
+
+        address = self._address(channel)
+        table = self._tables[address]
+        if table is None:
+            table = self._tables[address] = self._build_table(address)
+        return table
+
+    def _build_table(self, address):
+        size = 1 << self.DATA_WIDTH
+        volts = [self.output(address, code) for code in range(size)]
+        low, high = min(volts), max(volts)
+        step = (high - low) / (size - 1)
+
+        # Both the grid and the outputs ascend, so one walk finds the
+        # nearest code of every grid voltage
+        codes = array('H', [0]) * size
+        code = 0
+        for index in range(size):
+            target = low + index * step
+            while code + 1 < size and \
+                    abs(volts[code + 1] - target) <= abs(volts[code] - target):
+                code += 1
+            codes[index] = code
+        return codes, low, 1.0 / step if step else 0.0
+
+    def code(self, channel, volts):
+        """Code giving the output voltage nearest to volts on a channel,
+        clamped to the output range."""
+
+        codes, low, scale = self.table(channel)
+        index = int((volts - low) * scale + 0.5)
+        if index < 0:
+            index = 0
+        elif index >= len(codes):
+            index = len(codes) - 1
+        return codes[index]
+
+    def codes(self, channel, volts):
+        """Vectorized code(): codes for a NumPy array of voltages.
+
+        Returns:
+            numpy.ndarray: uint16 codes with the same shape as volts
+        """
+
+        import numpy as np
+
+        codes, low, scale = self.table(channel)
+        lut = np.frombuffer(codes, dtype=np.uint16)
+        index = np.floor((np.asarray(volts, dtype=np.float64) - low) * scale + 0.5)
+        np.clip(index, 0, len(lut) - 1, out=index)
+        return lut[index.astype(np.intp)]
+
+    def to_dict(self):
+        return {'model': self.device,
+                'vref': self.vref,
+                'channels': dict((str(address), calibration.to_dict())
+                                 for address, calibration
+                                 in enumerate(self._channels))}
+
+    @classmethod
+    def from_dict(cls, data):
+        channels = dict((int(address), ChannelCalibration(**fields))
+                        for address, fields in data.get('channels', {}).items())
+        return cls(data['model'], vref=data.get('vref'), channels=channels)
+
+    def save(self, path):
+        """Write the calibration to a JSON file."""
+
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """Read a calibration from a JSON file."""
+
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class CalibratedAD56x8(object):
+
+    def __init__(self, dac, calibration=None):
+        """Voltage control of an AD56x8 through its calibration.
+
+        Args:
+            dac (AD56x8): device to drive
+            calibration (Calibration): calibration for the device's model,
+                defaults to ideal channels
+        """
+
+        if calibration is None:
+            calibration = Calibration(dac.device)
+        if calibration.device != dac.device:
+            raise ValueError('{}: Calibration is for {}'
+                             .format(dac.device, calibration.device))
+        self.dac = dac
+        self.calibration = calibration
+        self._shift = FRAME_DATA_BITS - dac.DATA_WIDTH
+
+    def set_voltage(self, channel, volts):
+        """Set and update one channel's output, or every channel's for
+        ALL_DAC, to volts.
+
+        Returns:
+            int: code written, or list of codes for ALL_DAC
+        """
+
+        if CHANNEL_ADDRESS.get(channel) == DAC_CHANNELS['ALL_DAC']:
+            return self.set_voltages(range(MAX_CHANNELS),
+                                     [volts] * MAX_CHANNELS)
+        code = self.calibration.code(channel, volts)
+        address = CHANNEL_ADDRESS[channel]
+        self.dac.write_frames([FRAME_PREFIX[CMD_WRITE_AND_UPDATE_N][address] |
+                               (code << self._shift)])
+        return code
+
+    def set_voltages(self, channels, volts):
+        """Set several channels' outputs, changing them together.
+
+        Returns:
+            list: codes written
+        """
+
+        if len(channels) != len(volts):
+            raise ValueError('{}: Input Reg Error: {} values given for {} '
+                             'channels'.format(self.dac.device, len(volts),
+                                               len(channels)))
+        code = self.calibration.code
+        codes = [code(channel, value) for channel, value in zip(channels, volts)]
+        self.dac.write_to_Input_Regs_update_all(channels, codes)
+        return codes
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - compile.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from AD56x8.AD56x8 import (AD56x8_MODEL_PARAMS, CHANNEL_ADDRESS,
+                           CMD_WRITE_AND_UPDATE_N, CMD_WRITE_INPUT_REG_N,
+                           CMD_WRITE_INPUT_RE_N_UPDATE_ALL, FRAME_DATA_BITS,
+                           FRAME_PREFIX, MAX_CHANNELS)
+
+'''
+Offline compiler of waveforms to ready-to-send AD56x8 frame streams.
+
+Waveforms from CSV files, .npy or sample files (see samplefile) or any
+iterable of samples are encoded once, on any machine, into a frame file:
+a small header followed by big-endian 32 bit frames exactly as they go
+out on the bus. Every sample is encoded like write_to_Input_Regs_update_all
+so all its channels change together; single channel waveforms use the
+write and update channel N command. Integer .npy arrays hold DAC codes;
+float .npy arrays hold volts and are only accepted with --volts.
+
+Frame file header, little-endian, 64 bytes:
+
+    magic     8 bytes   b'AD56FRM\\0'
+    version   uint16    2
+    model     16 bytes  DAC model, NUL padded
+    channels  uint16    frames per sample
+    map       8 bytes   ADDR field of each channel, 0xFF padded
+    rate      float64   sample rate in Hz, 0 if unknown
+    frames    uint64    number of frames
+    crc32     uint32    CRC-32 of the frame data
+    reserved  8 bytes
+
+Large inputs are split into blocks encoded in parallel by a process pool;
+CSV text is parsed in the workers too. From the command line:
+
+    python -m AD56x8.compile wave.csv wave.frm --model AD5668-3 \\
+        --rate 10000 --channels DAC_A,DAC_B --volts
+'''
+
+FRAME_MAGIC = b'AD56FRM\0'
+# Version 1 files had a 62 byte header
+FRAME_VERSION = 2
+FRAME_HEADER = struct.Struct('<8sH16sH8sdQI8x')
+
+# Samples per block handed to a worker
+DEFAULT_BLOCK = 65536
+
+# Output amplifier gain applied to the reference, as in vectorized
+INTERNAL_REF_GAIN = 2
+
+_SWAP = sys.byteorder == 'little'
+_FRAME_TYPE = 'I' if array('I').itemsize == 4 else 'L'
+
+
+def _encode_block(block, spec):
+    """Encode one block of samples to frame bytes; runs in the workers.
+
+    Args:
+        block: list of CSV lines, or flat sample-major codes
+        spec (tuple): width, prefixes, shift, top and scale (volts to
+            codes, None for codes)
+    """
+
+    width, prefixes, shift, top, scale = spec
+    if block and isinstance(block[0], str):
+        values = []
+        for line in block:
+            row = line.split(',')
+            if len(row) != width:
+                raise ValueError('CSV row has {} columns, expected {}: {!r}'
+                                 .format(len(row), width, line))
+            values.extend(float(value) for value in row)
+        block = values
+
+    if scale is not None:
+        block = [int(round(value * scale)) for value in block]
+
+    frames = array(_FRAME_TYPE, [
+        prefixes[index % width] | (min(max(int(code), 0), top) << shift)
+        for index, code in enumerate(block)])
+    if _SWAP:
+        frames.byteswap()
+    return frames.tobytes()
+
+
+def _csv_blocks(path, block):
+    """Yield lists of data lines of a CSV file; a non-numeric first line
+    is taken as a header and skipped."""
+
+    lines = []
+    first = True
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if first:
+                first = False
+                try:
+                    [float(value) for value in line.split(',')]
+                except ValueError:
+                    continue
+            lines.append(line)
+            if len(lines) >= block:
+                yield lines
+                lines = []
+    if lines:
+        yield lines
+
+
+def _sample_blocks(samples, width, block):
+    """Yield flat code lists of block samples from an iterable."""
+
+    codes = []
+    count = 0
+    for sample in samples:
+        if width == 1 and not isinstance(sample, (list, tuple)):
+            codes.append(sample)
+        else:
+            if len(sample) != width:
+                raise ValueError('Sample has {} values, expected {}'
+                                 .format(len(sample), width))
+            codes.extend(sample)
+        count += 1
+        if count >= block:
+            yield codes
+            codes = []
+            count = 0
+    if codes:
+        yield codes
+
+
+def _file_blocks(path, block, volts=False):
+    """Yield blocks of a CSV, .npy or sample file, and its channel count
+    first."""
+
+    if path.lower().endswith('.csv'):
+        width = None
+        for lines in _csv_blocks(path, block):
+            if width is None:
+                width = len(lines[0].split(','))
+                yield width
+            yield lines
+        if width is None:
+            raise ValueError('{}: No samples in CSV file'.format(path))
+        return
+
+    if path.lower().endswith('.npy'):
+        import numpy as np
+
+        samples = np.load(path, mmap_mode='r')
+        if samples.dtype.kind == 'f':
+            # Float arrays hold volts; SampleFile only maps integer codes
+            if not volts:
+                raise ValueError('{}: Float .npy samples are volts and need '
+                                 'volts=True (--volts)'.format(path))
+            if samples.ndim not in (1, 2):
+                raise ValueError('{}: Expected a 1 or 2 dimensional array'
+                                 .format(path))
+            yield samples.shape[1] if samples.ndim == 2 else 1
+            for start in range(0, len(samples), block):
+                yield samples[start:start + block].ravel().tolist()
+            return
+
+    from AD56x8.samplefile import SampleFile
+
+    with SampleFile(path) as waveform:
+        yield waveform.channels
+        for codes in waveform.chunks(chunk=block):
+            yield codes.tolist()
+
+
+def _channel_spec(dac_model, channels, width):
+    if dac_model not in AD56x8_MODEL_PARAMS:
+        raise ValueError('AD56x8: DAC model specified not in known set')
+    if channels is None:
+        channels = range(width)
+    channels = list(channels)
+    if len(channels) != width or not 0 < width <= MAX_CHANNELS:
+        raise ValueError('{}: {} channels given for {} values per sample'
+                         .format(dac_model, len(channels), width))
+
+    if width == 1:
+        commands = [CMD_WRITE_AND_UPDATE_N]
+    else:
+        commands = [CMD_WRITE_INPUT_REG_N] * (width - 1) + \
+            [CMD_WRITE_INPUT_RE_N_UPDATE_ALL]
+    addresses = []
+    for channel in channels:
+        address = CHANNEL_ADDRESS.get(channel)
+        if address is None:
+            raise ValueError('{}: Input Reg Error: Bad DAC channel selection'
+                             .format(dac_model))
+        addresses.append(address)
+    prefixes = [FRAME_PREFIX[command][address]
+                for command, address in zip(commands, addresses)]
+    return addresses, prefixes
+
+
+def compile_frames(source, output, dac_model, rate=None, channels=None,
+                   width=None, volts=False, vref=None, gain=INTERNAL_REF_GAIN,
+                   workers=None, block=DEFAULT_BLOCK):
+    """Compile a waveform to a frame file.
+
+    Args:
+        source: path of a .csv, .npy or sample file, or an iterable of
+            samples (an int per sample for one channel, otherwise a
+            sequence of values per sample)
+        output (str): frame file to write
+        dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+        rate (float): sample rate stored in the header
+        channels (sequence): DAC Channel of each column, defaults to DAC_A
+            upwards
+        width (int): values per sample of an iterable source, defaults to
+            len(channels) or 1
+        volts (bool): values are output voltages instead of DAC codes
+        vref (float): reference voltage for volts, defaults to the model's
+            VREF
+        gain (float): output gain applied to vref
+        workers (int): encoding processes, defaults to the CPU count; 1
+            encodes in this process
+        block (int): samples per block
+
+    Returns:
+        dict: header fields of the written file
+    """
+
+    if isinstance(source, str):
+        blocks = _file_blocks(source, block, volts)
+        width = next(blocks)
+    else:
+        if width is None:
+            width = len(channels) if channels is not None else 1
+        blocks = _sample_blocks(source, width, block)
+
+    addresses, prefixes = _channel_spec(dac_model, channels, width)
+    params = AD56x8_MODEL_PARAMS[dac_model]
+    data_width = params['DATA_WIDTH']
+    scale = None
+    if volts:
+        if vref is None:
+            vref = params['VREF']
+        scale = (1 << data_width) / (vref * gain)
+    spec = (width, prefixes, FRAME_DATA_BITS - data_width,
+            (1 << data_width) - 1, scale)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    frames = 0
+    crc = 0
+    with open(output, 'wb') as f:
+        f.write(bytes(FRAME_HEADER.size))
+        for data in _encode_blocks(blocks, spec, workers):
+            f.write(data)
+            crc = zlib.crc32(data, crc)
+            frames += len(data) // 4
+
+        header = {'model': dac_model,
+                  'channels': width,
+                  'channel_map': addresses,
+                  'rate': rate,
+                  'frames': frames,
+                  'crc32': crc}
+        f.seek(0)
+        f.write(_pack_header(header))
+    return header
+
+
+def _encode_blocks(blocks, spec, workers):
+    """Yield encoded blocks in order, using a process pool once there is
+    more than one block."""
+
+    first = next(blocks, None)
+    if first is None:
+        return
+    second = next(blocks, None)
+    if second is None or workers < 2:
+        yield _encode_block(first, spec)
+        if second is not None:
+            yield _encode_block(second, spec)
+        for data in blocks:
+            yield _encode_block(data, spec)
+        return
+
+    def remaining():
+        yield first
+        yield second
+        for data in blocks:
+            yield data
+
+    # Bounded number of blocks in flight keeps memory use flat
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for data in remaining():
+            pending.append(pool.submit(_encode_block, data, spec))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _pack_header(header):
+    channel_map = bytes(header['channel_map']).ljust(8, b'\xff')
+    return FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION,
+                             header['model'].encode('ascii'),
+                             header['channels'], channel_map,
+                             header['rate'] or 0.0, header['frames'],
+                             header['crc32'])
+
+
+class FrameFile(object):
+
+    def __init__(self, path, verify=True):
+        """Memory-mapped compiled frame file.
+
+        Args:
+            path (str): frame file
+            verify (bool): check the CRC of the frame data on opening
+
+        Attributes:
+            model (str): DAC model the frames were compiled for
+            channels (int): frames per sample
+            channel_map (list): ADDR field of each channel
+            rate (float): sample rate, None if unknown
+            frames (int): number of frames
+            samples (int): number of samples
+        """
+
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(f.fileno()).st_size else None
+        try:
+            self._parse(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self, verify):
+        mapped = self._mmap
+        if mapped is None or len(mapped) < FRAME_HEADER.size or \
+                mapped[:8] != FRAME_MAGIC:
+            raise ValueError('{}: Not a frame file'.format(self.path))
+        (_, version, model, channels, channel_map, rate, frames,
+         crc) = FRAME_HEADER.unpack_from(mapped)
+        if version != FRAME_VERSION:
+            raise ValueError('{}: Unsupported frame file version {}'
+                             .format(self.path, version))
+
+        self.model = model.rstrip(b'\0').decode('ascii')
+        self.channels = channels
+        self.channel_map = list(channel_map[:channels])
+        self.rate = rate or None
+        self.frames = frames
+        self.samples = frames // channels if channels else 0
+        self.crc32 = crc
+        if FRAME_HEADER.size + 4 * frames != len(mapped):
+            raise ValueError('{}: Frame file is truncated'.format(self.path))
+        if verify and self._crc() != crc:
+            raise ValueError('{}: Frame file checksum mismatch'
+                             .format(self.path))
+
+    def _crc(self):
+        crc = 0
+        for data in self.chunks():
+            crc = zlib.crc32(data, crc)
+        return crc
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def chunks(self, start=0, stop=None, chunk=DEFAULT_BLOCK):
+        """Yield the frame data of samples start to stop, chunk samples at
+        a time, as bytes ready for the bus."""
+
+        if stop is None or stop > self.samples:
+            stop = self.samples
+        size = 4 * self.channels
+        base = FRAME_HEADER.size
+        for begin in range(start, stop, chunk):
+            end = min(begin + chunk, stop)
+            yield self._mmap[base + begin * size:base + end * size]
+
+    def write_to(self, dac, start=0, stop=None, chunk=4096):
+        """Write samples start to stop to dac as fast as the bus allows,
+        one bulk transfer per chunk."""
+
+        if dac.device != self.model:
+            raise ValueError('{}: Frames were compiled for {}'
+                             .format(dac.device, self.model))
+        for data in self.chunks(start, stop, chunk):
+            dac.write_buffer(data)
+
+
+def _expression_samples(expression):
+    """Evaluate a generator expression with the math module in scope."""
+
+    namespace = dict((name, getattr(math, name)) for name in dir(math)
+                     if not name.startswith('_'))
+    namespace['math'] = math
+    return eval('({})'.format(expression), namespace)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m AD56x8.compile',
+        description='Compile a waveform to an AD56x8 frame file')
+    parser.add_argument('source', nargs='?',
+                        help='.csv, .npy or sample file')
+    parser.add_argument('output', help='frame file to write')
+    parser.add_argument('--expr', help='Python generator expression of '
+                        'samples, instead of a source file')
+    parser.add_argument('--model', required=True,
+                        choices=sorted(AD56x8_MODEL_PARAMS))
+    parser.add_argument('--rate', type=float, help='sample rate in Hz')
+    parser.add_argument('--channels',
+                        help='comma separated DAC channels of the columns')
+    parser.add_argument('--volts', action='store_true',
+                        help='values are voltages instead of DAC codes')
+    parser.add_argument('--vref', type=float,
+                        help='reference voltage, defaults to the model VREF')
+    parser.add_argument('--workers', type=int,
+                        help='encoding processes, defaults to the CPU count')
+    args = parser.parse_args(argv)
+
+    if (args.source is None) == (args.expr is None):
+        parser.error('give either a source file or --expr')
+
+    channels = None
+    if args.channels:
+        channels = [int(ch) if ch.isdigit() else ch
+                    for ch in args.channels.split(',')]
+    source = args.source
+    if args.expr is not None:
+        source = _expression_samples(args.expr)
+
+    header = compile_frames(source, args.output, args.model, rate=args.rate,
+                            channels=channels, volts=args.volts,
+                            vref=args.vref, workers=args.workers)
+    print('{}: {} frames, {} channels, crc32 {:08x}'
+          .format(args.output, header['frames'], header['channels'],
+                  header['crc32']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
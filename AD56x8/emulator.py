@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - emulator.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import sys
+from array import array
+
+from AD56x8.AD56x8 import AD56x8_MODEL_PARAMS, FRAME_DATA_BITS, MAX_CHANNELS
+from AD56x8.backend import SPIBackend
+
+'''
+In-process emulator of an AD56x8 DAC, usable as an SPI backend.
+
+Frames are decoded straight into a model of the chip: Input and DAC
+registers, LDAC register, power-down modes, clear code and internal
+reference, plus the /LDAC and /CLR pins. Every change of a channel's
+output voltage is appended to a columnar history log of typed arrays
+(frame number, time, channel, volts), which NumPy can wrap without a copy:
+
+    emu = Emulator('AD5668-3')
+    dac = AD56x8.AD56x8('AD5668-3', spi=emu)
+    ...
+    volts = numpy.frombuffer(emu.history['volts'])
+
+Output voltage is gain * VREF * code / 2**DATA_WIDTH, following the
+examples; outputs powered down to GND read 0 V, and tri-stated outputs or
+outputs without a reference read NaN.
+'''
+
+# Output amplifier gain applied to the reference
+REF_GAIN = 2
+
+ALL_CHANNELS = tuple(range(MAX_CHANNELS))
+ALL_DAC_ADDRESS = 0xF
+
+# Power-down mode of an output tri-stated instead of pulled to GND
+PD_TRISTATE = 0b11
+
+NAN = float('nan')
+
+_SWAP = sys.byteorder == 'little'
+
+
+class Emulator(SPIBackend):
+
+    def __init__(self, dac_model, external_vref=None, history=True,
+                 clock=None):
+        """Emulated DAC and SPI backend.
+
+        Args:
+            dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+            external_vref (float): voltage on VREFIN while the internal
+                reference is off; None leaves the outputs undefined (NaN)
+            history (bool): log every output change
+            clock (callable): time source for the history; by default the
+                time the frames take on the bus at the set SPI clock
+
+        Attributes:
+            input (list): Input Register code per channel
+            dac (list): DAC Register code per channel
+            power_down (list): PD_MODE per channel
+            ldac (int): LDAC register channel mask
+            clear_code (int): CC_MODE
+            iref (int): IREF bit
+            frames (int): frames executed
+            clock_hz (int): SPI clock set by the driver
+        """
+
+        if dac_model not in AD56x8_MODEL_PARAMS:
+            raise ValueError('AD56x8: DAC model specified not in known set')
+        params = AD56x8_MODEL_PARAMS[dac_model]
+        self.device = dac_model
+        self.DATA_WIDTH = params['DATA_WIDTH']
+        self.VREF = params['VREF']
+        self._power_up_code = int(params['PU_DAC_MULT'] *
+                                  (1 << self.DATA_WIDTH))
+        self._data_shift = FRAME_DATA_BITS - self.DATA_WIDTH
+
+        self.external_vref = external_vref
+        self.clock = clock
+        self.clock_hz = None
+        self.mode = None
+        self.bit_order = None
+
+        self.frames = 0
+        self.ldac_pin = 1
+        self._commands = (self._write_input, self._update_dac,
+                          self._write_input_update_all,
+                          self._write_and_update, self._power_down,
+                          self._clear_code, self._ldac, self._reset,
+                          self._internal_ref) + (self._nop,) * 7
+
+        self._history = history
+        self.clear_history()
+        self._volts = [None] * MAX_CHANNELS
+        self._reset(0, 0, 0)
+
+    # SPI backend interface
+
+    def set_clock_hz(self, hz):
+        self.clock_hz = hz
+
+    def set_mode(self, mode):
+        self.mode = mode
+
+    def set_bit_order(self, order):
+        self.bit_order = order
+
+    def close(self):
+        pass
+
+    def write(self, data):
+        """Execute one frame; SYNC framing ends the transfer, so bytes past
+        the first 32 bits are ignored and shorter transfers are dropped."""
+
+        if len(data) >= 4:
+            self.execute(int.from_bytes(bytes(data[:4]), 'big'))
+
+    def write_frames(self, data):
+        """Execute concatenated big-endian 32 bit frames."""
+
+        if len(data) % 4:
+            raise ValueError('Emulator: frame data must be a multiple of 4 '
+                             'bytes')
+        frames = array('I')
+        if frames.itemsize == 4:
+            frames.frombytes(bytes(data))
+            if _SWAP:
+                frames.byteswap()
+        else:
+            data = bytes(data)
+            frames = [int.from_bytes(data[i:i + 4], 'big')
+                      for i in range(0, len(data), 4)]
+        execute = self.execute
+        for frame in frames:
+            execute(frame)
+
+    # Chip model
+
+    def execute(self, frame):
+        """Execute one 32 bit frame."""
+
+        self.frames += 1
+        self._commands[(frame >> 24) & 0xF](
+            (frame >> FRAME_DATA_BITS) & 0xF, frame, frame & 0xFF)
+
+    @staticmethod
+    def _targets(address):
+        if address == ALL_DAC_ADDRESS:
+            return ALL_CHANNELS
+        if address < MAX_CHANNELS:
+            return (address,)
+        return ()
+
+    def _code(self, frame):
+        return (frame & ((1 << FRAME_DATA_BITS) - 1)) >> self._data_shift
+
+    def _write_input(self, address, frame, low):
+        code = self._code(frame)
+        targets = self._targets(address)
+        loaded = []
+        for ch in targets:
+            self.input[ch] = code
+            # LDAC bit set, or /LDAC held low: the DAC Register follows
+            if self.ldac & (1 << ch) or not self.ldac_pin:
+                self.dac[ch] = code
+                loaded.append(ch)
+        self._outputs_changed(loaded)
+
+    def _update_dac(self, address, frame, low):
+        targets = self._targets(address)
+        for ch in targets:
+            self.dac[ch] = self.input[ch]
+        self._outputs_changed(targets)
+
+    def _write_input_update_all(self, address, frame, low):
+        code = self._code(frame)
+        for ch in self._targets(address):
+            self.input[ch] = code
+        self.dac[:] = self.input
+        self._outputs_changed(ALL_CHANNELS)
+
+    def _write_and_update(self, address, frame, low):
+        code = self._code(frame)
+        targets = self._targets(address)
+        for ch in targets:
+            self.input[ch] = code
+            self.dac[ch] = code
+        self._outputs_changed(targets)
+
+    def _power_down(self, address, frame, low):
+        mode = (frame >> 8) & 0x3
+        targets = [ch for ch in ALL_CHANNELS if low & (1 << ch)]
+        for ch in targets:
+            self.power_down[ch] = mode
+        self._outputs_changed(targets)
+
+    def _clear_code(self, address, frame, low):
+        self.clear_code = low & 0x3
+
+    def _ldac(self, address, frame, low):
+        self.ldac = low
+
+    def _reset(self, address, frame, low):
+        code = self._power_up_code
+        self.input = [code] * MAX_CHANNELS
+        self.dac = [code] * MAX_CHANNELS
+        self.power_down = [0] * MAX_CHANNELS
+        self.ldac = 0
+        self.clear_code = 0
+        self.iref = 0
+        self._outputs_changed(ALL_CHANNELS)
+
+    def _internal_ref(self, address, frame, low):
+        self.iref = low & 0x1
+        self._outputs_changed(ALL_CHANNELS)
+
+    def _nop(self, address, frame, low):
+        pass
+
+    # Pins
+
+    def set_ldac_pin(self, level):
+        """Drive /LDAC; a falling edge, or holding it low, loads the DAC
+        Registers of channels whose LDAC bit is clear."""
+
+        if self.ldac_pin and not level:
+            targets = [ch for ch in ALL_CHANNELS if not self.ldac & (1 << ch)]
+            for ch in targets:
+                self.dac[ch] = self.input[ch]
+            self._outputs_changed(targets)
+        self.ldac_pin = 1 if level else 0
+
+    def pulse_ldac(self):
+        """Pulse /LDAC low, updating every channel in hardware LDAC mode."""
+
+        self.set_ldac_pin(0)
+        self.set_ldac_pin(1)
+
+    def pulse_clear(self):
+        """Pulse /CLR low, loading the clear code into the Input and DAC
+        Registers; the NOP clear code leaves them unchanged."""
+
+        if self.clear_code == 0b11:
+            return
+        top = 1 << self.DATA_WIDTH
+        code = (0, top >> 1, top - 1)[self.clear_code]
+        self.input = [code] * MAX_CHANNELS
+        self.dac = [code] * MAX_CHANNELS
+        self._outputs_changed(ALL_CHANNELS)
+
+    # Outputs
+
+    def _vref(self):
+        return self.VREF if self.iref else self.external_vref
+
+    def volts(self, channel):
+        """Output voltage of a channel, NaN when tri-stated or undefined."""
+
+        mode = self.power_down[channel]
+        if mode:
+            return NAN if mode == PD_TRISTATE else 0.0
+        vref = self._vref()
+        if vref is None:
+            return NAN
+        return REF_GAIN * vref * self.dac[channel] / (1 << self.DATA_WIDTH)
+
+    def outputs(self):
+        """Output voltage of every channel."""
+
+        return [self.volts(ch) for ch in ALL_CHANNELS]
+
+    def _outputs_changed(self, channels):
+        last = self._volts
+        for ch in channels:
+            volts = self.volts(ch)
+            previous = last[ch]
+            if volts == previous or (volts != volts and previous is not None
+                                     and previous != previous):
+                continue
+            last[ch] = volts
+            if self._history:
+                self._log(ch, volts)
+
+    def _now(self):
+        if self.clock is not None:
+            return self.clock()
+        if not self.clock_hz:
+            return 0.0
+        return self.frames * 32.0 / self.clock_hz
+
+    def _log(self, channel, volts):
+        self.history['frame'].append(self.frames)
+        self.history['time'].append(self._now())
+        self.history['channel'].append(channel)
+        self.history['volts'].append(volts)
+
+    def clear_history(self):
+        """Empty the history log.
+
+        The history is a dict of equal length columns, one row per output
+        change: frame (frames executed so far), time, channel and volts.
+        """
+
+        self.history = {'frame': array('Q'),
+                        'time': array('d'),
+                        'channel': array('B'),
+                        'volts': array('d')}
+
+    def output_history(self, channel):
+        """Return the (time, volts) steps of one channel's output."""
+
+        history = self.history
+        return [(t, v) for t, ch, v in zip(history['time'],
+                                           history['channel'],
+                                           history['volts'])
+                if ch == channel]
+
+    def snapshot(self):
+        """Return the register state, pins and outputs as a dict."""
+
+        return {'input': list(self.input),
+                'dac': list(self.dac),
+                'power_down': list(self.power_down),
+                'ldac': self.ldac,
+                'clear_code': self.clear_code,
+                'iref': self.iref,
+                'ldac_pin': self.ldac_pin,
+                'frames': self.frames,
+                'outputs': self.outputs()}
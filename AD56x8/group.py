@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - group.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import threading
+import time
+
+'''
+Synchronized updates of several AD56x8 DACs with the /LDAC pin.
+
+Every channel of the group is put in hardware LDAC mode, so writing an
+Input Register leaves the outputs unchanged. An update first preloads the
+Input Registers of each device in one bulk transfer per device, then
+pulses the /LDAC line shared by all devices once; on its falling edge
+every channel of every device loads its DAC Register at the same moment.
+
+    group = DACGroup([dac0, dac1], gpio, ldac_pin=17)
+    group.update({0: {'DAC_A': 0x800, 'DAC_B': 0x400},
+                  1: {'DAC_A': 0x100}})
+'''
+
+# Adafruit_GPIO pin direction
+OUT = 0
+
+
+class DACGroup(object):
+
+    def __init__(self, devices, gpio, ldac_pin, pulse_width=0.0,
+                 configure=True):
+        """Devices sharing an /LDAC line.
+
+        Args:
+            devices (list of AD56x8): devices of the group
+            gpio (BaseGPIO): GPIO driving the /LDAC line
+            ldac_pin (str, int): /LDAC pin, idle high
+            pulse_width (float): seconds /LDAC is held low; 0 for as short
+                as the GPIO allows, which exceeds the 20 ns minimum
+            configure (bool): put every channel of every device in HW LDAC
+                mode now
+        """
+
+        if not devices:
+            raise ValueError('DACGroup: at least one device is needed')
+        self.devices = list(devices)
+        self._gpio = gpio
+        self._ldac = ldac_pin
+        self.pulse_width = pulse_width
+        self._lock = threading.Lock()
+        self.updates = 0
+
+        gpio.setup(ldac_pin, OUT)
+        gpio.output(ldac_pin, 1)
+        if configure:
+            for device in self.devices:
+                device.LDAC_mode('HW', 'ALL_DAC')
+
+    def _device(self, key):
+        if isinstance(key, int):
+            if not 0 <= key < len(self.devices):
+                raise ValueError('DACGroup: no device {} in the group'
+                                 .format(key))
+            return self.devices[key]
+        if key not in self.devices:
+            raise ValueError('DACGroup: {!r} is not in the group'
+                             .format(key))
+        return key
+
+    def preload(self, values):
+        """Write Input Registers without changing any output.
+
+        Args:
+            values (dict or list): per device, a dict of DAC values by
+                channel; keyed by device index or AD56x8 object, or a list
+                in device order (None to skip a device)
+        """
+
+        if isinstance(values, (list, tuple)):
+            if len(values) > len(self.devices):
+                raise ValueError('DACGroup: {} value sets given for {} '
+                                 'devices'.format(len(values),
+                                                  len(self.devices)))
+            values = dict((index, channels)
+                          for index, channels in enumerate(values)
+                          if channels)
+
+        resolved = [(self._device(key), channels)
+                    for key, channels in values.items()]
+        for device, channels in resolved:
+            # One bulk transfer per device
+            with device.batch():
+                for channel, value in channels.items():
+                    device.write_to_Input_Reg(channel, value)
+
+    def latch(self):
+        """Pulse /LDAC, loading every DAC Register of every device from
+        its Input Register."""
+
+        output = self._gpio.output
+        output(self._ldac, 0)
+        if self.pulse_width:
+            time.sleep(self.pulse_width)
+        output(self._ldac, 1)
+
+    def update(self, values):
+        """Preload values and latch them on every device together.
+
+        Args:
+            values (dict or list): see preload()
+        """
+
+        with self._lock:
+            self.preload(values)
+            self.latch()
+            self.updates += 1
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - linux_spi.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import ctypes
+import os
+
+from AD56x8.AD56x8 import MAX_CLOCK_HZ
+from AD56x8.backend import LSBFIRST, MSBFIRST, SPIBackend
+
+'''
+Direct Linux spidev backend for AD56x8 DACs.
+
+Frames are written with ioctl(SPI_IOC_MESSAGE) on /dev/spidevX.Y, without
+going through Adafruit_GPIO or py-spidev. The spi_ioc_transfer array and
+the transmit buffer are allocated once; every 32 bit frame gets its own
+transfer with cs_change set, so SYNC returns high between frames within a
+single message.
+'''
+
+# linux/spi/spidev.h
+SPI_IOC_MAGIC = ord('k')
+SPI_CPHA = 0x01
+SPI_CPOL = 0x02
+SPI_LSB_FIRST = 0x08
+
+
+def _IOW(number, size):
+    # _IOC(_IOC_WRITE, SPI_IOC_MAGIC, number, size)
+    return (1 << 30) | (size << 16) | (SPI_IOC_MAGIC << 8) | number
+
+
+class SpiIocTransfer(ctypes.Structure):
+    _fields_ = [("tx_buf", ctypes.c_uint64),
+                ("rx_buf", ctypes.c_uint64),
+                ("len", ctypes.c_uint32),
+                ("speed_hz", ctypes.c_uint32),
+                ("delay_usecs", ctypes.c_uint16),
+                ("bits_per_word", ctypes.c_uint8),
+                ("cs_change", ctypes.c_uint8),
+                ("tx_nbits", ctypes.c_uint8),
+                ("rx_nbits", ctypes.c_uint8),
+                ("word_delay_usecs", ctypes.c_uint8),
+                ("pad", ctypes.c_uint8)]
+
+
+SPI_IOC_WR_MODE = _IOW(1, 1)
+SPI_IOC_WR_LSB_FIRST = _IOW(2, 1)
+SPI_IOC_WR_BITS_PER_WORD = _IOW(3, 1)
+SPI_IOC_WR_MAX_SPEED_HZ = _IOW(4, 4)
+
+
+def SPI_IOC_MESSAGE(count):
+    return _IOW(0, count * ctypes.sizeof(SpiIocTransfer))
+
+
+# Transfers whose total size fits the 14 bit ioctl size field
+MAX_MESSAGE_FRAMES = ((1 << 14) - 1) // ctypes.sizeof(SpiIocTransfer)
+
+
+def _default_ioctl(fd, request, arg):
+    import fcntl
+    return fcntl.ioctl(fd, request, arg)
+
+
+class SpiDevBackend(SPIBackend):
+
+    def __init__(self, port, device, max_speed_hz=5000000, max_frames=128,
+                 fd=None, ioctl=None):
+        """SPI backend writing to /dev/spidev<port>.<device> by ioctl.
+
+        Args:
+            port (int): SPI bus number
+            device (int): chip select number on the bus
+            max_speed_hz (int): SPI clock, at most MAX_CLOCK_HZ
+            max_frames (int): frames per SPI_IOC_MESSAGE, at most
+                MAX_MESSAGE_FRAMES; longer writes are split into several
+                messages
+            fd (int): already open file descriptor to use instead of
+                opening the device node
+            ioctl (callable): ioctl(fd, request, arg), defaults to
+                fcntl.ioctl; replace it to test without hardware
+        """
+
+        if not 1 <= max_frames <= MAX_MESSAGE_FRAMES:
+            raise ValueError('SpiDevBackend: max_frames must be in 1 to {}'
+                             .format(MAX_MESSAGE_FRAMES))
+
+        self._ioctl = ioctl if ioctl is not None else _default_ioctl
+        self._owns_fd = fd is None
+        if fd is None:
+            fd = os.open('/dev/spidev{}.{}'.format(port, device), os.O_RDWR)
+        self._fd = fd
+        self._mode = 0
+        self.max_frames = max_frames
+
+        # Transmit buffer and one transfer per 32 bit frame, set up once
+        self._tx = ctypes.create_string_buffer(4 * max_frames)
+        self._tx_view = memoryview(self._tx).cast('B')
+        self._transfers = (SpiIocTransfer * max_frames)()
+        self._message = memoryview(self._transfers).cast('B')
+        tx_address = ctypes.addressof(self._tx)
+        for index, transfer in enumerate(self._transfers):
+            transfer.tx_buf = tx_address + 4 * index
+            transfer.len = 4
+            transfer.bits_per_word = 8
+            transfer.cs_change = 1
+
+        # Single transfer used by write() for arbitrary length data
+        self._single = SpiIocTransfer(tx_buf=tx_address, bits_per_word=8)
+        self._single_message = memoryview(self._single).cast('B')
+
+        self._ioctl(self._fd, SPI_IOC_WR_BITS_PER_WORD, bytes([8]))
+        self.set_mode(0)
+        self.set_clock_hz(max_speed_hz)
+
+    def set_clock_hz(self, hz):
+        """Set the SPI clock in hertz, up to the AD56x8 limit of 50 MHz."""
+
+        if not 0 < hz <= MAX_CLOCK_HZ:
+            raise ValueError('SpiDevBackend: clock must be in 1 Hz to {} Hz'
+                             .format(MAX_CLOCK_HZ))
+        self._ioctl(self._fd, SPI_IOC_WR_MAX_SPEED_HZ,
+                    int(hz).to_bytes(4, 'little'))
+        self._single.speed_hz = hz
+        for transfer in self._transfers:
+            transfer.speed_hz = hz
+        self.clock_hz = hz
+
+    def set_mode(self, mode):
+        """Set SPI mode 0, 1, 2 or 3 (clock polarity and phase)."""
+
+        if mode < 0 or mode > 3:
+            raise ValueError('Mode must be a value 0, 1, 2, or 3.')
+        self._mode = (self._mode & ~(SPI_CPOL | SPI_CPHA)) | mode
+        self._ioctl(self._fd, SPI_IOC_WR_MODE, bytes([self._mode]))
+
+    def set_bit_order(self, order):
+        """Set MSBFIRST or LSBFIRST bit order."""
+
+        if order == MSBFIRST:
+            lsb_first = 0
+        elif order == LSBFIRST:
+            lsb_first = 1
+        else:
+            raise ValueError('Order must be MSBFIRST or LSBFIRST.')
+        self._ioctl(self._fd, SPI_IOC_WR_LSB_FIRST, bytes([lsb_first]))
+
+    def write(self, data):
+        """Write data as a single transfer with CS held throughout.
+
+        Args:
+            data (bytes-like, list of int): bytes to clock out
+        """
+
+        if isinstance(data, list):
+            data = bytes(data)
+        length = len(data)
+        if length > len(self._tx):
+            buf = ctypes.create_string_buffer(bytes(data), length)
+            transfer = SpiIocTransfer(tx_buf=ctypes.addressof(buf), len=length,
+                                      speed_hz=self.clock_hz, bits_per_word=8)
+            self._ioctl(self._fd, SPI_IOC_MESSAGE(1),
+                        memoryview(transfer).cast('B'))
+            return
+
+        self._tx_view[:length] = memoryview(data).cast('B')
+        self._single.len = length
+        self._ioctl(self._fd, SPI_IOC_MESSAGE(1), self._single_message)
+
+    def write_frames(self, data):
+        """Write concatenated 32 bit frames, releasing CS after each frame.
+
+        Args:
+            data (bytes-like): whole number of 4 byte frames
+        """
+
+        data = memoryview(data).cast('B')
+        if len(data) % 4:
+            raise ValueError('SpiDevBackend: frame data must be a multiple '
+                             'of 4 bytes')
+
+        chunk = 4 * self.max_frames
+        size = ctypes.sizeof(SpiIocTransfer)
+        for offset in range(0, len(data), chunk):
+            block = data[offset:offset + chunk]
+            count = len(block) // 4
+            self._tx_view[:len(block)] = block
+
+            # CS stays asserted after the last transfer if cs_change is set
+            last = self._transfers[count - 1]
+            last.cs_change = 0
+            try:
+                self._ioctl(self._fd, SPI_IOC_MESSAGE(count),
+                            self._message[:count * size])
+            finally:
+                last.cs_change = 1
+
+    def close(self):
+        """Close the device node if this backend opened it."""
+
+        if self._fd is not None and self._owns_fd:
+            os.close(self._fd)
+        self._fd = None
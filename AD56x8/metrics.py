@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - metrics.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+
+from AD56x8.AD56x8 import MAX_CHANNELS
+from AD56x8.trace import COMMAND_NAMES
+
+'''
+Runtime metrics of AD56x8 devices.
+
+AD56x8.enable_metrics() wraps the device's SPI backend to count the frames
+and bytes of every command reaching the bus, Input Register writes per
+channel and the latency of each backend write call in a log2 bucketed
+histogram; validation errors raised by the commands are counted as well.
+While metrics are disabled the backend is not wrapped.
+
+snapshot() copies the counters into a dict; write_prometheus() writes the
+metrics of one or more devices in the Prometheus text exposition format,
+e.g. for the node_exporter textfile collector.
+'''
+
+# Commands carrying an Input Register write, counted per channel
+_INPUT_WRITES = (0x0, 0x2, 0x3)
+
+# Upper bounds of the write latency buckets: 1 us doubling up to ~1 s
+LATENCY_BUCKETS = tuple(2.0 ** k * 1e-6 for k in range(21))
+
+
+def _latency_bucket(seconds):
+    """Index of the first LATENCY_BUCKETS bound at or above seconds."""
+
+    if seconds <= LATENCY_BUCKETS[0]:
+        return 0
+    mantissa, exponent = math.frexp(seconds / LATENCY_BUCKETS[0])
+    if mantissa == 0.5:
+        exponent -= 1
+    return min(exponent, len(LATENCY_BUCKETS))
+
+
+class Metrics(object):
+
+    def __init__(self, device):
+        """Counters of one device.
+
+        Args:
+            device (str): device label used in the Prometheus output
+        """
+
+        self.device = device
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Reset every counter to zero."""
+
+        with self._lock:
+            self._frames = [0] * 16
+            self._channel_writes = [0] * 16
+            self._errors = {}
+            self._buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+            self._write_seconds = 0.0
+            self._writes = 0
+
+    def record_write(self, data, seconds):
+        """Count the frames of one backend write call taking seconds."""
+
+        frames = self._frames
+        channel_writes = self._channel_writes
+        with self._lock:
+            for offset in range(0, len(data) - 3, 4):
+                command = data[offset] & 0xF
+                frames[command] += 1
+                if command in _INPUT_WRITES:
+                    channel_writes[data[offset + 1] >> 4] += 1
+            self._buckets[_latency_bucket(seconds)] += 1
+            self._write_seconds += seconds
+            self._writes += 1
+
+    def record_error(self, error):
+        """Count a validation error of the given category."""
+
+        with self._lock:
+            self._errors[error] = self._errors.get(error, 0) + 1
+
+    def snapshot(self):
+        """Return a copy of the counters.
+
+        Returns:
+            dict: device; frames and bytes by command name; channel_writes
+            by channel number, or 'ALL_DAC'; errors by category; writes,
+            write_seconds and write_latency, the cumulative histogram as
+            (upper bound, count) pairs ending with infinity
+        """
+
+        with self._lock:
+            frames = list(self._frames)
+            channel_writes = list(self._channel_writes)
+            errors = dict(self._errors)
+            buckets = list(self._buckets)
+            write_seconds = self._write_seconds
+            writes = self._writes
+
+        channels = dict((channel, channel_writes[channel])
+                        for channel in range(MAX_CHANNELS))
+        channels['ALL_DAC'] = channel_writes[0xF]
+
+        cumulative = []
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+            total += count
+            cumulative.append((bound, total))
+
+        return {'device': self.device,
+                'frames': dict((name, frames[command])
+                               for command, name in COMMAND_NAMES.items()),
+                'bytes': dict((name, 4 * frames[command])
+                              for command, name in COMMAND_NAMES.items()),
+                'channel_writes': channels,
+                'errors': errors,
+                'writes': writes,
+                'write_seconds': write_seconds,
+                'write_latency': cumulative}
+
+    def prometheus(self):
+        """Return the counters in the Prometheus text format."""
+
+        return format_prometheus([self])
+
+
+class MetricsBackend(object):
+    """SPI backend wrapper feeding every write to a Metrics collector."""
+
+    wraps_spi = True
+
+    def __init__(self, spi, metrics, clock=time.perf_counter):
+        self.spi = spi
+        self._metrics = metrics
+        self._clock = clock
+        if hasattr(spi, 'write_frames'):
+            self.write_frames = self._write_frames
+
+    def __getattr__(self, name):
+        return getattr(self.spi, name)
+
+    def write(self, data):
+        clock = self._clock
+        start = clock()
+        self.spi.write(data)
+        self._metrics.record_write(bytes(data), clock() - start)
+
+    def _write_frames(self, data):
+        clock = self._clock
+        start = clock()
+        self.spi.write_frames(data)
+        self._metrics.record_write(bytes(data), clock() - start)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def format_prometheus(metrics):
+    """Format the counters of several devices in the Prometheus text format.
+
+    Args:
+        metrics (iterable of Metrics): one collector per device
+    """
+
+    snapshots = [m.snapshot() for m in metrics]
+    lines = []
+
+    def family(name, kind, text):
+        lines.append('# HELP {} {}'.format(name, text))
+        lines.append('# TYPE {} {}'.format(name, kind))
+
+    def sample(name, labels, value):
+        lines.append('{}{{{}}} {}'.format(
+            name, ','.join('{}="{}"'.format(key, _label(label))
+                           for key, label in labels), value))
+
+    for key, name, text in (
+            ('frames', 'ad56x8_frames_total', 'Frames written to the SPI bus.'),
+            ('bytes', 'ad56x8_bytes_total', 'Bytes written to the SPI bus.')):
+        family(name, 'counter', text)
+        for snap in snapshots:
+            for command, value in sorted(snap[key].items()):
+                sample(name, (('device', snap['device']),
+                              ('command', command)), value)
+
+    family('ad56x8_channel_writes_total', 'counter',
+           'Input Register writes per channel.')
+    for snap in snapshots:
+        for channel, value in sorted(snap['channel_writes'].items(),
+                                     key=lambda item: str(item[0])):
+            sample('ad56x8_channel_writes_total',
+                   (('device', snap['device']), ('channel', channel)), value)
+
+    family('ad56x8_validation_errors_total', 'counter',
+           'Commands rejected by argument validation.')
+    for snap in snapshots:
+        for error, value in sorted(snap['errors'].items()):
+            sample('ad56x8_validation_errors_total',
+                   (('device', snap['device']), ('error', error)), value)
+
+    family('ad56x8_write_seconds', 'histogram',
+           'Latency of SPI backend write calls.')
+    for snap in snapshots:
+        device = ('device', snap['device'])
+        for bound, count in snap['write_latency']:
+            le = '+Inf' if math.isinf(bound) else repr(bound)
+            sample('ad56x8_write_seconds_bucket', (device, ('le', le)), count)
+        sample('ad56x8_write_seconds_sum', (device,),
+               repr(snap['write_seconds']))
+        sample('ad56x8_write_seconds_count', (device,), snap['writes'])
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, metrics):
+    """Write the counters of several devices to a Prometheus text file.
+
+    The file is replaced atomically, so a scraper never reads a partial
+    file.
+
+    Args:
+        path (str): destination file
+        metrics (iterable of Metrics): one collector per device
+    """
+
+    text = format_prometheus(metrics)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(dir=directory, prefix='.ad56x8-', suffix='.prom')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
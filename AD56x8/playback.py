@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - playback.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import math
+import numbers
+import threading
+import time
+
+'''
+Timed arbitrary waveform playback for AD56x8 DACs.
+
+Sample k is written at the absolute deadline start + k / rate on a
+monotonic clock, so time spent writing or sleeping never accumulates as
+drift. A sample which starts more than late_tolerance after its deadline
+is still written, but counted as late.
+'''
+
+
+class PlaybackStats(object):
+    """Running statistics of a playback session.
+
+    Lateness is the time between a sample's deadline and the moment it was
+    written; jitter is reported as its mean, standard deviation and maximum.
+    """
+
+    def __init__(self, late_tolerance):
+        self.late_tolerance = late_tolerance
+        self.samples = 0
+        self.late = 0
+        self.first_time = None
+        self.last_time = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._max = 0.0
+
+    def record(self, now, lateness):
+        if self.first_time is None:
+            self.first_time = now
+        self.last_time = now
+        self.samples += 1
+        if lateness > self.late_tolerance:
+            self.late += 1
+        if lateness > self._max:
+            self._max = lateness
+        # Welford's running mean and variance
+        delta = lateness - self._mean
+        self._mean += delta / self.samples
+        self._m2 += delta * (lateness - self._mean)
+
+    def snapshot(self):
+        """Return the current statistics as a dict."""
+
+        elapsed = None
+        rate = None
+        if self.samples > 1:
+            elapsed = self.last_time - self.first_time
+            if elapsed > 0:
+                rate = (self.samples - 1) / elapsed
+        std = math.sqrt(self._m2 / self.samples) if self.samples else 0.0
+        return {'samples': self.samples,
+                'late': self.late,
+                'elapsed': elapsed,
+                'achieved_rate': rate,
+                'jitter_mean': self._mean,
+                'jitter_std': std,
+                'jitter_max': self._max}
+
+
+class Player(object):
+
+    def __init__(self, dac, samples, rate, channels=None, loop=False,
+                 late_tolerance=None, clock=time.monotonic, sleep=None):
+        """Stream samples to a DAC at a fixed sample rate.
+
+        Args:
+            dac (AD56x8): device to write to
+            samples (iterable): each sample is a DAC value for a single
+                channel, or a sequence with one DAC value per channel.
+                Must be re-iterable (e.g. a list) when loop is True.
+            rate (float): sample rate in Hz
+            channels (sequence): DAC Channels written by each sample,
+                defaults to DAC_A upwards
+            loop (bool): restart from the first sample at the end; playback
+                ends if a pass yields no samples
+            late_tolerance (float): seconds after its deadline at which a
+                sample counts as late, defaults to half a period
+            clock (callable): monotonic time source in seconds
+            sleep (callable): sleep(seconds), defaults to a wait which
+                stop() interrupts
+
+        Every sample is written with write_to_Input_Regs_update_all, so all
+        channels of a sample change together.
+        """
+
+        if rate <= 0:
+            raise ValueError('{}: Playback Error: Sample rate must be positive'
+                             .format(dac.device))
+        if loop and iter(samples) is samples:
+            raise ValueError('{}: Playback Error: Looping requires a '
+                             're-iterable sample source'.format(dac.device))
+
+        self._dac = dac
+        self._samples = samples
+        self._channels = None if channels is None else list(channels)
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.loop = loop
+        if late_tolerance is None:
+            late_tolerance = self.period / 2
+        self._clock = clock
+        self._sleep = sleep if sleep is not None else self._wait
+
+        self._stop = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._thread = None
+        self.stats = PlaybackStats(late_tolerance)
+        # Exception which ended background playback, if any
+        self.error = None
+
+    def _wait(self, seconds):
+        self._stop.wait(seconds)
+
+    def _write(self, sample):
+        if isinstance(sample, numbers.Integral):
+            sample = (int(sample),)
+        elif hasattr(sample, 'tolist'):
+            # NumPy rows; fixed width integers would overflow when shifted
+            sample = sample.tolist()
+        if self._channels is None:
+            self._channels = list(range(len(sample)))
+        self._dac.write_to_Input_Regs_update_all(self._channels, sample)
+
+    def run(self):
+        """Play the samples in the calling thread until they are exhausted
+        or stop() is called."""
+
+        clock = self._clock
+        period = self.period
+        start = clock()
+        index = 0
+
+        while not self._stop.is_set():
+            first = index
+            for sample in self._samples:
+                if not self._running.is_set():
+                    paused = clock()
+                    self._running.wait()
+                    # Shift the schedule so playback resumes where it paused
+                    start += clock() - paused
+                if self._stop.is_set():
+                    break
+
+                deadline = start + index * period
+                now = clock()
+                if now < deadline:
+                    self._sleep(deadline - now)
+                    if self._stop.is_set():
+                        break
+                    now = clock()
+
+                self._write(sample)
+                self.stats.record(now, now - deadline)
+                index += 1
+            if not self.loop or index == first:
+                # A pass without samples would otherwise spin forever
+                break
+
+    def start(self):
+        """Play the samples in a background thread. An exception ending
+        playback is kept in the error attribute."""
+
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('{}: Playback Error: Already playing'
+                               .format(self._dac.device))
+        self._stop.clear()
+        self._running.set()
+        self.error = None
+        self._thread = threading.Thread(target=self._run_background,
+                                        daemon=True)
+        self._thread.start()
+
+    def _run_background(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+
+    def pause(self):
+        """Hold the current output until resume() is called."""
+
+        self._running.clear()
+
+    def resume(self):
+        """Continue playback after pause()."""
+
+        self._running.set()
+
+    def stop(self, timeout=None):
+        """Stop playback and wait for the background thread to finish."""
+
+        self._stop.set()
+        self._running.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait for the background thread to finish playing."""
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def playing(self):
+        return self._thread is not None and self._thread.is_alive()
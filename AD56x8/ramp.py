@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - ramp.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from AD56x8.AD56x8 import DAC_CHANNELS, MAX_CHANNELS
+
+'''
+Slew-rate limited ramps of AD56x8 outputs on a background thread.
+
+ramp_to() returns at once with a Future which completes when every channel
+of the request has reached its target. A service thread advances all
+active ramps rate times per second, by at most slew codes per second each,
+and writes the channels which moved in one write_to_Input_Regs_update_all
+transfer, so all outputs change together on every tick.
+
+A channel follows one ramp at a time. Ramping a channel that is already
+moving retargets it from its current position; the earlier request's
+future is cancelled, while its other channels carry on to their targets.
+cancel(), or cancelling a returned future, holds the channels where they
+are. If a write fails, every active ramp's future gets the exception and
+the service thread stops; the error attribute keeps it and later ramp_to()
+calls raise RuntimeError.
+
+Ramps start from the last code the engine wrote to a channel, else from
+the initial codes, else from the device's shadow DAC registers. Values
+written to the device directly are not seen by the engine.
+'''
+
+ALL_DAC_ADDRESS = DAC_CHANNELS['ALL_DAC']
+
+
+class _Ramp(object):
+    """One ramp_to() request."""
+
+    def __init__(self, targets, slew):
+        self.targets = targets
+        self.slew = slew
+        self.remaining = set(targets)
+        self.superseded = False
+        self.future = Future()
+
+
+class RampEngine(object):
+
+    def __init__(self, dac, slew, rate=1000.0, initial=None,
+                 clock=time.monotonic, background=True):
+        """Background ramp service for one device.
+
+        Args:
+            dac (AD56x8): device to write to
+            slew (float): default slew rate in codes per second
+            rate (float): ticks per second of the service thread
+            initial (dict, sequence): starting DAC value per channel, by
+                channel name or number, or one value per channel from DAC_A
+            clock (callable): monotonic time source in seconds
+            background (bool): start the service thread on the first
+                ramp_to(); when False, drive the engine by calling tick()
+        """
+
+        if slew <= 0 or rate <= 0:
+            raise ValueError('{}: Ramp Error: Slew and tick rate must be '
+                             'positive'.format(dac.device))
+        self.dac = dac
+        self.slew = float(slew)
+        self.rate = float(rate)
+        self.clock = clock
+        self.background = background
+        self.ticks = 0
+        self.writes = 0
+
+        # Position of each channel by ADDR as a float code, None if unknown
+        self._position = [None] * MAX_CHANNELS
+        self._written = [None] * MAX_CHANNELS
+        if initial is not None:
+            if not hasattr(initial, 'items'):
+                initial = dict(enumerate(initial))
+            for channel, value in initial.items():
+                for address in self._addresses(channel):
+                    self._position[address] = float(self._check(value))
+                    self._written[address] = self._check(value)
+
+        # Active ramp of each channel by ADDR
+        self._active = {}
+        self._last = None
+        self._lock = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        # Exception which stopped the service thread, if any
+        self.error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _addresses(self, channel):
+        address = self.dac._channel_address(channel, 'Ramp Error')
+        if address == ALL_DAC_ADDRESS:
+            return range(MAX_CHANNELS)
+        return (address,)
+
+    def _check(self, value):
+        value = int(value)
+        if not 0 <= value < 1 << self.dac.DATA_WIDTH:
+            raise self.dac._validation_error(
+                'Ramp Error', '{}: Ramp Error: DAC value {} out of range'
+                .format(self.dac.device, value))
+        return value
+
+    def _start_position(self, address):
+        position = self._position[address]
+        if position is not None:
+            return position
+        shadow = self.dac.shadow
+        if shadow is not None and shadow.dac[address] is not None:
+            return float(shadow.dac[address] >> self.dac._data_shift)
+        raise self.dac._validation_error(
+            'Ramp Error', '{}: Ramp Error: Start of channel {} unknown, give '
+            'initial values or enable the shadow'.format(self.dac.device,
+                                                         address))
+
+    def ramp_to(self, targets, slew=None):
+        """Move channels to target DAC values at a limited slew rate.
+
+        Args:
+            targets (dict): target DAC value by channel name or number;
+                ALL_DAC sets every channel
+            slew (float): slew rate in codes per second for this request,
+                defaults to the engine's
+
+        Returns:
+            Future: resolves to a dict of final DAC value by ADDR once every
+            channel arrived, or is cancelled if the ramp is superseded,
+            cancelled or the engine stopped
+        """
+
+        slew = self.slew if slew is None else float(slew)
+        if slew <= 0:
+            raise self.dac._validation_error(
+                'Ramp Error', '{}: Ramp Error: Slew rate must be positive'
+                .format(self.dac.device))
+        resolved = {}
+        for channel, value in targets.items():
+            value = self._check(value)
+            for address in self._addresses(channel):
+                resolved[address] = value
+
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError('RampEngine: engine is stopped')
+            for address in resolved:
+                self._position[address] = self._start_position(address)
+
+            ramp = _Ramp(resolved, slew)
+            superseded = set()
+            for address in resolved:
+                previous = self._active.get(address)
+                if previous is not None:
+                    previous.remaining.discard(address)
+                    superseded.add(previous)
+                self._active[address] = ramp
+            for previous in superseded:
+                previous.superseded = True
+                previous.future.cancel()
+
+            if self._last is None:
+                self._last = self.clock()
+            self._lock.notify()
+        if self.background:
+            self.start()
+        return ramp.future
+
+    def cancel(self, channels=None):
+        """Stop ramping channels, holding them at their current positions.
+
+        Args:
+            channels (iterable): channel names or numbers, default all
+
+        Returns:
+            int: number of channels which were ramping
+        """
+
+        if channels is None:
+            addresses = list(range(MAX_CHANNELS))
+        else:
+            addresses = [address for channel in channels
+                         for address in self._addresses(channel)]
+        with self._lock:
+            ramps = set()
+            count = 0
+            for address in addresses:
+                ramp = self._active.pop(address, None)
+                if ramp is not None:
+                    ramp.remaining.discard(address)
+                    ramps.add(ramp)
+                    count += 1
+            for ramp in ramps:
+                ramp.future.cancel()
+        return count
+
+    def positions(self):
+        """Return the last DAC value written per ADDR, None if unknown."""
+
+        with self._lock:
+            return list(self._written)
+
+    @property
+    def busy(self):
+        """True while any channel is ramping."""
+
+        with self._lock:
+            return bool(self._active)
+
+    def tick(self):
+        """Advance every active ramp to the current time and write the
+        channels which moved in one transfer.
+
+        Called by the service thread; with background=False call it
+        directly to drive the engine from an existing loop.
+
+        Returns:
+            int: number of channels written
+        """
+
+        with self._lock:
+            now = self.clock()
+            elapsed = now - self._last if self._last is not None else 0.0
+            self._last = now
+            self.ticks += 1
+
+            done = []
+            channels = []
+            values = []
+            for address, ramp in sorted(self._active.items()):
+                if ramp.future.cancelled() and not ramp.superseded:
+                    # Cancelled by the caller: hold where it is
+                    done.append(address)
+                    continue
+                target = ramp.targets[address]
+                position = self._position[address]
+                step = ramp.slew * elapsed
+                if abs(target - position) <= step:
+                    position = float(target)
+                    done.append(address)
+                elif target > position:
+                    position += step
+                else:
+                    position -= step
+                self._position[address] = position
+
+                code = int(position + 0.5)
+                if code != self._written[address]:
+                    channels.append(address)
+                    values.append(code)
+
+            if channels:
+                try:
+                    self.dac.write_to_Input_Regs_update_all(channels, values)
+                except Exception as e:
+                    self._fail(e)
+                    raise
+                for address, code in zip(channels, values):
+                    self._written[address] = code
+                self.writes += 1
+
+            for address in done:
+                ramp = self._active.pop(address)
+                ramp.remaining.discard(address)
+                if not ramp.remaining and not ramp.future.done():
+                    ramp.future.set_result(dict(ramp.targets))
+            if not self._active:
+                self._last = None
+        return len(channels)
+
+    def _fail(self, error):
+        ramps = set(self._active.values())
+        self._active.clear()
+        self._last = None
+        for ramp in ramps:
+            if not ramp.future.done():
+                ramp.future.set_exception(error)
+
+    def start(self):
+        """Start the service thread; ramp_to() calls this itself when
+        background is True."""
+
+        with self._lock:
+            if self._thread is not None or self._stopping:
+                return
+            self._thread = threading.Thread(target=self._run,
+                                            name='AD56x8-ramp', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Cancel all ramps and stop the service thread."""
+
+        with self._lock:
+            self._stopping = True
+            self._lock.notify()
+        self._wakeup.set()
+        self.cancel()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self):
+        period = 1.0 / self.rate
+        deadline = None
+        while True:
+            with self._lock:
+                while not self._active and not self._stopping:
+                    deadline = None
+                    self._lock.wait()
+                if self._stopping:
+                    return
+            try:
+                self.tick()
+            except Exception as e:
+                # Futures of the failed ramps carry the error; stop rather
+                # than keep retrying a failing bus
+                with self._lock:
+                    self.error = e
+                    self._stopping = True
+                return
+
+            now = self.clock()
+            deadline = now + period if deadline is None else \
+                deadline + period
+            delay = deadline - now
+            if delay > 0:
+                self._wakeup.wait(delay)
+            else:
+                # Too slow for the tick rate; do not try to catch up
+                deadline = now
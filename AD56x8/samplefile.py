@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - samplefile.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import ast
+import mmap
+import struct
+import sys
+import threading
+from array import array
+
+from AD56x8.AD56x8 import (CHANNEL_ADDRESS, CMD_WRITE_AND_UPDATE_N,
+                           CMD_WRITE_INPUT_REG_N,
+                           CMD_WRITE_INPUT_RE_N_UPDATE_ALL, FRAME_DATA_BITS,
+                           FRAME_PREFIX)
+
+'''
+Memory-mapped waveform files for AD56x8 playback.
+
+Sample files hold DAC codes, samples x channels, either as a NumPy .npy
+array of integers or in the headered sample format below. The
+file is memory-mapped and read one chunk at a time, so only the chunk
+being played is ever copied into Python; NumPy is not needed to read
+either format.
+
+Sample format, little-endian:
+
+    magic     8 bytes  b'AD56SMP\\0'
+    version   uint16   1
+    channels  uint16   channels per sample
+    rate      float64  sample rate in Hz, 0 if unknown
+    samples   uint64   number of samples
+    reserved  4 bytes
+    codes     uint16   samples x channels
+
+A SampleCursor plays a file through Player with seek and loop regions:
+
+    with SampleFile('capture.npy') as waveform:
+        cursor = SampleCursor(waveform)
+        cursor.set_loop(1000, 5000)
+        Player(dac, cursor, rate=10000).start()
+'''
+
+SAMPLE_MAGIC = b'AD56SMP\0'
+SAMPLE_VERSION = 1
+SAMPLE_HEADER = struct.Struct('<8sHHdQ4x')
+
+NPY_MAGIC = b'\x93NUMPY'
+
+# Samples read from the file at a time
+DEFAULT_CHUNK = 4096
+
+_NATIVE = '<' if sys.byteorder == 'little' else '>'
+
+# Array typecodes by .npy kind and item size
+_TYPECODES = dict(((kind, array(code).itemsize), code)
+                  for kind, codes in (('u', 'QIHB'), ('i', 'qihb'))
+                  for code in codes)
+
+# Largest code of any DAC width
+MAX_CODE = 0xFFFF
+
+
+def _parse_npy(mapped, path):
+    """Return (descr, shape, data offset) of a .npy file."""
+
+    major = mapped[6]
+    if major == 1:
+        (length,) = struct.unpack('<H', mapped[8:10])
+        offset = 10
+    elif major in (2, 3):
+        (length,) = struct.unpack('<I', mapped[8:12])
+        offset = 12
+    else:
+        raise ValueError('{}: Unsupported .npy version {}'.format(path, major))
+
+    header = ast.literal_eval(mapped[offset:offset + length].decode('latin1'))
+    if header.get('fortran_order'):
+        raise ValueError('{}: Fortran ordered arrays are not supported'
+                         .format(path))
+    return header['descr'], tuple(header['shape']), offset + length
+
+
+def write_sample_file(path, samples, channels=1, rate=None):
+    """Write codes to a file in the sample format, streaming from an
+    iterable so the whole waveform never has to be in memory.
+
+    Args:
+        path (str): destination file
+        samples (iterable): an int code per sample for one channel, or a
+            sequence of channels codes per sample
+        channels (int): codes per sample
+        rate (float): sample rate in Hz stored in the header
+
+    Returns:
+        int: number of samples written
+    """
+
+    if channels < 1:
+        raise ValueError('{}: No channels in sample file'.format(path))
+    count = 0
+    codes = array(_TYPECODES['u', 2])
+    with open(path, 'wb') as f:
+        f.write(SAMPLE_HEADER.pack(SAMPLE_MAGIC, SAMPLE_VERSION, channels,
+                                   rate or 0.0, 0))
+        for sample in samples:
+            if channels == 1 and isinstance(sample, int):
+                codes.append(sample)
+            else:
+                if len(sample) != channels:
+                    raise ValueError('{}: Sample {} has {} codes, expected {}'
+                                     .format(path, count, len(sample),
+                                             channels))
+                codes.extend(sample)
+            count += 1
+            if len(codes) >= DEFAULT_CHUNK * channels:
+                _write_codes(f, codes)
+                del codes[:]
+        _write_codes(f, codes)
+
+        f.seek(0)
+        f.write(SAMPLE_HEADER.pack(SAMPLE_MAGIC, SAMPLE_VERSION, channels,
+                                   rate or 0.0, count))
+    return count
+
+
+def _write_codes(f, codes):
+    if _NATIVE != '<':
+        codes = array(codes.typecode, codes)
+        codes.byteswap()
+    codes.tofile(f)
+
+
+class SampleFile(object):
+
+    def __init__(self, path):
+        """Memory-mapped sample file.
+
+        Args:
+            path (str): .npy file of unsigned integer codes, 1-D or
+                samples x channels, or a file in the sample format
+
+        Attributes:
+            samples (int): number of samples
+            channels (int): codes per sample
+            rate (float): sample rate stored in the file, None if unknown
+        """
+
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError('{}: Not a sample file'.format(path))
+
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        mapped = self._mmap
+        self.rate = None
+
+        if mapped[:6] == NPY_MAGIC:
+            descr, shape, offset = _parse_npy(mapped, self.path)
+            order, kind, size = descr[0], descr[1], int(descr[2:])
+            if (kind, size) not in _TYPECODES:
+                raise ValueError('{}: Codes must be integers, not {}'
+                                 .format(self.path, descr))
+            if len(shape) == 1:
+                shape += (1,)
+            elif len(shape) != 2:
+                raise ValueError('{}: Codes must be 1-D or 2-D (samples x '
+                                 'channels)'.format(self.path))
+            self.samples, self.channels = shape
+            self._typecode = _TYPECODES[kind, size]
+            # Signed and 64 bit codes may not fit a DAC; checked on read
+            self._check_range = kind == 'i' or size > 2
+            self._swap = size > 1 and order != '|' and order != _NATIVE \
+                and order != '='
+        elif mapped[:8] == SAMPLE_MAGIC:
+            _, version, channels, rate, samples = \
+                SAMPLE_HEADER.unpack_from(mapped)
+            if version != SAMPLE_VERSION:
+                raise ValueError('{}: Unsupported sample file version {}'
+                                 .format(self.path, version))
+            self.samples, self.channels = samples, channels
+            self.rate = rate or None
+            self._typecode = _TYPECODES['u', 2]
+            self._check_range = False
+            self._swap = _NATIVE != '<'
+            offset = SAMPLE_HEADER.size
+        else:
+            raise ValueError('{}: Not a sample file'.format(self.path))
+
+        if self.channels < 1:
+            raise ValueError('{}: No channels in sample file'
+                             .format(self.path))
+        self._itemsize = array(self._typecode).itemsize
+        self._offset = offset
+        self._stride = self._itemsize * self.channels
+        if offset + self.samples * self._stride > len(mapped):
+            raise ValueError('{}: Sample file is truncated'.format(self.path))
+
+    def __len__(self):
+        return self.samples
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def read(self, start, count):
+        """Return the codes of count samples from start, flattened
+        sample-major, as an array."""
+
+        start = max(0, min(start, self.samples))
+        stop = max(start, min(start + count, self.samples))
+        codes = array(self._typecode)
+        begin = self._offset + start * self._stride
+        codes.frombytes(self._mmap[begin:self._offset + stop * self._stride])
+        if self._swap:
+            codes.byteswap()
+        if self._check_range and codes and \
+                (min(codes) < 0 or max(codes) > MAX_CODE):
+            raise ValueError('{}: Codes outside 0 to {} in samples {} to {}'
+                             .format(self.path, MAX_CODE, start, stop))
+        return codes
+
+    def chunks(self, start=0, stop=None, chunk=DEFAULT_CHUNK):
+        """Yield the codes of samples start to stop, chunk samples at a
+        time, as flat arrays."""
+
+        if stop is None or stop > self.samples:
+            stop = self.samples
+        for begin in range(start, stop, chunk):
+            yield self.read(begin, min(chunk, stop - begin))
+
+    def frames(self, dac, channels=None, start=0, stop=None,
+               chunk=DEFAULT_CHUNK):
+        """Yield the samples start to stop encoded as frames for dac, one
+        list of frames per chunk.
+
+        Every sample is encoded like write_to_Input_Regs_update_all, so all
+        its channels change together; single channel files use the write
+        and update channel N command.
+
+        Args:
+            dac (AD56x8): device the frames are for
+            channels (sequence): DAC Channel of each column, defaults to
+                DAC_A upwards
+        """
+
+        if channels is None:
+            channels = range(self.channels)
+        channels = list(channels)
+        if len(channels) != self.channels:
+            raise ValueError('{}: Input Reg Error: {} channels given for {} '
+                             'columns'.format(dac.device, len(channels),
+                                              self.channels))
+        if self.channels == 1:
+            commands = [CMD_WRITE_AND_UPDATE_N]
+        else:
+            commands = [CMD_WRITE_INPUT_REG_N] * (self.channels - 1) + \
+                [CMD_WRITE_INPUT_RE_N_UPDATE_ALL]
+
+        prefixes = []
+        for command, channel in zip(commands, channels):
+            address = CHANNEL_ADDRESS.get(channel)
+            if address is None:
+                raise ValueError('{}: Input Reg Error: Bad DAC channel '
+                                 'selection'.format(dac.device))
+            prefixes.append(FRAME_PREFIX[command][address])
+
+        shift = FRAME_DATA_BITS - dac.DATA_WIDTH
+        top = (1 << dac.DATA_WIDTH) - 1
+        width = self.channels
+        for codes in self.chunks(start, stop, chunk):
+            yield [prefixes[index % width] | (min(code, top) << shift)
+                   for index, code in enumerate(codes)]
+
+    def stream(self, dac, channels=None, start=0, stop=None,
+               chunk=DEFAULT_CHUNK):
+        """Write samples start to stop to dac as fast as the bus allows,
+        one bulk transfer per chunk."""
+
+        for frames in self.frames(dac, channels, start, stop, chunk):
+            dac.write_frames(frames)
+
+
+class SampleCursor(object):
+
+    def __init__(self, sample_file, chunk=DEFAULT_CHUNK):
+        """Seekable sample source with an optional loop region, for Player.
+
+        Args:
+            sample_file (SampleFile): file to play
+            chunk (int): samples read from the file at a time
+
+        Iterating yields samples from the current position: an int for
+        single channel files, otherwise a tuple of codes. An iteration
+        starting at the end of the file starts over from the first sample,
+        so Player(loop=True) repeats the whole file; use set_loop() for
+        loop regions and counts. seek() and set_loop() take effect at the
+        next sample, also while playing.
+        """
+
+        self._file = sample_file
+        self._chunk = chunk
+        self._lock = threading.Lock()
+        self.position = 0
+        self._seek = None
+        self._loop = None
+
+    def seek(self, index):
+        """Continue from sample index."""
+
+        if not 0 <= index <= self._file.samples:
+            raise ValueError('{}: Seek position {} outside 0 to {}'
+                             .format(self._file.path, index,
+                                     self._file.samples))
+        with self._lock:
+            self._seek = index
+
+    def set_loop(self, start=0, stop=None, count=None):
+        """Repeat samples start to stop when playback reaches stop.
+
+        Args:
+            start (int): first sample of the loop region
+            stop (int): end of the loop region, defaults to the file end
+            count (int): repetitions before playback continues past stop,
+                None to loop until clear_loop()
+        """
+
+        if stop is None:
+            stop = self._file.samples
+        if not 0 <= start < stop <= self._file.samples:
+            raise ValueError('{}: Bad loop region {} to {}'
+                             .format(self._file.path, start, stop))
+        with self._lock:
+            self._loop = [start, stop, count]
+
+    def clear_loop(self):
+        """Play on past the end of the loop region."""
+
+        with self._lock:
+            self._loop = None
+
+    def _next_jump(self, position):
+        """Apply pending seeks and loops; returns the position to read."""
+
+        with self._lock:
+            if self._seek is not None:
+                position, self._seek = self._seek, None
+            elif self._loop is not None and position == self._loop[1]:
+                loop = self._loop
+                if loop[2] is None or loop[2] > 0:
+                    position = loop[0]
+                    if loop[2] is not None:
+                        loop[2] -= 1
+        return position
+
+    def __iter__(self):
+        read = self._file.read
+        width = self._file.channels
+        samples = self._file.samples
+        position = self.position
+        if position >= samples:
+            position = 0
+
+        while True:
+            position = self._next_jump(position)
+            if position >= samples:
+                self.position = position
+                return
+            # Stop each chunk at the loop end so the jump is not missed
+            count = self._chunk
+            with self._lock:
+                if self._loop is not None and position < self._loop[1]:
+                    count = min(count, self._loop[1] - position)
+            codes = read(position, count)
+
+            for offset in range(0, len(codes), width):
+                if self._seek is not None:
+                    break
+                if width == 1:
+                    yield codes[offset]
+                else:
+                    yield tuple(codes[offset:offset + width])
+                position += 1
+                self.position = position
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - shadow.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from AD56x8.AD56x8 import (CMD_LOAD_CLEAR_CODE_REG, CMD_LOAD_LDAC_REG,
+                           CMD_PWR_DOWN_UP_DAC, CMD_RESET,
+                           CMD_SETUP_INT_REF_REG, CMD_UPDATE_DAC_REG_N,
+                           CMD_WRITE_AND_UPDATE_N, CMD_WRITE_INPUT_REG_N,
+                           CMD_WRITE_INPUT_RE_N_UPDATE_ALL, FRAME_DATA_BITS,
+                           FRAME_DATA_MASK, MAX_CHANNELS)
+
+'''
+Shadow copy of the AD56x8 register state, as written by this host.
+
+The DAC has no readback, so the shadow only knows what it has seen written
+since construction or the last reset; anything else is unknown (None) and
+frames touching unknown state are always sent. Input and DAC registers are
+held as raw 20 bit DATA fields, so the model is the same for every DAC
+width.
+'''
+
+ALL_CHANNELS = tuple(range(MAX_CHANNELS))
+ALL_DAC_ADDRESS = 0xF
+
+
+class ShadowRegisters(object):
+
+    def __init__(self):
+        """Shadow register model with counters of sent and elided frames.
+
+        Attributes:
+            input (list): Input Register DATA field per channel
+            dac (list): DAC Register DATA field per channel
+            power_down (list): PD_MODE per channel
+            ldac (int): LDAC register channel mask
+            clear_code (int): CC_MODE
+            iref (int): IREF bit
+            sent (int): frames which changed, or may have changed, state
+            elided (int): frames skipped as redundant
+        """
+
+        self.sent = 0
+        self.elided = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget all register state, e.g. after a reset."""
+
+        self.input = [None] * MAX_CHANNELS
+        self.dac = [None] * MAX_CHANNELS
+        self.power_down = [None] * MAX_CHANNELS
+        self.ldac = None
+        self.clear_code = None
+        self.iref = None
+
+    @staticmethod
+    def _targets(address):
+        if address == ALL_DAC_ADDRESS:
+            return ALL_CHANNELS
+        if address < MAX_CHANNELS:
+            return (address,)
+        return ()
+
+    def apply(self, frame):
+        """Update the model with a frame about to be written.
+
+        Args:
+            frame (int): 32 bit frame
+
+        Returns:
+            bool: True if the frame must be sent, False if it would leave
+            the device state unchanged
+        """
+
+        command = (frame >> 24) & 0xF
+        data = frame & FRAME_DATA_MASK
+        redundant = False
+
+        if command <= CMD_WRITE_AND_UPDATE_N:
+            targets = self._targets((frame >> FRAME_DATA_BITS) & 0xF)
+            redundant = self._apply_input(command, targets, data)
+        elif command == CMD_PWR_DOWN_UP_DAC:
+            mode = (data >> 8) & 0x3
+            targets = [ch for ch in ALL_CHANNELS if data & (1 << ch)]
+            redundant = all(self.power_down[ch] == mode for ch in targets)
+            for ch in targets:
+                self.power_down[ch] = mode
+        elif command == CMD_LOAD_CLEAR_CODE_REG:
+            redundant = self.clear_code == data & 0x3
+            self.clear_code = data & 0x3
+        elif command == CMD_LOAD_LDAC_REG:
+            redundant = self.ldac == data & 0xff
+            self.ldac = data & 0xff
+        elif command == CMD_RESET:
+            self.invalidate()
+        elif command == CMD_SETUP_INT_REF_REG:
+            redundant = self.iref == data & 0x1
+            self.iref = data & 0x1
+
+        if redundant:
+            self.elided += 1
+            return False
+        self.sent += 1
+        return True
+
+    def _apply_input(self, command, targets, data):
+        """Input and DAC Register commands, returns True when redundant."""
+
+        inputs = self.input
+        dacs = self.dac
+        if not targets:
+            return False
+
+        if command == CMD_WRITE_INPUT_REG_N:
+            # Channels with their LDAC bit set update immediately, so the
+            # write is only redundant if the DAC register holds the value
+            # too; otherwise the /LDAC pin decides, and rewriting the Input
+            # Register with its value cannot change the output
+            ldac = self.ldac or 0
+            redundant = all(inputs[ch] == data and
+                            (not ldac & (1 << ch) or dacs[ch] == data)
+                            for ch in targets)
+            for ch in targets:
+                inputs[ch] = data
+                if ldac & (1 << ch):
+                    dacs[ch] = data
+                elif dacs[ch] != data:
+                    dacs[ch] = None
+            return redundant
+
+        if command == CMD_UPDATE_DAC_REG_N:
+            redundant = all(inputs[ch] is not None and dacs[ch] == inputs[ch]
+                            for ch in targets)
+            for ch in targets:
+                dacs[ch] = inputs[ch]
+            return redundant
+
+        if command == CMD_WRITE_INPUT_RE_N_UPDATE_ALL:
+            redundant = all(inputs[ch] == data for ch in targets)
+            for ch in targets:
+                inputs[ch] = data
+            redundant = redundant and all(
+                inputs[ch] is not None and dacs[ch] == inputs[ch]
+                for ch in ALL_CHANNELS)
+            dacs[:] = inputs
+            return redundant
+
+        # CMD_WRITE_AND_UPDATE_N
+        redundant = all(inputs[ch] == data and dacs[ch] == data
+                        for ch in targets)
+        for ch in targets:
+            inputs[ch] = data
+            dacs[ch] = data
+        return redundant
+
+    def snapshot(self):
+        """Return the counters and known register state as a dict."""
+
+        return {'sent': self.sent,
+                'elided': self.elided,
+                'input': list(self.input),
+                'dac': list(self.dac),
+                'power_down': list(self.power_down),
+                'ldac': self.ldac,
+                'clear_code': self.clear_code,
+                'iref': self.iref}
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - trace.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import threading
+import time
+from array import array
+
+from AD56x8 import AD56x8 as _AD56x8
+
+'''
+Per-frame tracing of AD56x8 SPI traffic.
+
+AD56x8.enable_tracing(tracer) wraps the device's SPI backend so every frame
+is recorded with its start time, device and transfer duration in a
+FrameTracer ring buffer; the oldest records are overwritten once it is
+full. While tracing is disabled the backend is not wrapped, so there is no
+cost at all on the write path.
+
+Traces export to the Chrome trace event format, which chrome://tracing and
+Perfetto open directly.
+'''
+
+# CMD_* constant values to names
+COMMAND_NAMES = dict((value, name) for name, value in vars(_AD56x8).items()
+                     if name.startswith('CMD_'))
+
+
+def decode_frame(frame):
+    """Split a 32 bit frame into its command and fields.
+
+    Args:
+        frame (int): 32 bit frame
+
+    Returns:
+        dict: command (int), name (CMD_* constant name), address (ADDR
+        field) and data (20 bit DATA field)
+    """
+
+    command = (frame >> 24) & 0xF
+    return {'command': command,
+            'name': COMMAND_NAMES.get(command, 'CMD_0x{:X}'.format(command)),
+            'address': (frame >> _AD56x8.FRAME_DATA_BITS) & 0xF,
+            'data': frame & _AD56x8.FRAME_DATA_MASK}
+
+
+class FrameTracer(object):
+
+    def __init__(self, capacity=65536, clock=time.perf_counter):
+        """Fixed-size ring buffer of frame records.
+
+        Args:
+            capacity (int): records kept before the oldest are overwritten
+            clock (callable): monotonic clock in seconds
+        """
+
+        if capacity < 1:
+            raise ValueError('FrameTracer: capacity must be at least 1')
+        self.capacity = capacity
+        self.clock = clock
+        self._time = array('d', bytes(8 * capacity))
+        self._duration = array('d', bytes(8 * capacity))
+        self._frame = array('I', [0]) * capacity
+        self._device = array('H', [0]) * capacity
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self.devices = []
+
+    def register(self, name):
+        """Add a device name and return its id for record()."""
+
+        with self._lock:
+            self.devices.append(name)
+            return len(self.devices) - 1
+
+    def record(self, device, frame, start, duration):
+        """Record one frame written by device at start, taking duration."""
+
+        with self._lock:
+            index = self._next
+            self._time[index] = start
+            self._duration[index] = duration
+            self._frame[index] = frame
+            self._device[index] = device
+            self._next = (index + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            self._next = 0
+            self._count = 0
+
+    def records(self):
+        """Return the recorded frames, oldest first, as a list of tuples
+        (timestamp, device name, frame, duration)."""
+
+        return [(timestamp, self.devices[device], frame, duration)
+                for timestamp, device, frame, duration in self._records()]
+
+    def _records(self):
+        """records() with registered device ids instead of names."""
+
+        with self._lock:
+            start = (self._next - self._count) % self.capacity
+            indices = [(start + i) % self.capacity for i in range(self._count)]
+            return [(self._time[i], self._device[i], self._frame[i],
+                     self._duration[i]) for i in indices]
+
+    def chrome_trace(self):
+        """Return the records as a Chrome trace event dict."""
+
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid,
+                   'args': {'name': str(name)}}
+                  for tid, name in enumerate(self.devices)]
+        # Device ids, not names, so devices of one model get separate tracks
+        for timestamp, device, frame, duration in self._records():
+            fields = decode_frame(frame)
+            events.append({'name': fields['name'],
+                           'cat': 'spi',
+                           'ph': 'X',
+                           'pid': 0,
+                           'tid': device,
+                           'ts': timestamp * 1e6,
+                           'dur': duration * 1e6,
+                           'args': {'channel': fields['address'],
+                                    'data': fields['data'],
+                                    'frame': '0x{:08X}'.format(frame)}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ns'}
+
+    def write_chrome_trace(self, path):
+        """Write the records to path as Chrome trace JSON."""
+
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class TracingBackend(object):
+    """SPI backend wrapper recording every frame in a FrameTracer."""
+
+    wraps_spi = True
+
+    def __init__(self, spi, tracer, device):
+        self.spi = spi
+        self._tracer = tracer
+        self._device = device
+        if hasattr(spi, 'write_frames'):
+            self.write_frames = self._write_frames
+
+    def __getattr__(self, name):
+        return getattr(self.spi, name)
+
+    def write(self, data):
+        clock = self._tracer.clock
+        start = clock()
+        self.spi.write(data)
+        duration = clock() - start
+        self._record(bytes(data), start, duration)
+
+    def _write_frames(self, data):
+        clock = self._tracer.clock
+        start = clock()
+        self.spi.write_frames(data)
+        duration = clock() - start
+        self._record(bytes(data), start, duration)
+
+    def _record(self, data, start, duration):
+        # Frames of one transfer share its duration evenly
+        count = len(data) // 4
+        if not count:
+            return
+        share = duration / count
+        record = self._tracer.record
+        for index in range(count):
+            frame = int.from_bytes(data[4 * index:4 * index + 4], 'big')
+            record(self._device, frame, start + index * share, share)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - vectorized.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import numpy as np
+
+from AD56x8.AD56x8 import (AD56x8_MODEL_PARAMS, CHANNEL_ADDRESS,
+                           CMD_WRITE_AND_UPDATE_N, CMD_WRITE_INPUT_REG_N,
+                           CMD_WRITE_INPUT_RE_N_UPDATE_ALL, FRAME_DATA_BITS,
+                           FRAME_PREFIX)
+
+'''
+Vectorized conversion of whole waveforms to AD56x8 frames using NumPy.
+
+Samples are given either as a 1-D array for a single channel or as a 2-D
+array of samples x channels, and are returned as one contiguous buffer of
+big-endian 32 bit frames ready to be written to the SPI bus.
+
+For 2-D input each sample row is encoded as Input Register writes for all
+but the last channel, followed by a write to the last channel which
+updates all DAC registers, so every channel of a sample changes together.
+1-D input uses the write and update channel N command.
+'''
+
+# Output amplifier gain applied to the internal reference
+INTERNAL_REF_GAIN = 2
+
+# Frames are clocked out MSB first
+FRAME_DTYPE = np.dtype('>u4')
+
+
+def _model_params(dac_model):
+    if dac_model not in AD56x8_MODEL_PARAMS:
+        raise ValueError('AD56x8: DAC model specified not in known set')
+    return AD56x8_MODEL_PARAMS[dac_model]
+
+
+def volts_to_codes(dac_model, volts, vref=None, gain=INTERNAL_REF_GAIN):
+    """Convert output voltages to DAC codes, clamped to the DAC range.
+
+    Args:
+        dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+        volts (array_like): desired output voltages
+        vref (float): reference voltage, defaults to the model's VREF
+        gain (float): output gain applied to vref
+
+    Returns:
+        numpy.ndarray: uint32 codes with the same shape as volts
+    """
+
+    params = _model_params(dac_model)
+    if vref is None:
+        vref = params['VREF']
+    full_code = 1 << params['DATA_WIDTH']
+
+    codes = np.asarray(volts, dtype=np.float64) * (full_code / (vref * gain))
+    np.rint(codes, out=codes)
+    np.clip(codes, 0, full_code - 1, out=codes)
+    return codes.astype(np.uint32)
+
+
+def codes_to_frames(dac_model, codes, channels=None, command=None):
+    """Encode DAC codes as a contiguous buffer of big-endian frames.
+
+    Args:
+        dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+        codes (array_like): 1-D codes for one channel, or 2-D samples x
+            channels; values are clamped to the DAC range
+        channels: DAC Channel (str, int) for 1-D codes, or a sequence of
+            channels matching the columns of 2-D codes. Defaults to DAC_A
+            or to the first columns' channels in order.
+        command (const): command constant used for every frame, overriding
+            the default synchronized encoding
+
+    Returns:
+        numpy.ndarray: 1-D '>u4' frames, sample-major
+    """
+
+    params = _model_params(dac_model)
+    data_width = params['DATA_WIDTH']
+
+    codes = np.asarray(codes)
+    if codes.ndim == 1:
+        if channels is None:
+            channels = 0
+        channels = [channels]
+        codes = codes.reshape(-1, 1)
+        commands = [CMD_WRITE_AND_UPDATE_N]
+    elif codes.ndim == 2:
+        if channels is None:
+            channels = range(codes.shape[1])
+        channels = list(channels)
+        commands = [CMD_WRITE_INPUT_REG_N] * (len(channels) - 1) + \
+            [CMD_WRITE_INPUT_RE_N_UPDATE_ALL]
+    else:
+        raise ValueError('{}: Codes must be 1-D or 2-D (samples x channels)'
+                         .format(dac_model))
+
+    if len(channels) != codes.shape[1]:
+        raise ValueError('{}: {} channels given for {} columns of codes'
+                         .format(dac_model, len(channels), codes.shape[1]))
+    if command is not None:
+        commands = [command] * len(channels)
+
+    prefixes = np.empty(len(channels), dtype=np.uint32)
+    for column, (cmd, channel) in enumerate(zip(commands, channels)):
+        address = CHANNEL_ADDRESS.get(channel)
+        if address is None:
+            raise ValueError('{}: Input Reg Error: Bad DAC channel selection'
+                             .format(dac_model))
+        prefixes[column] = FRAME_PREFIX[cmd][address]
+
+    data = np.clip(codes, 0, (1 << data_width) - 1).astype(np.uint32)
+    data <<= FRAME_DATA_BITS - data_width
+    data |= prefixes
+
+    return data.astype(FRAME_DTYPE).ravel()
+
+
+def volts_to_frames(dac_model, volts, channels=None, vref=None,
+                    gain=INTERNAL_REF_GAIN, command=None):
+    """Encode output voltages as a contiguous buffer of big-endian frames.
+
+    Args:
+        dac_model (str): DAC model, key of AD56x8_MODEL_PARAMS
+        volts (array_like): 1-D voltages for one channel, or 2-D samples x
+            channels
+        channels: see codes_to_frames()
+        vref (float): reference voltage, defaults to the model's VREF
+        gain (float): output gain applied to vref
+        command (const): see codes_to_frames()
+
+    Returns:
+        numpy.ndarray: 1-D '>u4' frames, sample-major
+    """
+
+    codes = volts_to_codes(dac_model, volts, vref=vref, gain=gain)
+    return codes_to_frames(dac_model, codes, channels=channels,
+                           command=command)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - waveforms.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from AD56x8.vectorized import INTERNAL_REF_GAIN, volts_to_codes
+
+'''
+Cached waveform code tables for AD56x8 DACs, using NumPy.
+
+A table holds one period of a shape as DAC codes for a given model,
+generated vectorized from amplitude and offset in volts. Tables are kept
+in a bounded LRU cache keyed by every parameter, so calibration sweeps
+and playback sessions asking for the same waveform share one read-only
+array instead of regenerating it:
+
+    table = waveform('sine', 1000, 1.0, 1.25, 100000, 'AD5628-1')
+    Player(dac, table, rate=100000, loop=True)
+'''
+
+# Unit shapes over one period: phase in [0, 1) to values in [-1, 1]
+SHAPES = {'sine': lambda phase: np.sin(2 * np.pi * phase),
+          'triangle': lambda phase: 1 - 4 * np.abs(phase - 0.5),
+          'ramp': lambda phase: 2 * phase - 1,
+          'step': lambda phase: np.where(phase < 0.5, -1.0, 1.0)}
+
+
+def generate(shape, frequency, amplitude, offset, rate, model, vref=None,
+             gain=INTERNAL_REF_GAIN):
+    """Generate one period of a waveform as DAC codes.
+
+    Args:
+        shape (str): key of SHAPES
+        frequency (float): waveform frequency in Hz
+        amplitude (float): peak amplitude in volts
+        offset (float): center voltage in volts
+        rate (float): sample rate in Hz; a period is the nearest whole
+            number of samples to rate / frequency
+        model (str): DAC model, key of AD56x8_MODEL_PARAMS
+        vref (float): reference voltage, defaults to the model's VREF
+        gain (float): output gain applied to vref
+
+    Returns:
+        numpy.ndarray: uint32 codes, clamped to the DAC range
+    """
+
+    if shape not in SHAPES:
+        raise ValueError('{}: Unknown waveform shape {!r}'
+                         .format(model, shape))
+    if frequency <= 0 or rate <= 0:
+        raise ValueError('{}: Frequency and sample rate must be positive'
+                         .format(model))
+    length = int(round(rate / frequency))
+    if length < 2:
+        raise ValueError('{}: Sample rate {} Hz is too low for {} Hz'
+                         .format(model, rate, frequency))
+
+    phase = np.arange(length, dtype=np.float64) / length
+    volts = offset + amplitude * SHAPES[shape](phase)
+    return volts_to_codes(model, volts, vref=vref, gain=gain)
+
+
+class WaveformCache(object):
+
+    def __init__(self, maxsize=64):
+        """LRU cache of read-only waveform tables.
+
+        Args:
+            maxsize (int): tables kept before the least recently used is
+                evicted
+        """
+
+        if maxsize < 1:
+            raise ValueError('WaveformCache: maxsize must be at least 1')
+        self.maxsize = maxsize
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, shape, frequency, amplitude, offset, rate, model, vref=None,
+            gain=INTERNAL_REF_GAIN):
+        """Return a cached table, generating it on a miss.
+
+        Takes the arguments of generate(); model may also be an AD56x8
+        device. The returned array is read-only and shared by every
+        caller asking for the same waveform.
+        """
+
+        model = getattr(model, 'device', model)
+        key = (shape, float(frequency), float(amplitude), float(offset),
+               float(rate), model, vref, gain)
+
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+
+        # Generate outside the lock; a concurrent miss on the same key
+        # only costs a duplicate generation
+        table = generate(shape, frequency, amplitude, offset, rate, model,
+                         vref=vref, gain=gain)
+        table.setflags(write=False)
+
+        with self._lock:
+            existing = self._tables.get(key)
+            if existing is not None:
+                return existing
+            self._tables[key] = table
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+                self.evictions += 1
+        return table
+
+    def clear(self):
+        """Drop every table; statistics are kept."""
+
+        with self._lock:
+            self._tables.clear()
+
+    def stats(self):
+        """Return hits, misses, evictions, tables held and their size in
+        bytes."""
+
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'size': len(self._tables),
+                    'bytes': sum(table.nbytes
+                                 for table in self._tables.values())}
+
+
+# Cache used by waveform()
+default_cache = WaveformCache()
+
+
+def waveform(shape, frequency, amplitude, offset, rate, model, vref=None,
+             gain=INTERNAL_REF_GAIN):
+    """Return a read-only table from the default cache, see generate()."""
+
+    return default_cache.get(shape, frequency, amplitude, offset, rate, model,
+                             vref=vref, gain=gain)
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - worker.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import atexit
+import multiprocessing
+import numbers
+import os
+import signal
+import struct
+import time
+from multiprocessing import shared_memory
+
+from AD56x8.AD56x8 import (CHANNEL_ADDRESS, CMD_WRITE_AND_UPDATE_N,
+                           CMD_WRITE_INPUT_REG_N,
+                           CMD_WRITE_INPUT_RE_N_UPDATE_ALL, FRAME_DATA_BITS,
+                           FRAME_PREFIX, PD_MODES)
+
+'''
+Out-of-process DAC output worker.
+
+The worker process owns the AD56x8 instance and plays samples at a fixed
+rate from a single-producer single-consumer ring buffer in shared memory,
+so garbage collection and GIL contention in the application never delay
+the output. The parent encodes samples to frames and appends them to the
+ring; neither side takes a lock. The head (samples produced) and tail
+(samples consumed) counters only ever increase, and each is written by
+one side only: the producer fills a slot before advancing head, the
+worker writes the slot out before advancing tail.
+
+When the ring runs dry at a sample deadline an underrun is counted and
+the schedule restarts from the next sample to arrive. On stop(), on an
+error, or when the parent process disappears, the worker leaves the DAC
+in the configured safe state before exiting.
+
+The dac_factory is called in the worker process and must be picklable
+for the spawn start method, e.g. a module level function or
+functools.partial(AD56x8, 'AD5628-1', spi=...).
+'''
+
+# Shared memory layout, in bytes; counters in separate cache lines
+_HEAD = 0
+_TAIL = 64
+_STATS = 128
+_CONTROL = 192
+_DATA = 256
+
+_COUNTER = struct.Struct('Q')
+# samples, underruns, late, max lateness (ns), state
+_STATS_FORMAT = struct.Struct('5Q')
+
+# Worker states
+STARTING, RUNNING, STOPPED, FAILED = range(4)
+_STATE_NAMES = ('starting', 'running', 'stopped', 'failed')
+
+# Stop requests
+_DRAIN, _IMMEDIATE = 1, 2
+
+# Seconds between ring polls while idle
+POLL_INTERVAL = 0.0005
+
+
+def apply_safe_state(dac, safe_state):
+    """Put dac in a safe state.
+
+    Args:
+        dac (AD56x8): device
+        safe_state: None to leave the outputs as they are, a power down
+            mode ('1K_GND', '100K_GND' or 'TRISTATE') for every channel, an
+            int DAC code written to every channel, or a callable taking dac
+    """
+
+    if safe_state is None:
+        return
+    if callable(safe_state):
+        safe_state(dac)
+    elif isinstance(safe_state, int):
+        dac.write_to_Input_Reg_update_all('ALL_DAC', safe_state)
+    elif safe_state in PD_MODES:
+        dac.power_down_mode(safe_state, 'ALL_DAC')
+    else:
+        raise ValueError('{}: Bad safe state {!r}'
+                         .format(dac.device, safe_state))
+
+
+def _terminated(signum, frame):
+    raise SystemExit(0)
+
+
+def _worker_main(name, capacity, channels, rate, dac_factory, safe_state,
+                 late_tolerance, parent):
+    # stop() falls back to terminate(); unwind so the finally clause still
+    # leaves the DAC in its safe state
+    signal.signal(signal.SIGTERM, _terminated)
+    shm = shared_memory.SharedMemory(name=name)
+    buf = shm.buf
+    stats = [0, 0, 0, 0, STARTING]
+    dac = None
+    try:
+        dac = dac_factory()
+        stats[4] = RUNNING
+        _STATS_FORMAT.pack_into(buf, _STATS, *stats)
+        _play(buf, capacity, channels, rate, dac, late_tolerance, parent,
+              stats)
+        stats[4] = STOPPED
+    except SystemExit:
+        stats[4] = STOPPED
+        raise
+    except BaseException:
+        stats[4] = FAILED
+        raise
+    finally:
+        try:
+            if dac is not None:
+                apply_safe_state(dac, safe_state)
+                close = getattr(dac._spi, 'close', None)
+                if close is not None:
+                    close()
+        finally:
+            _STATS_FORMAT.pack_into(buf, _STATS, *stats)
+            del buf
+            shm.close()
+
+
+def _play(buf, capacity, channels, rate, dac, late_tolerance, parent, stats):
+    unpack_counter = _COUNTER.unpack_from
+    pack_counter = _COUNTER.pack_into
+    slot = struct.Struct('{}I'.format(channels))
+    slot_size = slot.size
+    write_frames = dac.write_frames
+    clock = time.monotonic
+    period = 1.0 / rate
+
+    tail = unpack_counter(buf, _TAIL)[0]
+    start = None
+    index = 0
+    while True:
+        head = unpack_counter(buf, _HEAD)[0]
+        stop = unpack_counter(buf, _CONTROL)[0]
+        if stop == _IMMEDIATE or (head == tail and
+                                  (stop == _DRAIN or os.getppid() != parent)):
+            return
+
+        if head == tail:
+            if start is not None and clock() > start + index * period:
+                # Ran dry at a deadline: restart the schedule on new data
+                stats[1] += 1
+                start = None
+                _STATS_FORMAT.pack_into(buf, _STATS, *stats)
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        now = clock()
+        if start is None:
+            start = now
+            index = 0
+        deadline = start + index * period
+        if now < deadline:
+            time.sleep(deadline - now)
+            now = clock()
+
+        offset = _DATA + (tail % capacity) * slot_size
+        write_frames(slot.unpack_from(buf, offset))
+        tail += 1
+        pack_counter(buf, _TAIL, tail)
+
+        lateness = now - deadline
+        stats[0] += 1
+        if lateness > late_tolerance:
+            stats[2] += 1
+        if lateness * 1e9 > stats[3]:
+            stats[3] = int(lateness * 1e9)
+        index += 1
+        if not index % 64:
+            _STATS_FORMAT.pack_into(buf, _STATS, *stats)
+
+
+class OutputWorker(object):
+
+    def __init__(self, dac_factory, dac_model, rate, channels=None,
+                 capacity=4096, safe_state=None, late_tolerance=None,
+                 context=None):
+        """Sample player running in a separate process.
+
+        Args:
+            dac_factory (callable): returns the AD56x8 to drive; called in
+                the worker process
+            dac_model (str): model of that device, used to encode samples
+            rate (float): sample rate in Hz
+            channels (sequence): DAC Channels written by each sample,
+                defaults to DAC_A only
+            capacity (int): samples held by the ring buffer
+            safe_state: state left on the DAC at shutdown, see
+                apply_safe_state()
+            late_tolerance (float): seconds after its deadline at which a
+                sample counts as late, defaults to half a period
+            context: multiprocessing context, defaults to the default one
+
+        Every sample is encoded like write_to_Input_Regs_update_all, so all
+        channels of a sample change together.
+        """
+
+        from AD56x8.AD56x8 import AD56x8_MODEL_PARAMS
+
+        if dac_model not in AD56x8_MODEL_PARAMS:
+            raise ValueError('AD56x8: DAC model specified not in known set')
+        if rate <= 0:
+            raise ValueError('{}: Playback Error: Sample rate must be positive'
+                             .format(dac_model))
+        if channels is None:
+            channels = [0]
+        channels = list(channels)
+
+        width = len(channels)
+        if width == 1:
+            commands = [CMD_WRITE_AND_UPDATE_N]
+        else:
+            commands = [CMD_WRITE_INPUT_REG_N] * (width - 1) + \
+                [CMD_WRITE_INPUT_RE_N_UPDATE_ALL]
+        self._prefixes = []
+        for command, channel in zip(commands, channels):
+            address = CHANNEL_ADDRESS.get(channel)
+            if address is None:
+                raise ValueError('{}: Input Reg Error: Bad DAC channel '
+                                 'selection'.format(dac_model))
+            self._prefixes.append(FRAME_PREFIX[command][address])
+
+        data_width = AD56x8_MODEL_PARAMS[dac_model]['DATA_WIDTH']
+        self._shift = FRAME_DATA_BITS - data_width
+        self._top = (1 << data_width) - 1
+        self.device = dac_model
+        self.rate = rate
+        self.channels = channels
+        self.capacity = capacity
+        self._slot = struct.Struct('{}I'.format(width))
+        self._head = 0
+        self._final_stats = None
+
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=_DATA + capacity * self._slot.size)
+        self._shm.buf[:_DATA] = bytes(_DATA)
+
+        if late_tolerance is None:
+            late_tolerance = 0.5 / rate
+        context = context or multiprocessing.get_context()
+        self._process = context.Process(
+            target=_worker_main,
+            args=(self._shm.name, capacity, width, rate, dac_factory,
+                  safe_state, late_tolerance, os.getpid()),
+            name='AD56x8 output')
+        self._process.start()
+        atexit.register(self.stop, drain=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(drain=exc_type is None)
+
+    def _tail(self):
+        return _COUNTER.unpack_from(self._shm.buf, _TAIL)[0]
+
+    def free(self):
+        """Number of samples which fit in the ring without waiting."""
+
+        return self.capacity - (self._head - self._tail())
+
+    def write(self, samples, timeout=None):
+        """Append samples to the ring, waiting for space while it is full.
+
+        Args:
+            samples (iterable): an int per sample for a single channel,
+                otherwise a sequence of DAC values per sample
+            timeout (float): seconds to wait for space, None for no limit
+
+        Returns:
+            int: samples appended; fewer than given if timeout expired or
+            the worker stopped
+        """
+
+        buf = self._shm.buf
+        pack = self._slot.pack_into
+        size = self._slot.size
+        prefixes = self._prefixes
+        shift = self._shift
+        top = self._top
+        capacity = self.capacity
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        written = 0
+        tail = self._tail()
+        for sample in samples:
+            if isinstance(sample, numbers.Integral):
+                sample = (int(sample),)
+            elif hasattr(sample, 'tolist'):
+                # NumPy rows; fixed width integers would overflow when
+                # shifted
+                sample = sample.tolist()
+            if len(sample) != len(prefixes):
+                raise ValueError('{}: Input Reg Error: {} values given for {} '
+                                 'channels'.format(self.device, len(sample),
+                                                   len(prefixes)))
+            frames = [prefix | (min(max(value, 0), top) << shift)
+                      for prefix, value in zip(prefixes, sample)]
+
+            while self._head - tail >= capacity:
+                if not self._process.is_alive() or \
+                        (deadline is not None and time.monotonic() > deadline):
+                    return written
+                time.sleep(POLL_INTERVAL)
+                tail = self._tail()
+
+            pack(buf, _DATA + (self._head % capacity) * size, *frames)
+            self._head += 1
+            _COUNTER.pack_into(buf, _HEAD, self._head)
+            written += 1
+        return written
+
+    def stats(self):
+        """Return the worker's statistics.
+
+        Returns:
+            dict: samples written, underruns, late samples, max_lateness in
+            seconds, buffered samples and worker state; after stop() the
+            final statistics
+        """
+
+        if self._shm is None:
+            return self._final_stats
+        samples, underruns, late, max_late, state = \
+            _STATS_FORMAT.unpack_from(self._shm.buf, _STATS)
+        return {'samples': samples,
+                'underruns': underruns,
+                'late': late,
+                'max_lateness': max_late / 1e9,
+                'buffered': self._head - self._tail(),
+                'state': _STATE_NAMES[state]}
+
+    @property
+    def alive(self):
+        return self._process.is_alive()
+
+    def stop(self, drain=True, timeout=None):
+        """Stop the worker, which leaves the DAC in its safe state.
+
+        Args:
+            drain (bool): play the samples still in the ring first
+            timeout (float): seconds to wait before terminating the worker;
+                a terminated worker still applies the safe state
+        """
+
+        if self._shm is None:
+            return
+        atexit.unregister(self.stop)
+        _COUNTER.pack_into(self._shm.buf, _CONTROL,
+                           _DRAIN if drain else _IMMEDIATE)
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._final_stats = self.stats()
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - bench_AD56x8.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from tests.MockGPIO import MockGPIO
+
+from AD56x8 import AD56x8
+from AD56x8.emulator import Emulator
+
+'''
+Throughput benchmarks for the AD56x8 driver.
+
+Every public command is timed for each model in AD56x8_MODEL_PARAMS against
+a null SPI backend (per-frame writes), a null bulk backend (write_frames),
+the device emulator without history and the MockGPIO bit-bang path, plus
+batched and unbatched multi-channel update sequences. Results are
+frames/sec and mean latency per call.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_AD56x8 --json bench.json
+    python -m benchmarks.bench_AD56x8 --baseline benchmarks/baseline.json
+
+With --baseline the run fails if any case is slower than the stored
+frames/sec by more than --tolerance. Baselines depend on the host; save
+one on the machine that runs the comparison with --save-baseline.
+'''
+
+DAC_CH = ['DAC_A', 'DAC_B', 'DAC_C', 'DAC_D', 'DAC_E', 'DAC_F', 'DAC_G', 'DAC_H']
+
+
+class NullSPI(object):
+    """SPI backend which only counts the bytes written."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def set_clock_hz(self, hz):
+        pass
+
+    def set_mode(self, mode):
+        pass
+
+    def set_bit_order(self, order):
+        pass
+
+    def write(self, data):
+        self.bytes += len(data)
+
+
+class NullBulkSPI(NullSPI):
+    """Null backend which also accepts multi-frame transfers."""
+
+    def write_frames(self, data):
+        self.bytes += len(data)
+
+
+class NullGPIO(MockGPIO):
+    """MockGPIO which discards pin writes instead of recording them."""
+
+    def output(self, pin, bit):
+        pass
+
+
+def _backends():
+    return {'null': lambda model: AD56x8.AD56x8(model, spi=NullSPI()),
+            'null_bulk': lambda model: AD56x8.AD56x8(model, spi=NullBulkSPI()),
+            'emulator': lambda model: AD56x8.AD56x8(
+                model, spi=Emulator(model, history=False)),
+            'bitbang': lambda model: AD56x8.AD56x8(model, gpio=NullGPIO(),
+                                                   clk=1, do=2, cs=3)}
+
+
+def _cases(device):
+    """Benchmark cases as name -> (callable, frames per call)."""
+
+    top = (1 << device.DATA_WIDTH) - 1
+    channels = list(range(AD56x8.MAX_CHANNELS))
+    values = [top] * AD56x8.MAX_CHANNELS
+
+    def all_channels_unbatched():
+        for ch in DAC_CH:
+            device.write_to_Input_Reg(ch, top)
+            device.update_DAC_Reg(ch)
+
+    def all_channels_batched():
+        with device.batch():
+            for ch in DAC_CH:
+                device.write_to_Input_Reg(ch, top)
+                device.update_DAC_Reg(ch)
+
+    counter = [0]
+
+    def stage_flush():
+        counter[0] = (counter[0] + 1) & top
+        for ch in channels:
+            device.stage(ch, counter[0])
+        device.flush()
+
+    return {'write_to_Input_Reg': (lambda: device.write_to_Input_Reg('DAC_C', top), 1),
+            'update_DAC_Reg': (lambda: device.update_DAC_Reg('DAC_C'), 1),
+            'write_to_Input_Reg_update_all':
+                (lambda: device.write_to_Input_Reg_update_all(2, top), 1),
+            'write_to_Input_Regs_update_all':
+                (lambda: device.write_to_Input_Regs_update_all(channels, values), 8),
+            'power_down_mode': (lambda: device.power_down_mode('NORMAL', 'ALL_DAC'), 1),
+            'clear_code_mode': (lambda: device.clear_code_mode('0x8000'), 1),
+            'LDAC_mode': (lambda: device.LDAC_mode('SW', channels), 1),
+            'internal_ref_mode': (lambda: device.internal_ref_mode('ON'), 1),
+            'reset': (device.reset, 1),
+            'stage_flush': (stage_flush, 8),
+            'all_channels_unbatched': (all_channels_unbatched, 16),
+            'all_channels_batched': (all_channels_batched, 16)}
+
+
+def measure(func, min_time, repeat=5):
+    """Best mean seconds per call over repeat runs of at least min_time."""
+
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        loops *= 10
+    loops = max(1, int(loops * min_time / max(elapsed, 1e-9) / 10))
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call = (time.perf_counter() - start) / loops
+        if best is None or per_call < best:
+            best = per_call
+    return best
+
+
+def run(models=None, backends=None, cases=None, min_time=0.1):
+    """Run the benchmarks and return results keyed model/backend/case."""
+
+    results = {}
+    factories = _backends()
+    for model in models or sorted(AD56x8.AD56x8_MODEL_PARAMS):
+        for backend in backends or sorted(factories):
+            device = factories[backend](model)
+            for name, (func, frames) in sorted(_cases(device).items()):
+                if cases and name not in cases:
+                    continue
+                per_call = measure(func, min_time)
+                key = '{}/{}/{}'.format(model, backend, name)
+                results[key] = {'latency_us': per_call * 1e6,
+                                'frames_per_sec': frames / per_call}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the cases slower than baseline by more than tolerance."""
+
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        expected = baseline[key]['frames_per_sec']
+        if result['frames_per_sec'] < expected * (1 - tolerance):
+            regressions.append((key, expected, result['frames_per_sec']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AD56x8 driver benchmarks')
+    parser.add_argument('--model', action='append',
+                        choices=sorted(AD56x8.AD56x8_MODEL_PARAMS))
+    parser.add_argument('--backend', action='append',
+                        choices=sorted(_backends()))
+    parser.add_argument('--case', action='append')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help='seconds per timing run')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='overwrite --baseline with these results')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed fractional slowdown against baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.model, args.backend, args.case, args.min_time)
+
+    for key, result in sorted(results.items()):
+        print('{:70s} {:12.0f} frames/s {:10.2f} us/call'
+              .format(key, result['frames_per_sec'], result['latency_us']))
+
+    report = {'python': platform.python_version(),
+              'machine': platform.machine(),
+              'results': results}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for key, expected, actual in regressions:
+            print('REGRESSION {}: {:.0f} -> {:.0f} frames/s'
+                  .format(key, expected, actual))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD56x8 Python Library - bench_import.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+'''
+Startup time of the AD56x8 driver.
+
+Each run starts a fresh interpreter which imports AD56x8.AD56x8 and creates
+a device on a custom SPI backend, timing both steps and listing the
+optional dependencies that ended up imported; neither Adafruit_GPIO nor
+NumPy should be. Run from the repository root:
+
+    python -m benchmarks.bench_import --runs 20 --json import.json
+'''
+
+_PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+from AD56x8 import AD56x8
+imported = time.perf_counter()
+
+class Backend(object):
+    def set_clock_hz(self, hz): pass
+    def set_mode(self, mode): pass
+    def set_bit_order(self, order): pass
+    def write(self, data): pass
+
+AD56x8.AD56x8('AD5628-1', spi=Backend())
+created = time.perf_counter()
+print(json.dumps({'import': imported - start,
+                  'create': created - imported,
+                  'modules': sorted(name for name in sys.modules
+                                    if name.split('.')[0] in
+                                    ('Adafruit_GPIO', 'numpy', 'bitstring'))}))
+'''
+
+
+def run(runs=10, python=sys.executable):
+    """Time runs fresh imports; returns per-run results."""
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [p for p in [env.get('PYTHONPATH')] if p])
+    results = []
+    for _ in range(runs):
+        output = subprocess.check_output([python, '-c', _PROBE], env=env,
+                                         cwd=root)
+        results.append(json.loads(output.decode()))
+    return results
+
+
+def summarize(results):
+    """Min and median import and creation time in ms, and any optional
+    dependencies imported."""
+
+    summary = {}
+    for key in ('import', 'create'):
+        times = [result[key] * 1e3 for result in results]
+        summary[key + '_ms_min'] = min(times)
+        summary[key + '_ms_median'] = statistics.median(times)
+    summary['optional_modules'] = sorted(set(
+        name for result in results for name in result['modules']))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AD56x8 import time')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--json', help='write the summary to this file')
+    args = parser.parse_args(argv)
+
+    summary = summarize(run(args.runs))
+    print('import AD56x8.AD56x8: {import_ms_min:.2f} ms min, '
+          '{import_ms_median:.2f} ms median'.format(**summary))
+    print('create device:       {create_ms_min:.3f} ms min, '
+          '{create_ms_median:.3f} ms median'.format(**summary))
+    print('optional modules imported: {}'.format(
+        ', '.join(summary['optional_modules']) or 'none'))
+
+    if args.json:
+        summary['python'] = platform.python_version()
+        summary['machine'] = platform.machine()
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=1, sort_keys=True)
+    return 1 if summary['optional_modules'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
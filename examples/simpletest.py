@@ -12,16 +12,17 @@ dac = AD56x8.AD56x8('AD5628-1', spi=SPI.SpiDev(SPI_PORT, SPI_DEVICE))
 dac.reset()
 dac.internal_ref_mode('ON')
 
-# Configure all channels for SW LDAC
-for ch in DAC_CH:
-    dac.LDAC_mode('SW', ch)
+# Configure all channels for SW LDAC in a single frame
+dac.LDAC_mode('SW', DAC_CH)
 
 counter = 0
 
 while True:
-    for ch in DAC_CH:
-        dac.write_to_Input_Reg(ch, counter)
-        dac.update_DAC_Reg(ch)
+    # Send all eight channel writes and updates as one SPI transfer
+    with dac.batch():
+        for ch in DAC_CH:
+            dac.write_to_Input_Reg(ch, counter)
+            dac.update_DAC_Reg(ch)
 
     voltage = 2*(dac.VREF)*(counter/(2**dac.DATA_WIDTH))
     counter = (counter + 1) % ((2**dac.DATA_WIDTH)-1)
@@ -6,8 +6,12 @@ setup(
     author='David Goncalves',
     author_email='davegoncalves@gmail.com',
     packages=find_packages(),
-    # Needed for dependencies
-    install_requires=['Adafruit-GPIO', 'bitstring'],
+    # No required dependencies; platform GPIO for bit-bang SPI, vectorized
+    # waveform encoding and the test suite are optional
+    install_requires=[],
+    extras_require={'gpio': ['Adafruit-GPIO'],
+                    'numpy': ['numpy'],
+                    'test': ['bitstring']},
     version='0.1',
     license='MIT',
     description='Library for Analog Devices AD56x8 series DACs on a RasPi or BB SBC')
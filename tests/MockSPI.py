@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - MockSPI.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+class MockSPI(object):
+    """Recording SPI backend, keeps every write as a bytes object."""
+
+    def __init__(self):
+        self.clock_hz = None
+        self.mode = None
+        self.bit_order = None
+        self.written = []
+
+    def set_clock_hz(self, hz):
+        self.clock_hz = hz
+
+    def set_mode(self, mode):
+        self.mode = mode
+
+    def set_bit_order(self, order):
+        self.bit_order = order
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    def frames(self):
+        """Return every 32 bit frame written so far, in order."""
+        data = b''.join(self.written)
+        return [int.from_bytes(data[i:i + 4], 'big')
+                for i in range(0, len(data), 4)]
+
+    def clear(self):
+        self.written = []
+
+
+class MockBulkSPI(MockSPI):
+    """Recording SPI backend that also accepts multi-frame transfers."""
+
+    def __init__(self):
+        super(MockBulkSPI, self).__init__()
+        self.transfers = 0
+
+    def write(self, data):
+        self.transfers += 1
+        super(MockBulkSPI, self).write(data)
+
+    def write_frames(self, data):
+        if len(data) % 4:
+            raise ValueError('Frame data must be a multiple of 4 bytes')
+        self.transfers += 1
+        self.written.append(bytes(data))
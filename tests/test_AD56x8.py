@@ -32,9 +32,13 @@ THE SOFTWARE.
 
 """
 
+import array
+import sys
+import threading
 import unittest
 
 from tests.MockGPIO import MockGPIO
+from tests.MockSPI import MockSPI, MockBulkSPI
 
 from AD56x8 import AD56x8
 
@@ -249,6 +253,9 @@ class TestAD56x8(unittest.TestCase):
         # Result Base: Load LDAC register command (0x6) in CMD field of 32 bit input to DAC
         result_base = 0x06000000
 
+        # Channels not selected keep their mode, starting from all HW
+        ldac_mask = 0
+
         # Iterate over all LDAC modes and channels
         for mode_key, mode_value in AD56x8.LDAC_MODE.items():
             for channel in range(AD56x8.MAX_CHANNELS):
@@ -256,11 +263,381 @@ class TestAD56x8(unittest.TestCase):
                 device.LDAC_mode(mode_key, channel)
                 data_written = BitArray(gpio.pin_written[2]).uint
                 # Set CMD, LDAC_MODE_CH fields of 32 bit register for comparison to return
-                data_expected = (result_base | ((mode_value << channel) & 0xffffffff))
+                ldac_mask = (ldac_mask & ~(1 << channel)) | (mode_value << channel)
+                data_expected = (result_base | (ldac_mask & 0xffffffff))
                 print('LDAC Command:', mode_key, 'Channel:', channel, 'SPI:', data_written)
                 self.assertEqual(data_expected, data_written)
                 gpio.clear()
 
 
+class TestFrameEncoding(unittest.TestCase):
+    """Frames from the integer encoder must match the ctypes register structures"""
+
+    @staticmethod
+    def _input_reference(command, address, value, data_width):
+        i = AD56x8.Input()
+        i.reg.CMD = command
+        i.reg.ADDR = address
+        i.reg.DATA = value << (20 - data_width)
+        return i.value
+
+    @staticmethod
+    def _spi_reference(value):
+        w = AD56x8.SPIWrite()
+        w.value = value
+        return bytes([w.reg.d, w.reg.c, w.reg.b, w.reg.a])
+
+    def test_encode_frame_prefixes(self):
+        for command in range(16):
+            for address in range(16):
+                i = AD56x8.Input()
+                i.reg.CMD = command
+                i.reg.ADDR = address
+                i.reg.DATA = 0xABCDE
+                self.assertEqual(i.value, AD56x8.encode_frame(command, address, 0xABCDE))
+
+    def test_input_frames_all_models(self):
+        commands = [('write_to_Input_Reg', AD56x8.CMD_WRITE_INPUT_REG_N),
+                    ('write_to_Input_Reg_update_all', AD56x8.CMD_WRITE_INPUT_RE_N_UPDATE_ALL)]
+
+        for dac_model in AD56x8.AD56x8_MODEL_PARAMS.keys():
+            spi = MockSPI()
+            device = AD56x8.AD56x8(dac_model, spi=spi)
+            data_width = device.DATA_WIDTH
+            test_values = [0, (1 << data_width) - 1, int('01' * (data_width // 2), 2),
+                           int('10' * (data_width // 2), 2), 1 << (data_width - 1)]
+
+            for name, command in commands:
+                for channel, address in AD56x8.DAC_CHANNELS.items():
+                    for value in test_values:
+                        for selector in (channel, address):
+                            getattr(device, name)(selector, value)
+                            expected = self._input_reference(command, address, value, data_width)
+                            self.assertEqual(self._spi_reference(expected), spi.written[-1])
+
+            for channel, address in AD56x8.DAC_CHANNELS.items():
+                device.update_DAC_Reg(channel)
+                expected = self._input_reference(AD56x8.CMD_UPDATE_DAC_REG_N, address, 0, data_width)
+                self.assertEqual(self._spi_reference(expected), spi.written[-1])
+
+    def test_config_frames_all_models(self):
+        for dac_model in AD56x8.AD56x8_MODEL_PARAMS.keys():
+            spi = MockSPI()
+            device = AD56x8.AD56x8(dac_model, spi=spi)
+
+            for mode_key, mode_value in AD56x8.PD_MODES.items():
+                for channel in range(AD56x8.MAX_CHANNELS):
+                    device.power_down_mode(mode_key, channel)
+                    p = AD56x8.PowerDown()
+                    p.reg.CMD = AD56x8.CMD_PWR_DOWN_UP_DAC
+                    p.reg.PD_CH_SEL = (1 << channel) & 0xff
+                    p.reg.PD_MODE = mode_value
+                    self.assertEqual(self._spi_reference(p.value), spi.written[-1])
+
+            for mode_key, mode_value in AD56x8.LDAC_MODE.items():
+                for channel in range(AD56x8.MAX_CHANNELS):
+                    # Reset so the LDAC register holds only this channel's bit
+                    device.reset()
+                    device.LDAC_mode(mode_key, channel)
+                    ldac = AD56x8.LDAC()
+                    ldac.reg.CMD = AD56x8.CMD_LOAD_LDAC_REG
+                    ldac.reg.LDAC_MODE_CH = (mode_value << channel) & 0xff
+                    self.assertEqual(self._spi_reference(ldac.value), spi.written[-1])
+
+            for mode_key, mode_value in AD56x8.CLEAR_CODES.items():
+                device.clear_code_mode(mode_key)
+                c = AD56x8.ClearCode()
+                c.reg.CMD = AD56x8.CMD_LOAD_CLEAR_CODE_REG
+                c.reg.CC_MODE = mode_value
+                self.assertEqual(self._spi_reference(c.value), spi.written[-1])
+
+            for mode_key, mode_value in AD56x8.IREF_MODE.items():
+                device.internal_ref_mode(mode_key)
+                r = AD56x8.RefSetup()
+                r.reg.CMD = AD56x8.CMD_SETUP_INT_REF_REG
+                r.reg.IREF = mode_value
+                self.assertEqual(self._spi_reference(r.value), spi.written[-1])
+
+            device.reset()
+            i = AD56x8.Input()
+            i.reg.CMD = AD56x8.CMD_RESET
+            self.assertEqual(self._spi_reference(i.value), spi.written[-1])
+
+    def test_bad_channel(self):
+        device = AD56x8.AD56x8('AD5668-3', spi=MockSPI())
+        with self.assertRaises(ValueError):
+            device.write_to_Input_Reg(8, 0)
+        with self.assertRaises(ValueError):
+            device.update_DAC_Reg('DAC_I')
+
+
+class TestChannelMasks(unittest.TestCase):
+
+    def test_power_down_mask(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        device.power_down_mode('TRISTATE', ['DAC_A', 2, 'DAC_H'])
+        device.power_down_mode('1K_GND', {0, 1})
+        device.power_down_mode('100K_GND', 'ALL_DAC')
+        device.power_down_mode('NORMAL', mask=0x0F)
+        device.power_down_mode('NORMAL', range(AD56x8.MAX_CHANNELS))
+
+        self.assertEqual(spi.frames(), [0x04000385, 0x04000103, 0x040002FF,
+                                        0x0400000F, 0x040000FF])
+
+    def test_ldac_merge(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        device.LDAC_mode('SW', 'ALL_DAC')
+        device.LDAC_mode('HW', ('DAC_B', 'DAC_D'))
+        device.LDAC_mode('SW', 3)
+        device.LDAC_mode('HW', mask=0xF0)
+        device.reset()
+        device.LDAC_mode('SW', [6])
+
+        self.assertEqual(spi.frames(), [0x060000FF, 0x060000F5, 0x060000FD,
+                                        0x0600000D, 0x07000000, 0x06000040])
+
+    def test_ldac_merge_after_write_frames(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        device.write_frames([0x060000FF])
+        device.LDAC_mode('HW', 0)
+        device.write_frames(iter([0x060000F0, 0x07000000]))
+        device.LDAC_mode('SW', 1)
+
+        self.assertEqual(spi.frames(), [0x060000FF, 0x060000FE, 0x060000F0,
+                                        0x07000000, 0x06000002])
+
+    def test_bad_selection(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+        with self.assertRaises(ValueError):
+            device.power_down_mode('NORMAL', [0, 9])
+        with self.assertRaises(ValueError):
+            device.power_down_mode('NORMAL', mask=0x100)
+        with self.assertRaises(ValueError):
+            device.LDAC_mode('SW', 0, mask=1)
+        with self.assertRaises(ValueError):
+            device.LDAC_mode('SW')
+
+
+class TestBatch(unittest.TestCase):
+
+    def _write_all_channels(self, device):
+        for channel in range(AD56x8.MAX_CHANNELS):
+            device.write_to_Input_Reg(channel, 0x123)
+            device.update_DAC_Reg(channel)
+
+    def test_batch_single_transfer(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        with device.batch():
+            self._write_all_channels(device)
+            self.assertEqual(spi.written, [])
+
+        self.assertEqual(spi.transfers, 1)
+
+        reference = MockSPI()
+        self._write_all_channels(AD56x8.AD56x8('AD5628-1', spi=reference))
+        self.assertEqual(reference.frames(), spi.frames())
+        self.assertEqual(len(spi.frames()), 16)
+
+    def test_batch_fallback_per_frame(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        with device.batch():
+            self._write_all_channels(device)
+            device.update_DAC_Reg('ALL_DAC')
+
+        # Backend without write_frames gets one write per 32 bit frame
+        self.assertEqual(len(spi.written), 17)
+        self.assertTrue(all(len(data) == 4 for data in spi.written))
+
+    def test_nested_batch_and_write_frames(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        with device.batch():
+            device.reset()
+            with device.batch():
+                device.internal_ref_mode('ON')
+            device.write_frames([AD56x8.encode_frame(AD56x8.CMD_WRITE_AND_UPDATE_N, 2, 0x800 << 8)])
+
+        self.assertEqual(spi.transfers, 1)
+        self.assertEqual(spi.frames(), [0x07000000, 0x08000001, 0x03280000])
+
+        device.write_frames([0x07000000, 0x07000000])
+        self.assertEqual(spi.transfers, 2)
+
+    def test_write_to_Input_Regs_update_all(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5648-1', spi=spi)
+
+        device.write_to_Input_Regs_update_all(['DAC_A', 3, 'DAC_H'], [1, 2, 0x3FFF])
+
+        self.assertEqual(spi.transfers, 1)
+        self.assertEqual(spi.frames(), [0x00000040, 0x00300080, 0x027FFFC0])
+
+        with self.assertRaises(ValueError):
+            device.write_to_Input_Regs_update_all([0, 1], [0])
+
+
+class TestCoalescing(unittest.TestCase):
+
+    def test_last_writer_wins_single_update(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        device.stage('DAC_C', 1)
+        device.stage(0, 5)
+        device.stage('DAC_C', 2)
+        self.assertEqual(spi.written, [])
+
+        self.assertEqual(device.flush(), 2)
+        self.assertEqual(spi.transfers, 1)
+        self.assertEqual(spi.frames(), [0x00000500, 0x02200200])
+
+        # Nothing staged, or only unchanged values, sends nothing
+        self.assertEqual(device.flush(), 0)
+        device.stage(0, 5)
+        device.stage(2, 3)
+        self.assertEqual(device.flush(), 1)
+        self.assertEqual(spi.frames()[-1], 0x02200300)
+
+    def test_all_dac_and_direct_writes(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        device.stage('ALL_DAC', 9)
+        self.assertEqual(device.flush(), 8)
+        self.assertEqual(spi.frames()[-1], 0x02700900)
+
+        # A direct write makes the next flush of that channel resend
+        device.write_to_Input_Reg(4, 1)
+        spi.clear()
+        for channel in range(AD56x8.MAX_CHANNELS):
+            device.stage(channel, 9)
+        self.assertEqual(device.flush(), 1)
+        self.assertEqual(spi.frames(), [0x02400900])
+
+        device.reset()
+        device.stage(4, 9)
+        self.assertEqual(device.flush(), 1)
+
+    def test_failed_flush_keeps_staged_values(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        def fail(data):
+            # Another producer stages a newer value during the write
+            device.stage(0, 7)
+            raise OSError('bus error')
+
+        device.stage(0, 5)
+        device.stage(2, 2)
+        spi.write_frames = fail
+        with self.assertRaises(OSError):
+            device.flush()
+        del spi.write_frames
+        self.assertEqual(device.flush(), 2)
+        self.assertEqual(spi.frames(), [0x00000700, 0x02200200])
+
+    def test_concurrent_producers(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5668-1', spi=spi)
+
+        def producer(channel):
+            for value in range(1000):
+                device.stage(channel, value)
+
+        threads = [threading.Thread(target=producer, args=(ch,)) for ch in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        device.flush()
+        self.assertEqual(len(spi.frames()), 8)
+        self.assertTrue(all(frame & 0xFFFFF == 999 << 4 for frame in spi.frames()))
+
+
+class TestWriteBuffer(unittest.TestCase):
+
+    FRAMES = [0x00000100, 0x060000F0, 0x02700200]
+
+    def test_bytes_and_arrays(self):
+        data = b''.join(frame.to_bytes(4, 'big') for frame in self.FRAMES)
+        native = array.array('I', self.FRAMES)
+        big = array.array('I', self.FRAMES)
+        if sys.byteorder == 'little':
+            big.byteswap()
+
+        for buffer in (data, bytearray(data), memoryview(data), native):
+            spi = MockBulkSPI()
+            device = AD56x8.AD56x8('AD5628-1', spi=spi)
+            self.assertEqual(device.write_buffer(buffer), 3)
+            self.assertEqual(spi.frames(), self.FRAMES)
+            self.assertEqual(spi.transfers, 1)
+            self.assertEqual(device._ldac_mask, 0xF0)
+
+        # Per-frame writes on backends without write_frames
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        device.write_buffer(memoryview(bytes(big)), chunk=2)
+        self.assertEqual(spi.written, [data[0:4], data[4:8], data[8:12]])
+
+    def test_chunks_and_batch(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        data = bytes(4) * 5
+        device.write_buffer(data, chunk=2)
+        self.assertEqual([len(w) for w in spi.written], [8, 8, 4])
+
+        spi.clear()
+        with device.batch():
+            device.reset()
+            device.write_buffer(data[:8])
+        self.assertEqual(spi.written, [b'\x07\x00\x00\x00' + data[:8]])
+
+    def test_validation(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        allowed = [AD56x8.CMD_WRITE_INPUT_REG_N,
+                   AD56x8.CMD_WRITE_INPUT_RE_N_UPDATE_ALL]
+        data = b''.join(frame.to_bytes(4, 'big') for frame in self.FRAMES)
+
+        with self.assertRaises(ValueError):
+            device.write_buffer(data[:6])
+        with self.assertRaises(ValueError):
+            device.write_buffer(data, commands=allowed)
+        with self.assertRaises(ValueError):
+            device.write_buffer(memoryview(data).cast('H'))
+        with self.assertRaises(ValueError):
+            device.write_buffer(memoryview(bytearray(data))[::2])
+        self.assertEqual(spi.written, [])
+
+        self.assertEqual(device.write_buffer(data[:4] + data[8:],
+                                             commands=allowed), 2)
+
+    def test_shadow_invalidated(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi, shadow=True)
+        device.internal_ref_mode('ON')
+        device.stage(0, 1)
+        device.flush()
+        device.write_buffer(b'\x07\x00\x00\x00')
+
+        spi.clear()
+        device.internal_ref_mode('ON')
+        device.stage(0, 1)
+        device.flush()
+        self.assertEqual(len(spi.frames()), 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_aio.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from tests.MockSPI import MockBulkSPI
+
+from AD56x8 import AD56x8
+from AD56x8.aio import AsyncAD56x8
+
+
+class SlowBulkSPI(MockBulkSPI):
+    """Bulk backend which blocks for a while on every transfer."""
+
+    def __init__(self, delay):
+        super(SlowBulkSPI, self).__init__()
+        self.delay = delay
+        self.threads = set()
+
+    def write(self, data):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        super(SlowBulkSPI, self).write(data)
+
+    def write_frames(self, data):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        super(SlowBulkSPI, self).write_frames(data)
+
+
+class TestAsyncAD56x8(unittest.TestCase):
+
+    def test_ordering_and_batching(self):
+        spi = SlowBulkSPI(0.01)
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        async def main():
+            async with AsyncAD56x8(device) as adac:
+                await adac.reset()
+                await asyncio.gather(*[adac.write_to_Input_Reg(ch, ch) for ch in range(8)])
+                await adac.update_DAC_Reg('ALL_DAC')
+
+        asyncio.run(main())
+
+        self.assertEqual(spi.frames(), [0x07000000] + [(ch << 20) | (ch << 8) for ch in range(8)]
+                         + [0x01F00000])
+        # Concurrent writes were combined into fewer transfers than frames
+        self.assertLess(spi.transfers, 10)
+        self.assertNotIn(threading.get_ident(), spi.threads)
+
+    def test_event_loop_not_blocked(self):
+        spi = SlowBulkSPI(0.05)
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.005)
+
+        async def main():
+            async with AsyncAD56x8(device) as adac:
+                await asyncio.gather(adac.reset(), ticker())
+
+        asyncio.run(main())
+        self.assertEqual(len(ticks), 5)
+        self.assertLess(ticks[-1] - ticks[0], 0.045)
+
+    def test_errors_and_backpressure(self):
+        spi = SlowBulkSPI(0.001)
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        async def main():
+            adac = AsyncAD56x8(device, max_pending=2, max_batch=2)
+            with self.assertRaises(ValueError):
+                await adac.write_to_Input_Reg('DAC_Z', 1)
+            await asyncio.gather(*[adac.internal_ref_mode('ON') for _ in range(20)])
+            self.assertLessEqual(adac._queue.qsize(), 2)
+            adac.stage(3, 5)
+            self.assertEqual(await adac.flush(), 1)
+            await adac.close()
+
+        asyncio.run(main())
+        self.assertEqual(len(spi.frames()), 21)
+
+    def test_submit_during_close(self):
+        spi = SlowBulkSPI(0.01)
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        async def main():
+            adac = AsyncAD56x8(device)
+            first = asyncio.ensure_future(adac.write_to_Input_Reg(0, 1))
+            await asyncio.sleep(0)
+            closing = asyncio.ensure_future(adac.close())
+            await asyncio.sleep(0)
+            with self.assertRaises(RuntimeError):
+                await adac.write_to_Input_Reg(1, 2)
+            # A command which got in behind the stop marker is failed
+            late = asyncio.get_running_loop().create_future()
+            adac._queue.put_nowait((device.reset, (), {}, late))
+            await closing
+            with self.assertRaises(RuntimeError):
+                await late
+            self.assertIsNone(await first)
+            # Closed for good
+            with self.assertRaises(RuntimeError):
+                await adac.reset()
+            with self.assertRaises(RuntimeError):
+                async with adac:
+                    pass
+            self.assertIsNone(adac._writer)
+
+        asyncio.run(main())
+        self.assertEqual(spi.frames(), [0x00000100])
+
+    def test_writer_failure(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=MockBulkSPI())
+
+        async def main():
+            adac = AsyncAD56x8(device)
+            adac._execute = lambda items: None
+            with self.assertRaises(TypeError):
+                await adac.reset()
+            with self.assertRaises(RuntimeError):
+                await adac.reset()
+            await adac.close()
+
+        asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
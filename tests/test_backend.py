@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_backend.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import subprocess
+import sys
+import unittest
+
+from AD56x8 import AD56x8
+from AD56x8.backend import SPIBackend
+
+
+class RecordingBackend(SPIBackend):
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+
+class TestBackend(unittest.TestCase):
+
+    def test_default_write_frames(self):
+        spi = RecordingBackend()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        device.write_to_Input_Regs_update_all([0, 1], [1, 2])
+        self.assertEqual(spi.written, [b'\x00\x00\x01\x00',
+                                       b'\x02\x10\x02\x00'])
+        with self.assertRaises(ValueError):
+            spi.write_frames(b'\x00\x00')
+
+    def test_no_optional_imports(self):
+        probe = ('import sys\n'
+                 'from AD56x8 import AD56x8\n'
+                 'from AD56x8.emulator import Emulator\n'
+                 'AD56x8.AD56x8("AD5628-1", spi=Emulator("AD5628-1"))\n'
+                 'print(sorted(m for m in sys.modules '
+                 'if m.split(".")[0] in ("Adafruit_GPIO", "numpy")))\n')
+        output = subprocess.check_output([sys.executable, '-c', probe])
+        self.assertEqual(output.strip(), b'[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
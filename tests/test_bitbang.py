@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_bitbang.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import unittest
+
+import Adafruit_GPIO.SPI as SPI
+
+from tests.MockGPIO import MockGPIO
+
+from AD56x8 import AD56x8
+from AD56x8.bitbang import FastBitBang, LSBFIRST
+
+from bitstring import BitArray
+
+
+class TestFastBitBang(unittest.TestCase):
+
+    def test_matches_adafruit_bitbang(self):
+        data = bytes([0x12, 0x34, 0xA5, 0xFF, 0x00])
+        for mode in range(4):
+            for order in (SPI.MSBFIRST, SPI.LSBFIRST):
+                reference = MockGPIO()
+                spi = SPI.BitBang(reference, 1, 2, None, 3)
+                spi.set_mode(mode)
+                spi.set_bit_order(order)
+                spi.write(data)
+
+                gpio = MockGPIO()
+                spi = FastBitBang(gpio, 1, 3, 2)
+                spi.set_mode(mode)
+                spi.set_bit_order(order)
+                spi.write(data)
+
+                self.assertEqual(reference.pin_written, gpio.pin_written)
+
+    def test_write_frames_toggles_cs(self):
+        gpio = MockGPIO()
+        device = AD56x8.AD56x8('AD5628-1', gpio=gpio, clk=1, do=2, cs=3)
+
+        with device.batch():
+            device.reset()
+            device.internal_ref_mode('ON')
+
+        self.assertEqual(gpio.pin_written[3], [1, 0, 1, 0, 1])
+        self.assertEqual(BitArray(gpio.pin_written[2]).uint, 0x0700000008000001)
+
+    def test_parallel_data_pins(self):
+        gpio = MockGPIO()
+        spi = FastBitBang(gpio, 1, 3, [2, 4])
+
+        spi.write_parallel([b'\x07\x00\x00\x00\x08\x00\x00\x01',
+                            b'\x03\x20\x08\x00\x06\x00\x00\xff'])
+
+        self.assertEqual(BitArray(gpio.pin_written[2]).uint, 0x0700000008000001)
+        self.assertEqual(BitArray(gpio.pin_written[4]).uint, 0x03200800060000FF)
+        self.assertEqual(gpio.pin_written[3], [1, 0, 1, 0, 1])
+        # One clock pulse per bit is shared by both DACs
+        self.assertEqual(len(gpio.pin_written[1]), 1 + 64 * 2)
+
+        # Plain writes are broadcast to every DAC
+        gpio.clear()
+        spi.write(b'\x07\x00\x00\x00')
+        self.assertEqual(gpio.pin_written[2], gpio.pin_written[4])
+
+        with self.assertRaises(ValueError):
+            spi.write_parallel([b'\x00' * 4])
+        with self.assertRaises(ValueError):
+            spi.write_parallel([b'\x00' * 4, b'\x00' * 8])
+
+    def test_bit_order(self):
+        gpio = MockGPIO()
+        spi = FastBitBang(gpio, 1, 3, 2)
+        spi.set_bit_order(LSBFIRST)
+        spi.write(b'\x01')
+        self.assertEqual(gpio.pin_written[2], [1, 0, 0, 0, 0, 0, 0, 0])
+        with self.assertRaises(ValueError):
+            spi.set_bit_order(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_bus.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import threading
+import time
+import unittest
+
+from tests.MockGPIO import MockGPIO
+from tests.MockSPI import MockSPI, MockBulkSPI
+
+from AD56x8.bus import SharedBus
+
+
+class SelectTrackingSPI(MockSPI):
+    """Records which chip select pin was low for every write."""
+
+    def __init__(self, gpio, pins):
+        super(SelectTrackingSPI, self).__init__()
+        self.gpio = gpio
+        self.pins = pins
+        self.selected = []
+
+    def write(self, data):
+        low = [pin for pin in self.pins if self.gpio.pin_written[pin][-1] == 0]
+        self.selected.append((tuple(low), bytes(data)))
+        time.sleep(0.0001)
+        super(SelectTrackingSPI, self).write(data)
+
+
+class TestSharedBus(unittest.TestCase):
+
+    def test_gpio_chip_selects_from_threads(self):
+        gpio = MockGPIO()
+        spi = SelectTrackingSPI(gpio, [10, 11])
+        bus = SharedBus(spi, gpio=gpio)
+        dacs = [bus.attach('AD5628-1', cs=10, name='a'), bus.attach('AD5668-1', cs=11, name='b')]
+
+        def worker(index):
+            for value in range(50):
+                dacs[index].write_to_Input_Regs_update_all([0, 1, 2], [value] * 3)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in (0, 1)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Exactly one device selected per frame, and frames go to the right one
+        for low, data in spi.selected:
+            self.assertEqual(len(low), 1)
+            self.assertEqual(len(data), 4)
+        self.assertEqual(len(spi.selected), 300)
+
+        # The three frames of each multi-channel write stay together
+        for start in range(0, 300, 3):
+            owners = set(low for low, _ in spi.selected[start:start + 3])
+            self.assertEqual(len(owners), 1)
+            self.assertEqual(spi.selected[start + 2][1][0], 0x02)
+
+        stats = bus.stats()
+        self.assertEqual(stats['a']['frames'], 150)
+        self.assertEqual(stats['b']['writes'], 50)
+        self.assertGreaterEqual(stats['a']['max_wait_time'], 0.0)
+
+    def test_bulk_merge_and_port_backends(self):
+        shared = MockBulkSPI()
+        own = MockBulkSPI()
+        bus = SharedBus(shared)
+        dac = bus.attach('AD5628-1', clock_hz=20000000)
+        other = bus.attach('AD5628-1', spi=own)
+
+        # Queued frames of one device are written as a single transfer
+        entries = []
+        bus._submit = lambda port, data: entries.append((port, data))
+        dac.reset()
+        dac.internal_ref_mode('ON')
+        del bus._submit
+        with bus._bus_lock:
+            bus._drain([[port, data, time.monotonic(), None] for port, data in entries])
+        self.assertEqual(shared.transfers, 1)
+        self.assertEqual(shared.frames(), [0x07000000, 0x08000001])
+        self.assertEqual(shared.clock_hz, 20000000)
+
+        other.reset()
+        self.assertEqual(own.frames(), [0x07000000])
+        self.assertEqual(len(shared.frames()), 2)
+
+    def test_errors_reach_the_writer(self):
+        class FailingSPI(MockSPI):
+            def write(self, data):
+                raise IOError('bus fault')
+
+        bus = SharedBus(FailingSPI())
+        dac = bus.attach('AD5628-1')
+        with self.assertRaises(IOError):
+            dac.reset()
+
+        with self.assertRaises(ValueError):
+            SharedBus(MockSPI()).attach('AD5628-1', cs=4)
+        # Only one device on the backend's own chip select
+        with self.assertRaises(ValueError):
+            bus.attach('AD5628-1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_calibration.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import tempfile
+import unittest
+
+from tests.MockSPI import MockSPI
+
+from AD56x8 import AD56x8
+from AD56x8.calibration import (Calibration, CalibratedAD56x8,
+                                ChannelCalibration)
+from AD56x8.emulator import Emulator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestCalibration(unittest.TestCase):
+
+    def setUp(self):
+        self.calibration = Calibration('AD5628-1', channels={
+            'DAC_B': ChannelCalibration(gain=1.02, offset=-0.01),
+            2: ChannelCalibration(points=[(0, 0.0), (4095, 0.1)])})
+
+    def test_ideal_channel(self):
+        code = self.calibration.code
+        self.assertEqual(code('DAC_A', 0.0), 0)
+        self.assertEqual(code('DAC_A', 2.5), 2048)
+        self.assertEqual(code('DAC_A', 9.9), 4095)
+        self.assertEqual(code('DAC_A', -1.0), 0)
+        self.assertEqual(len(self.calibration.table(0)[0]), 4096)
+
+    def test_corrected_channels(self):
+        calibration = self.calibration
+        for channel in (1, 2):
+            for volts in (0.5, 1.7, 3.3, 4.4):
+                code = calibration.code(channel, volts)
+                error = abs(calibration.output(channel, code) - volts)
+                neighbours = [abs(calibration.output(channel, c) - volts)
+                              for c in (code - 1, code + 1)]
+                self.assertLessEqual(error, min(neighbours))
+        # Gain above one needs a lower code than ideal
+        self.assertLess(calibration.code(1, 4.0), calibration.code(0, 4.0))
+        self.assertEqual(calibration.channel(2).correction(2047.5), 0.05)
+
+    def test_save_load(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cal.json')
+        self.calibration.save(path)
+        loaded = Calibration.load(path)
+        self.assertEqual(loaded.to_dict(), self.calibration.to_dict())
+        self.assertEqual(loaded.code(1, 3.0), self.calibration.code(1, 3.0))
+
+        with self.assertRaises(ValueError):
+            ChannelCalibration(gain=0)
+        with self.assertRaises(ValueError):
+            self.calibration.code('ALL_DAC', 1.0)
+
+    def test_set_voltage(self):
+        emu = Emulator('AD5628-1')
+        dac = AD56x8.AD56x8('AD5628-1', spi=emu)
+        dac.internal_ref_mode('ON')
+        calibrated = CalibratedAD56x8(dac, self.calibration)
+
+        self.assertEqual(calibrated.set_voltage('DAC_A', 1.25), 1024)
+        self.assertEqual(emu.volts(0), 1.25)
+        codes = calibrated.set_voltages(['DAC_B', 'DAC_C'], [2.0, 2.0])
+        self.assertEqual(emu.dac[1:3], codes)
+        calibrated.set_voltage('ALL_DAC', 0.0)
+        self.assertEqual(emu.dac[0], 0)
+
+        with self.assertRaises(ValueError):
+            CalibratedAD56x8(AD56x8.AD56x8('AD5668-1', spi=MockSPI()),
+                             self.calibration)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_vectorized_codes(self):
+        volts = np.linspace(-1, 6, 57).reshape(3, 19)
+        codes = self.calibration.codes(1, volts)
+        self.assertEqual(codes.shape, (3, 19))
+        self.assertEqual(codes.ravel().tolist(),
+                         [self.calibration.code(1, v) for v in volts.ravel()])
+
+
+if __name__ == '__main__':
+    unittest.main()
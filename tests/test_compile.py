@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_compile.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import tempfile
+import unittest
+
+from tests.MockSPI import MockBulkSPI
+
+from AD56x8 import AD56x8
+from AD56x8.compile import FRAME_HEADER, FrameFile, compile_frames, main
+from AD56x8.emulator import Emulator
+from AD56x8.samplefile import write_sample_file
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestCompile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.dir, 'wave.frm')
+
+    def test_header_size(self):
+        # Frame data starts 4 byte aligned
+        self.assertEqual(FRAME_HEADER.size, 64)
+
+    def test_iterable_source(self):
+        samples = [(i, 4095 - i) for i in range(10)]
+        header = compile_frames(samples, self.output, 'AD5628-1', rate=100.0,
+                                channels=['DAC_C', 'DAC_A'], workers=1)
+        self.assertEqual(header['frames'], 20)
+
+        spi = MockBulkSPI()
+        dac = AD56x8.AD56x8('AD5628-1', spi=spi)
+        with FrameFile(self.output) as frames:
+            self.assertEqual((frames.model, frames.channels, frames.samples),
+                             ('AD5628-1', 2, 10))
+            self.assertEqual(frames.channel_map, [2, 0])
+            self.assertEqual(frames.rate, 100.0)
+            frames.write_to(dac, start=1, stop=2)
+        self.assertEqual(spi.frames(), [0x00200100, 0x020FFE00])
+
+    def test_parallel_matches_serial(self):
+        source = os.path.join(self.dir, 'wave.smp')
+        write_sample_file(source, ((i % 4096, (i * 7) % 4096, 0)
+                                   for i in range(5000)), channels=3)
+        serial = os.path.join(self.dir, 'serial.frm')
+        compile_frames(source, serial, 'AD5648-3', workers=1, block=512)
+        compile_frames(source, self.output, 'AD5648-3', workers=2, block=512)
+        with open(serial, 'rb') as a, open(self.output, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+        emu = Emulator('AD5648-3')
+        with FrameFile(self.output) as frames:
+            frames.write_to(AD56x8.AD56x8('AD5648-3', spi=emu))
+            with self.assertRaises(ValueError):
+                frames.write_to(AD56x8.AD56x8('AD5628-1', spi=MockBulkSPI()))
+        self.assertEqual(emu.dac[:3], [4999 % 4096, 34993 % 4096, 0])
+
+    def test_csv_volts(self):
+        source = os.path.join(self.dir, 'wave.csv')
+        with open(source, 'w') as f:
+            f.write('a,b\n0.0,2.5\n# comment\n\n5.0,-1\n')
+        main([source, self.output, '--model', 'AD5628-1', '--volts',
+              '--channels', 'DAC_A,7', '--workers', '1'])
+        with FrameFile(self.output) as frames:
+            data = b''.join(frames.chunks())
+        self.assertEqual(data.hex(), '0000000002780000000fff0002700000')
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_npy_volts(self):
+        source = os.path.join(self.dir, 'wave.npy')
+        np.save(source, np.array([[0.0, 2.5], [5.0, -1]]))
+        with self.assertRaises(ValueError):
+            compile_frames(source, self.output, 'AD5628-1', workers=1)
+        compile_frames(source, self.output, 'AD5628-1', channels=['DAC_A', 7],
+                       volts=True, workers=1)
+        with FrameFile(self.output) as frames:
+            data = b''.join(frames.chunks())
+        self.assertEqual(data.hex(), '0000000002780000000fff0002700000')
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_npy_default_int_codes(self):
+        source = os.path.join(self.dir, 'codes.npy')
+        np.save(source, np.arange(3))
+        header = compile_frames(source, self.output, 'AD5628-1', workers=1)
+        self.assertEqual(header['frames'], 3)
+
+    def test_expression_and_checksum(self):
+        main([self.output, '--model', 'AD5668-1', '--rate', '1000',
+              '--expr', 'int(32768 + 32767 * sin(2 * pi * t / 8)) '
+                        'for t in range(8)'])
+        with FrameFile(self.output) as frames:
+            self.assertEqual(frames.samples, 8)
+            self.assertEqual(next(frames.chunks(2, 3)), b'\x03\x0f\xff\xf0')
+
+        with open(self.output, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'\x01')
+        with self.assertRaises(ValueError):
+            FrameFile(self.output)
+        FrameFile(self.output, verify=False).close()
+
+
+if __name__ == '__main__':
+    unittest.main()
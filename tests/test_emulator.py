@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_emulator.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import math
+import unittest
+
+from AD56x8 import AD56x8
+from AD56x8.emulator import Emulator
+
+
+class TestEmulator(unittest.TestCase):
+
+    def setUp(self):
+        self.emu = Emulator('AD5628-3')
+        self.dac = AD56x8.AD56x8('AD5628-3', spi=self.emu)
+
+    def test_power_up(self):
+        self.assertEqual(self.emu.dac, [2048] * 8)
+        self.assertEqual(self.emu.clock_hz, 5000000)
+        # Internal reference off and no external reference
+        self.assertTrue(all(math.isnan(v) for v in self.emu.outputs()))
+        self.dac.internal_ref_mode('ON')
+        self.assertEqual(self.emu.outputs(), [5.0] * 8)
+
+    def test_ldac_modes(self):
+        emu, dac = self.emu, self.dac
+        dac.internal_ref_mode('ON')
+
+        dac.write_to_Input_Reg('DAC_B', 1024)
+        self.assertEqual(emu.input[1], 1024)
+        self.assertEqual(emu.dac[1], 2048)
+        dac.update_DAC_Reg('DAC_B')
+        self.assertEqual(emu.volts(1), 2.5)
+
+        dac.LDAC_mode('SW', 'DAC_C')
+        dac.write_to_Input_Reg('DAC_C', 0)
+        self.assertEqual(emu.volts(2), 0.0)
+
+        dac.write_to_Input_Reg('DAC_D', 4095)
+        emu.pulse_ldac()
+        self.assertEqual(emu.dac[3], 4095)
+
+        dac.write_to_Input_Regs_update_all([0, 7], [1, 2])
+        self.assertEqual(emu.dac[0], 1)
+        self.assertEqual(emu.dac[7], 2)
+
+    def test_power_down_clear_and_reset(self):
+        emu, dac = self.emu, self.dac
+        dac.internal_ref_mode('ON')
+        dac.power_down_mode('1K_GND', ['DAC_A', 'DAC_B'])
+        dac.power_down_mode('TRISTATE', 'DAC_C')
+        self.assertEqual(emu.volts(0), 0.0)
+        self.assertTrue(math.isnan(emu.volts(2)))
+
+        dac.clear_code_mode('0xFFFF')
+        emu.pulse_clear()
+        self.assertEqual(emu.input, [4095] * 8)
+
+        dac.reset()
+        self.assertEqual(emu.snapshot()['power_down'], [0] * 8)
+        self.assertEqual(emu.dac, [2048] * 8)
+        self.assertEqual(emu.iref, 0)
+
+    def test_history(self):
+        emu, dac = self.emu, self.dac
+        emu.clear_history()
+        dac.internal_ref_mode('ON')
+        for value in (0, 4095, 4095):
+            dac.write_to_Input_Reg_update_all('DAC_A', value)
+
+        # Unchanged outputs are not logged again
+        self.assertEqual(len(emu.history['volts']), 8 + 2)
+        steps = emu.output_history(0)
+        self.assertEqual([v for _, v in steps], [5.0, 0.0, 4095 * 10 / 4096])
+        self.assertAlmostEqual(steps[-1][0], 3 * 32 / 5e6)
+        self.assertEqual(list(emu.history['frame'][-2:]), [2, 3])
+
+    def test_bulk_and_partial_writes(self):
+        emu = self.emu
+        emu.write(b'\x03\x1f')
+        self.assertEqual(emu.frames, 0)
+        emu.write_frames(b'\x03\x1f\xff\xf0\x03\x2f\xff\xf0')
+        self.assertEqual(emu.dac[1:3], [4095, 4095])
+        with self.assertRaises(ValueError):
+            emu.write_frames(b'\x00')
+
+
+if __name__ == '__main__':
+    unittest.main()
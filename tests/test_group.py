@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_group.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import unittest
+
+from tests.MockGPIO import MockGPIO
+from tests.MockSPI import MockBulkSPI
+
+from AD56x8 import AD56x8
+from AD56x8.emulator import Emulator
+from AD56x8.group import DACGroup
+
+LDAC_PIN = 17
+
+
+class LDACGPIO(MockGPIO):
+    """MockGPIO which also drives the /LDAC pin of emulated DACs."""
+
+    def __init__(self, emulators):
+        super(LDACGPIO, self).__init__()
+        self.emulators = emulators
+
+    def output(self, pin, bit):
+        super(LDACGPIO, self).output(pin, bit)
+        if pin == LDAC_PIN:
+            for emulator in self.emulators:
+                emulator.set_ldac_pin(bit)
+
+
+class TestDACGroup(unittest.TestCase):
+
+    def test_bulk_preload_and_pulse(self):
+        gpio = MockGPIO()
+        spis = [MockBulkSPI(), MockBulkSPI()]
+        devices = [AD56x8.AD56x8('AD5628-1', spi=spi) for spi in spis]
+        group = DACGroup(devices, gpio, LDAC_PIN)
+        for spi in spis:
+            self.assertEqual((spi.frames(), spi.transfers), ([0x06000000], 1))
+            spi.clear()
+
+        group.update([{'DAC_A': 1, 'DAC_H': 2}, {3: 4}])
+        self.assertEqual(spis[0].frames(), [0x00000100, 0x00700200])
+        self.assertEqual(spis[0].transfers, 2)
+        self.assertEqual(spis[1].frames(), [0x00300400])
+        self.assertEqual(gpio.pin_mode[LDAC_PIN], 0)
+        self.assertEqual(gpio.pin_written[LDAC_PIN], [1, 0, 1])
+
+        group.update({devices[1]: {'DAC_B': 5}})
+        self.assertEqual(spis[1].frames()[-1], 0x00100500)
+        self.assertEqual(gpio.pin_written[LDAC_PIN], [1, 0, 1, 0, 1])
+        self.assertEqual(group.updates, 2)
+
+        with self.assertRaises(ValueError):
+            group.update({2: {'DAC_A': 1}})
+        with self.assertRaises(ValueError):
+            group.preload([{}, {}, {}])
+        with self.assertRaises(ValueError):
+            group.update({'dac0': {'DAC_A': 1}})
+        with self.assertRaises(ValueError):
+            group.preload({AD56x8.AD56x8('AD5628-1', spi=MockBulkSPI()): {}})
+
+    def test_outputs_change_together(self):
+        emulators = [Emulator('AD5628-1') for _ in range(3)]
+        gpio = LDACGPIO(emulators)
+        devices = [AD56x8.AD56x8('AD5628-1', spi=emu) for emu in emulators]
+        group = DACGroup(devices, gpio, LDAC_PIN)
+
+        group.preload([{ch: 100 * (i + 1) for ch in range(8)}
+                       for i in range(3)])
+        self.assertEqual([emu.dac[0] for emu in emulators], [0, 0, 0])
+        group.latch()
+        self.assertEqual([emu.dac for emu in emulators],
+                         [[100] * 8, [200] * 8, [300] * 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_linux_spi.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import ctypes
+import unittest
+
+from AD56x8 import AD56x8
+from AD56x8 import linux_spi
+from AD56x8.linux_spi import SpiDevBackend, SpiIocTransfer
+
+
+class FakeSpiFd(object):
+    """Stands in for fcntl.ioctl on an open spidev node, decoding messages."""
+
+    def __init__(self):
+        self.settings = {}
+        self.messages = []
+
+    def ioctl(self, fd, request, arg):
+        assert fd == 42
+        size = (request >> 16) & 0x3FFF
+        number = request & 0xFF
+        if number == 0:
+            raw = bytes(arg)
+            self.assert_size(size, len(raw))
+            transfers = []
+            for offset in range(0, len(raw), ctypes.sizeof(SpiIocTransfer)):
+                t = SpiIocTransfer.from_buffer_copy(raw, offset)
+                transfers.append((ctypes.string_at(t.tx_buf, t.len), t.cs_change, t.speed_hz))
+            self.messages.append(transfers)
+        else:
+            self.settings[request] = int.from_bytes(bytes(arg), 'little')
+        return 0
+
+    @staticmethod
+    def assert_size(expected, actual):
+        if expected != actual:
+            raise AssertionError('ioctl size {} != {}'.format(expected, actual))
+
+
+class TestSpiDevBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeSpiFd()
+        self.spi = SpiDevBackend(1, 0, fd=42, ioctl=self.fake.ioctl, max_frames=4)
+
+    def test_configuration(self):
+        self.assertEqual(linux_spi.SPI_IOC_MESSAGE(1), 0x40206B00)
+        self.assertEqual(linux_spi.SPI_IOC_WR_MAX_SPEED_HZ, 0x40046B04)
+
+        device = AD56x8.AD56x8('AD5668-3', spi=self.spi, clock_hz=30000000)
+        self.assertEqual(self.fake.settings[linux_spi.SPI_IOC_WR_MAX_SPEED_HZ], 30000000)
+        self.assertEqual(self.fake.settings[linux_spi.SPI_IOC_WR_MODE], 0)
+        self.assertEqual(self.fake.settings[linux_spi.SPI_IOC_WR_LSB_FIRST], 0)
+        self.assertEqual(self.fake.settings[linux_spi.SPI_IOC_WR_BITS_PER_WORD], 8)
+
+        device.reset()
+        self.assertEqual(self.fake.messages, [[(b'\x07\x00\x00\x00', 0, 30000000)]])
+
+        with self.assertRaises(ValueError):
+            AD56x8.AD56x8('AD5668-3', spi=self.spi, clock_hz=60000000)
+
+        # Without clock_hz the backend keeps its own clock
+        spi = SpiDevBackend(1, 0, fd=42, ioctl=self.fake.ioctl,
+                            max_speed_hz=20000000)
+        AD56x8.AD56x8('AD5668-3', spi=spi).reset()
+        self.assertEqual(spi.clock_hz, 20000000)
+        self.assertEqual(self.fake.messages[-1][0][2], 20000000)
+        with self.assertRaises(ValueError):
+            self.spi.set_clock_hz(60000000)
+
+        self.assertEqual(linux_spi.MAX_MESSAGE_FRAMES, 511)
+        SpiDevBackend(1, 0, fd=42, ioctl=self.fake.ioctl, max_frames=511)
+        for max_frames in (0, 512):
+            with self.assertRaises(ValueError):
+                SpiDevBackend(1, 0, fd=42, ioctl=self.fake.ioctl,
+                              max_frames=max_frames)
+
+    def test_multi_frame_messages(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=self.spi)
+
+        with device.batch():
+            for channel in range(6):
+                device.write_to_Input_Reg(channel, channel)
+
+        # Six frames split across messages of at most four transfers
+        self.assertEqual([len(m) for m in self.fake.messages], [4, 2])
+        frames = [data for message in self.fake.messages for data, _, _ in message]
+        self.assertEqual(frames, [bytes([0x00, channel << 4, channel, 0]) for channel in range(6)])
+        # CS released between frames, but not after the last of a message
+        self.assertEqual([cs for _, cs, _ in self.fake.messages[0]], [1, 1, 1, 0])
+        self.assertEqual([cs for _, cs, _ in self.fake.messages[1]], [1, 0])
+
+    def test_write_lengths(self):
+        self.spi.write([1, 2, 3])
+        self.spi.write(bytes(range(20)))
+        self.assertEqual(self.fake.messages[0], [(b'\x01\x02\x03', 0, 5000000)])
+        self.assertEqual(self.fake.messages[1], [(bytes(range(20)), 0, 5000000)])
+
+        with self.assertRaises(ValueError):
+            self.spi.write_frames(b'\x00' * 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_main.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+from AD56x8.__main__ import main
+from AD56x8.calibration import Calibration
+from AD56x8.samplefile import write_sample_file
+
+
+def run(argv, stdin=''):
+    out, err = io.StringIO(), io.StringIO()
+    with mock.patch('sys.stdin', io.StringIO(stdin)), \
+            redirect_stdout(out), redirect_stderr(err):
+        status = main(argv)
+    return status, out.getvalue(), err.getvalue()
+
+
+def outputs(text):
+    line = [line for line in text.splitlines() if line.startswith('outputs')]
+    return [float(volts) for volts in line[0].split()[1:]]
+
+
+class TestMain(unittest.TestCase):
+
+    def test_configure_only(self):
+        status, out, _ = run(['--model', 'AD5628-1', '--dry-run',
+                              '--iref', 'ON'])
+        self.assertEqual(status, 0)
+        self.assertIn('frames 1', out)
+
+    def test_stdin_codes(self):
+        status, out, err = run(['--model', 'AD5628-1', '--dry-run',
+                                '--iref', 'ON', '--rate', '10000',
+                                '--channels', 'DAC_A,DAC_C', '--input', '-'],
+                               stdin='# a, c\n100,200\n4095,0x800\n')
+        self.assertEqual(status, 0)
+        volts = outputs(out)
+        self.assertAlmostEqual(volts[0], 2 * 2.5 * 4095 / 4096, places=3)
+        self.assertAlmostEqual(volts[2], 2.5, places=3)
+        self.assertIn('samples 2', err)
+
+    def test_stdin_volts(self):
+        status, out, _ = run(['--model', 'AD5628-1', '--dry-run',
+                              '--iref', 'ON', '--rate', '10000', '--volts',
+                              '--input', '-'], stdin='1.0\n')
+        self.assertEqual(status, 0)
+        self.assertAlmostEqual(outputs(out)[0], 1.0, places=3)
+
+    def test_sample_file_count_and_loop(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'wave.smp')
+            write_sample_file(path, [0, 1000, 2000], rate=1000)
+            status, out, err = run(['--model', 'AD5628-1', '--dry-run',
+                                    '--iref', 'ON', '--rate', '20000',
+                                    '--input', path, '--loop',
+                                    '--count', '7'])
+        self.assertEqual(status, 0)
+        self.assertIn('samples 7', err)
+        # 0, 1000, 2000, 0, 1000, 2000, 0
+        self.assertAlmostEqual(outputs(out)[0], 0.0)
+
+    def test_waveform_count(self):
+        status, _, err = run(['--model', 'AD5668-3', '--dry-run',
+                              '--rate', '20000', '--waveform', 'sine',
+                              '--frequency', '1000', '--count', '50',
+                              '--stats-interval', '0'])
+        self.assertEqual(status, 0)
+        self.assertIn('samples 50', err)
+
+    def test_power_down_and_ldac(self):
+        status, out, _ = run(['--model', 'AD5628-1', '--dry-run',
+                              '--iref', 'ON', '--ldac', 'HW',
+                              '--channels', '1', '--power-down', 'TRISTATE'])
+        self.assertEqual(status, 0)
+        self.assertIn('frames 3', out)
+        self.assertIn('nan', out.split()[4])
+
+    def test_header_and_bad_rows(self):
+        argv = ['--model', 'AD5628-1', '--dry-run', '--rate', '10000',
+                '--channels', '0,1', '--input', '-']
+        status, out, _ = run(argv, stdin='a,b\n1,2\n')
+        self.assertEqual(status, 0)
+        self.assertIn('frames 2', out)
+
+        for rows, line in (('a,b\n1,2\nbad,8\n', ':3:'),
+                           ('1,2\n4096,0\n', ':2:'),
+                           ('1,2\n5\n', ':2:')):
+            status, _, err = run(argv, stdin=rows)
+            self.assertEqual(status, 1)
+            self.assertIn(line, err)
+            self.assertNotIn('Traceback', err)
+
+    def test_errors(self):
+        status, _, err = run(['--model', 'AD5628-1', '--dry-run',
+                              '--rate', '1000', '--input', '-', '--loop'])
+        self.assertEqual(status, 1)
+        self.assertIn('stdin', err)
+
+        # OSErrors are reported, not raised
+        status, _, err = run(['--model', 'AD5628-1', '--dry-run',
+                              '--rate', '1000', '--input', '/nonexistent.npy'])
+        self.assertEqual((status, 'Traceback' in err), (1, False))
+        status, _, err = run(['--model', 'AD5628-1', '--spi', '99.99'])
+        self.assertEqual((status, 'Traceback' in err), (1, False))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cal.json')
+            Calibration('AD5668-3').save(path)
+            status, _, err = run(['--model', 'AD5628-1', '--dry-run',
+                                  '--rate', '1000', '--volts',
+                                  '--calibration', path, '--input', '-'],
+                                 stdin='1.0\n')
+        self.assertEqual(status, 1)
+        self.assertIn('Calibration is for AD5668-3', err)
+
+        with redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main(['--model', 'AD5628-1', '--dry-run', '--input', '-'])
+            with self.assertRaises(SystemExit):
+                main(['--model', 'AD5628-1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_metrics.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.MockSPI import MockSPI, MockBulkSPI
+
+from AD56x8 import AD56x8
+from AD56x8.metrics import LATENCY_BUCKETS, _latency_bucket, write_prometheus
+from AD56x8.trace import FrameTracer
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_frames_and_channels(self):
+        spi = MockBulkSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        metrics = device.enable_metrics()
+
+        device.write_to_Input_Reg('DAC_C', 0x123)
+        device.write_to_Input_Reg_update_all('ALL_DAC', 0x123)
+        device.write_to_Input_Regs_update_all([0, 1, 2], [1, 2, 3])
+        device.update_DAC_Reg('DAC_A')
+        device.internal_ref_mode('ON')
+
+        snap = metrics.snapshot()
+        self.assertEqual(snap['device'], 'AD5628-1')
+        self.assertEqual(snap['frames']['CMD_WRITE_INPUT_REG_N'], 3)
+        self.assertEqual(snap['frames']['CMD_WRITE_INPUT_RE_N_UPDATE_ALL'], 2)
+        self.assertEqual(snap['frames']['CMD_SETUP_INT_REF_REG'], 1)
+        self.assertEqual(snap['bytes']['CMD_UPDATE_DAC_REG_N'], 4)
+        self.assertEqual(snap['frames']['CMD_RESET'], 0)
+        self.assertEqual(snap['channel_writes'],
+                         {0: 1, 1: 1, 2: 2, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0,
+                          'ALL_DAC': 1})
+        self.assertEqual(snap['writes'], 5)
+        self.assertEqual(snap['write_latency'][-1], (float('inf'), 5))
+
+    def test_validation_errors(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+        with self.assertRaises(ValueError):
+            device.LDAC_mode('SW', 'DAC_X')
+        metrics = device.enable_metrics()
+        with self.assertRaises(ValueError):
+            device.LDAC_mode('SW', 'DAC_X')
+        with self.assertRaises(ValueError):
+            device.LDAC_mode('XX', 'DAC_A')
+        with self.assertRaises(ValueError):
+            device.internal_ref_mode('MAYBE')
+        self.assertEqual(metrics.snapshot()['errors'],
+                         {'LDAC Error': 2, 'IREF Error': 1})
+
+    def test_latency_buckets(self):
+        self.assertEqual(_latency_bucket(0.0), 0)
+        self.assertEqual(_latency_bucket(1e-6), 0)
+        self.assertEqual(_latency_bucket(1.5e-6), 1)
+        self.assertEqual(_latency_bucket(4e-6), 2)
+        self.assertEqual(_latency_bucket(LATENCY_BUCKETS[-1]),
+                         len(LATENCY_BUCKETS) - 1)
+        self.assertEqual(_latency_bucket(10.0), len(LATENCY_BUCKETS))
+
+    def test_disable_with_tracing(self):
+        spi = MockSPI()
+        tracer = FrameTracer()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        device.enable_tracing(tracer)
+        device.enable_metrics()
+
+        device.reset()
+        device.disable_tracing()
+        device.reset()
+        self.assertEqual(len(tracer), 1)
+        self.assertEqual(device.metrics.snapshot()['frames']['CMD_RESET'], 2)
+
+        device.disable_metrics()
+        self.assertIs(device._spi, spi)
+        self.assertIsNone(device.metrics)
+
+    def test_mock_backend(self):
+        # A Mock answers every attribute, including wraps_spi
+        spi = mock.Mock()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        device.enable_tracing(FrameTracer())
+        metrics = device.enable_metrics()
+        device.reset()
+        self.assertEqual(metrics.snapshot()['frames']['CMD_RESET'], 1)
+        device.disable_tracing()
+        device.disable_metrics()
+        self.assertIs(device._spi, spi)
+
+    def test_prometheus_file(self):
+        devices = [AD56x8.AD56x8('AD5628-1', spi=MockSPI()) for _ in range(2)]
+        metrics = [device.enable_metrics('dac{}'.format(index))
+                   for index, device in enumerate(devices)]
+        devices[1].reset()
+
+        path = os.path.join(tempfile.mkdtemp(), 'ad56x8.prom')
+        write_prometheus(path, metrics)
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+        self.assertEqual(lines.count('# TYPE ad56x8_frames_total counter'), 1)
+        self.assertIn('ad56x8_frames_total{device="dac1",command="CMD_RESET"} 1',
+                      lines)
+        self.assertIn('ad56x8_frames_total{device="dac0",command="CMD_RESET"} 0',
+                      lines)
+        self.assertIn('ad56x8_write_seconds_bucket{device="dac1",le="+Inf"} 1',
+                      lines)
+        self.assertIn('ad56x8_write_seconds_count{device="dac0"} 0', lines)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['ad56x8.prom'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_playback.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import time
+import unittest
+
+from tests.MockSPI import MockSPI
+
+from AD56x8 import AD56x8
+from AD56x8.playback import Player
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FakeClock(object):
+    """Monotonic clock which only advances when slept on or stepped."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class SlowSPI(MockSPI):
+    """Each frame takes a fixed amount of fake time to write."""
+
+    def __init__(self, clock, cost):
+        super(SlowSPI, self).__init__()
+        self.clock = clock
+        self.cost = cost
+
+    def write(self, data):
+        self.clock.now += self.cost
+        super(SlowSPI, self).write(data)
+
+
+class TestPlayback(unittest.TestCase):
+
+    def test_absolute_deadlines_do_not_drift(self):
+        clock = FakeClock()
+        spi = SlowSPI(clock, 0.0003)
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        player = Player(device, list(range(100)), 1000, clock=clock, sleep=clock.sleep)
+        player.run()
+
+        # Write time is absorbed into the sleeps rather than adding up
+        self.assertAlmostEqual(clock.now, 100.0 + 0.099 + 0.0003)
+        self.assertEqual(spi.frames(), [0x02000000 | (code << 8) for code in range(100)])
+        stats = player.stats.snapshot()
+        self.assertEqual(stats['samples'], 100)
+        self.assertEqual(stats['late'], 0)
+        self.assertAlmostEqual(stats['achieved_rate'], 1000.0)
+
+    def test_late_samples_and_multi_channel(self):
+        clock = FakeClock()
+        # Two frames per sample at 0.3 ms each overrun a 0.5 ms period
+        spi = SlowSPI(clock, 0.0003)
+        device = AD56x8.AD56x8('AD5668-1', spi=spi)
+
+        samples = [(i, 0xFFFF - i) for i in range(20)]
+        player = Player(device, samples, 2000, channels=['DAC_B', 'DAC_H'],
+                        clock=clock, sleep=clock.sleep)
+        player.run()
+
+        frames = spi.frames()
+        self.assertEqual(frames[:2], [0x00100000, 0x027FFFF0])
+        stats = player.stats.snapshot()
+        self.assertEqual(stats['samples'], 20)
+        self.assertGreater(stats['late'], 0)
+        self.assertGreater(stats['jitter_max'], 0.0005)
+
+    def test_loop_and_threaded_stop(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        player = Player(device, [1, 2, 3], 2000, loop=True)
+        player.start()
+        time.sleep(0.05)
+        player.pause()
+        time.sleep(0.01)
+        paused_count = len(spi.written)
+        time.sleep(0.02)
+        self.assertLessEqual(len(spi.written), paused_count + 1)
+        player.resume()
+        time.sleep(0.02)
+        player.stop()
+
+        self.assertFalse(player.playing)
+        self.assertGreater(len(spi.written), paused_count)
+        self.assertEqual(spi.frames()[:6], [0x02000100, 0x02000200, 0x02000300] * 2)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_numpy_samples(self):
+        clock = FakeClock()
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        Player(device, np.array([1, 4095], dtype=np.uint16), 1000,
+               clock=clock, sleep=clock.sleep).run()
+        Player(device, np.array([[2, 3]], dtype=np.uint16), 1000,
+               channels=[0, 1], clock=clock, sleep=clock.sleep).run()
+        self.assertEqual(spi.frames(), [0x02000100, 0x020FFF00,
+                                        0x00000200, 0x02100300])
+
+    def test_background_error(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+        player = Player(device, [1, (1, 2)], 1000, channels=[0])
+        player.start()
+        player.join(5)
+        self.assertIsInstance(player.error, ValueError)
+
+    def test_loop_empty_source(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+        player = Player(device, [], 1000, loop=True)
+        player.start()
+        player.join(5)
+        self.assertFalse(player.playing)
+        self.assertEqual(player.stats.samples, 0)
+
+    def test_bad_arguments(self):
+        device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+        with self.assertRaises(ValueError):
+            Player(device, [1], 0)
+        with self.assertRaises(ValueError):
+            Player(device, iter([1, 2]), 100, loop=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
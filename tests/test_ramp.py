@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_ramp.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import unittest
+
+from AD56x8 import AD56x8
+from AD56x8.backend import SPIBackend
+from AD56x8.emulator import Emulator
+from AD56x8.ramp import RampEngine
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingSPI(SPIBackend):
+
+    def write(self, data):
+        raise OSError('bus error')
+
+
+class TestRampEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = Emulator('AD5628-1')
+        self.dac = AD56x8.AD56x8('AD5628-1', spi=self.emulator)
+        self.clock = FakeClock()
+        self.engine = RampEngine(self.dac, slew=1000, initial=[0] * 8,
+                                 clock=self.clock, background=False)
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return self.engine.tick()
+
+    def test_slew_limited_steps(self):
+        future = self.engine.ramp_to({'DAC_A': 300, 'DAC_B': 100})
+        self.engine.tick()
+        self.assertEqual(self.advance(0.1), 2)
+        self.assertEqual(self.emulator.dac[:2], [100, 100])
+        self.assertFalse(future.done())
+        self.advance(0.1)
+        self.assertEqual(self.emulator.dac[:2], [200, 100])
+        self.advance(0.5)
+        self.assertEqual(self.emulator.dac[:2], [300, 100])
+        self.assertEqual(future.result(0), {0: 300, 1: 100})
+        self.assertFalse(self.engine.busy)
+
+    def test_one_transfer_per_tick(self):
+        frames = self.emulator.frames
+        self.engine.ramp_to({'ALL_DAC': 4095})
+        self.advance(0.01)
+        # Eight channels, one update all transfer
+        self.assertEqual(self.emulator.frames - frames, 8)
+        self.assertEqual(self.engine.writes, 1)
+        self.assertEqual(self.emulator.dac, [10] * 8)
+
+    def test_retarget_supersedes(self):
+        first = self.engine.ramp_to({'DAC_A': 1000, 'DAC_B': 200})
+        self.advance(0.1)
+        second = self.engine.ramp_to({'DAC_A': 0}, slew=2000)
+        self.assertTrue(first.cancelled())
+        self.advance(0.05)
+        # DAC_A turns around, DAC_B carries on to its target
+        self.assertEqual(self.emulator.dac[:2], [0, 150])
+        self.assertEqual(second.result(0), {0: 0})
+        self.advance(0.05)
+        self.assertEqual(self.emulator.dac[1], 200)
+
+    def test_cancel_holds_position(self):
+        future = self.engine.ramp_to({'DAC_C': 1000})
+        self.advance(0.25)
+        self.assertEqual(self.engine.cancel(['DAC_C']), 1)
+        self.assertTrue(future.cancelled())
+        self.advance(1.0)
+        self.assertEqual(self.emulator.dac[2], 250)
+
+        future = self.engine.ramp_to({'DAC_C': 1000})
+        future.cancel()
+        self.advance(0.25)
+        self.assertEqual(self.emulator.dac[2], 250)
+        self.assertFalse(self.engine.busy)
+
+    def test_start_from_shadow(self):
+        dac = AD56x8.AD56x8('AD5628-1', spi=Emulator('AD5628-1'),
+                            shadow=True)
+        engine = RampEngine(dac, slew=1000, clock=self.clock,
+                            background=False)
+        with self.assertRaises(ValueError):
+            engine.ramp_to({'DAC_A': 100})
+        dac.write_to_Input_Reg_update_all('DAC_A', 500)
+        engine.ramp_to({'DAC_A': 400})
+        engine.tick()
+        self.clock.now += 0.05
+        engine.tick()
+        self.assertEqual(engine.positions()[0], 450)
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            self.engine.ramp_to({'DAC_A': 4096})
+        with self.assertRaises(ValueError):
+            self.engine.ramp_to({'DAC_X': 1})
+        with self.assertRaises(ValueError):
+            self.engine.ramp_to({'DAC_A': 1}, slew=0)
+        with self.assertRaises(ValueError):
+            self.dac.ramp_to({'DAC_A': 1})
+
+    def test_background_service(self):
+        ramps = self.dac.enable_ramps(slew=1e6, rate=2000, initial=[0] * 8)
+        try:
+            future = self.dac.ramp_to({'DAC_A': 2000, 'DAC_H': 1000})
+            self.assertEqual(future.result(5), {0: 2000, 7: 1000})
+            self.assertEqual(self.emulator.dac[0], 2000)
+            self.assertEqual(self.emulator.dac[7], 1000)
+            pending = ramps.ramp_to({'DAC_A': 0}, slew=1)
+        finally:
+            self.dac.disable_ramps()
+        self.assertTrue(pending.cancelled())
+        self.assertIsNone(self.dac.ramps)
+
+    def test_write_failure_stops_service(self):
+        dac = AD56x8.AD56x8('AD5628-1', spi=FailingSPI())
+        engine = RampEngine(dac, slew=1e6, initial=[0] * 8)
+        future = engine.ramp_to({'DAC_A': 100})
+        self.assertIsInstance(future.exception(5), OSError)
+        engine._thread.join(5)
+        self.assertFalse(engine._thread.is_alive())
+        self.assertIsInstance(engine.error, OSError)
+        self.assertFalse(engine.busy)
+        with self.assertRaises(RuntimeError):
+            engine.ramp_to({'DAC_A': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_samplefile.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import tempfile
+import unittest
+
+from tests.MockSPI import MockBulkSPI
+
+from AD56x8 import AD56x8
+from AD56x8.emulator import Emulator
+from AD56x8.playback import Player
+from AD56x8.samplefile import SampleCursor, SampleFile, write_sample_file
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestSampleFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'wave.smp')
+        self.samples = [(i, 4095 - i, i * 2) for i in range(100)]
+        write_sample_file(self.path, self.samples, channels=3, rate=1000.0)
+
+    def test_read_and_chunks(self):
+        with SampleFile(self.path) as waveform:
+            self.assertEqual((len(waveform), waveform.channels), (100, 3))
+            self.assertEqual(waveform.rate, 1000.0)
+            self.assertEqual(list(waveform.read(98, 10)),
+                             [98, 3997, 196, 99, 3996, 198])
+            chunks = list(waveform.chunks(10, 35, chunk=10))
+            self.assertEqual([len(c) for c in chunks], [30, 30, 15])
+            self.assertEqual(chunks[0][:3].tolist(), [10, 4085, 20])
+
+    def test_stream_frames(self):
+        spi = MockBulkSPI()
+        dac = AD56x8.AD56x8('AD5628-1', spi=spi)
+        with SampleFile(self.path) as waveform:
+            waveform.stream(dac, channels=['DAC_C', 'DAC_A', 'DAC_H'],
+                            start=1, stop=3, chunk=1)
+        self.assertEqual(spi.transfers, 2)
+        self.assertEqual(spi.frames(), [0x00200100, 0x000FFE00, 0x02700200,
+                                        0x00200200, 0x000FFD00, 0x02700400])
+
+    def test_cursor_seek_and_loop(self):
+        with SampleFile(self.path) as waveform:
+            cursor = SampleCursor(waveform, chunk=7)
+            cursor.set_loop(90, 95, count=2)
+            cursor.seek(88)
+            played = [sample[0] for sample in cursor]
+            self.assertEqual(played, [88, 89] + list(range(90, 95)) * 3 +
+                             list(range(95, 100)))
+
+            cursor.seek(50)
+            cursor.set_loop(50, 52)
+            played = []
+            for sample in cursor:
+                played.append(sample[0])
+                if len(played) == 5:
+                    cursor.seek(0)
+                    cursor.clear_loop()
+                elif len(played) == 7:
+                    break
+            self.assertEqual(played, [50, 51, 50, 51, 50, 0, 1])
+
+    def test_player_on_emulator(self):
+        emu = Emulator('AD5628-1')
+        dac = AD56x8.AD56x8('AD5628-1', spi=emu)
+        with SampleFile(self.path) as waveform:
+            player = Player(dac, SampleCursor(waveform), rate=1e6,
+                            sleep=lambda seconds: None)
+            player.run()
+        self.assertEqual(player.stats.samples, 100)
+        self.assertEqual(emu.dac[:3], [99, 3996, 198])
+
+    def test_player_loop_restarts_cursor(self):
+        dac = AD56x8.AD56x8('AD5628-1', spi=MockBulkSPI())
+        with SampleFile(self.path) as waveform:
+            player = Player(dac, SampleCursor(waveform), rate=1e6, loop=True,
+                            sleep=lambda seconds: None)
+            player.start()
+            while player.stats.samples < 250 and player.playing:
+                player.join(0.01)
+            player.stop()
+        self.assertGreaterEqual(player.stats.samples, 250)
+
+    def test_bad_files(self):
+        path = os.path.join(self.dir, 'bad.bin')
+        with open(path, 'wb') as f:
+            f.write(b'not a sample file')
+        with self.assertRaises(ValueError):
+            SampleFile(path)
+
+        with open(self.path, 'r+b') as f:
+            f.truncate(100)
+        with self.assertRaises(ValueError):
+            SampleFile(self.path)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_npy(self):
+        path = os.path.join(self.dir, 'wave.npy')
+        codes = np.arange(12, dtype='>u2').reshape(6, 2)
+        np.save(path, codes)
+        with SampleFile(path) as waveform:
+            self.assertEqual((len(waveform), waveform.channels), (6, 2))
+            self.assertIsNone(waveform.rate)
+            self.assertEqual(list(waveform.read(4, 2)), [8, 9, 10, 11])
+
+        np.save(path, np.arange(5, dtype=np.uint8))
+        with SampleFile(path) as waveform:
+            self.assertEqual(list(SampleCursor(waveform)), [0, 1, 2, 3, 4])
+
+        # NumPy's default integer dtype
+        np.save(path, np.arange(5))
+        with SampleFile(path) as waveform:
+            self.assertEqual(list(waveform.read(0, 5)), [0, 1, 2, 3, 4])
+
+        np.save(path, np.array([1, -1, 70000], dtype=np.int32))
+        with SampleFile(path) as waveform:
+            self.assertEqual(list(waveform.read(0, 1)), [1])
+            with self.assertRaises(ValueError):
+                waveform.read(0, 2)
+            with self.assertRaises(ValueError):
+                waveform.read(2, 1)
+
+        np.save(path, np.arange(5, dtype=np.float32))
+        with self.assertRaises(ValueError):
+            SampleFile(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
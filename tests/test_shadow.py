@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_shadow.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import unittest
+
+from tests.MockSPI import MockSPI
+
+from AD56x8 import AD56x8
+from AD56x8.emulator import Emulator
+
+
+class FailOnceSPI(MockSPI):
+    """Mock SPI whose next write raises while fail is set."""
+
+    def __init__(self):
+        super(FailOnceSPI, self).__init__()
+        self.fail = True
+
+    def write(self, data):
+        if self.fail:
+            self.fail = False
+            raise OSError('bus error')
+        super(FailOnceSPI, self).write(data)
+
+
+class TestShadowRegisters(unittest.TestCase):
+
+    def setUp(self):
+        self.spi = MockSPI()
+        self.device = AD56x8.AD56x8('AD5668-3', spi=self.spi, shadow=True)
+
+    def test_disabled_by_default(self):
+        spi = MockSPI()
+        device = AD56x8.AD56x8('AD5668-3', spi=spi)
+        self.assertIsNone(device.shadow)
+        device.internal_ref_mode('ON')
+        device.internal_ref_mode('ON')
+        self.assertEqual(len(spi.written), 2)
+
+    def test_config_elision(self):
+        device = self.device
+        device.internal_ref_mode('ON')
+        device.internal_ref_mode('ON')
+        device.clear_code_mode('0x8000')
+        device.clear_code_mode('0x8000')
+        device.LDAC_mode('SW', 'DAC_C')
+        device.LDAC_mode('SW', 'DAC_C')
+        device.power_down_mode('1K_GND', 2)
+        device.power_down_mode('1K_GND', 2)
+        device.power_down_mode('NORMAL', 2)
+        device.internal_ref_mode('OFF')
+
+        self.assertEqual(len(self.spi.written), 6)
+        self.assertEqual(device.shadow.sent, 6)
+        self.assertEqual(device.shadow.elided, 4)
+
+    def test_input_and_dac_registers(self):
+        device = self.device
+        device.write_to_Input_Reg(0, 100)
+        device.write_to_Input_Reg('DAC_A', 100)
+        # /LDAC pin state is unknown, so the DAC register is too
+        device.update_DAC_Reg(0)
+        device.update_DAC_Reg(0)
+        device.write_to_Input_Reg(0, 100)
+        device.update_DAC_Reg(0)
+        self.assertEqual(len(self.spi.written), 2)
+
+        device.write_to_Input_Reg(0, 200)
+        device.update_DAC_Reg(0)
+        self.assertEqual(len(self.spi.written), 4)
+
+        # Other channels are unknown, so update all must be sent
+        device.write_to_Input_Reg_update_all(0, 200)
+        self.assertEqual(len(self.spi.written), 5)
+
+        for channel in range(AD56x8.MAX_CHANNELS):
+            device.write_to_Input_Reg(channel, 7)
+        device.update_DAC_Reg('ALL_DAC')
+        device.write_to_Input_Reg_update_all('ALL_DAC', 7)
+        device.write_to_Input_Regs_update_all([1, 2], [7, 7])
+        self.assertEqual(len(self.spi.written), 5 + 8 + 1)
+        self.assertEqual(device.shadow.elided, 7)
+
+    def test_ldac_bit_updates_dac_register(self):
+        device = self.device
+        device.LDAC_mode('SW', 'DAC_B')
+        device.write_to_Input_Reg(1, 55)
+        device.update_DAC_Reg(1)
+        self.assertEqual(len(self.spi.written), 2)
+
+    def test_ldac_bit_loads_unchanged_input_reg(self):
+        emulator = Emulator('AD5668-3')
+        device = AD56x8.AD56x8('AD5668-3', spi=emulator, shadow=True)
+        device.write_to_Input_Reg(0, 1000)
+        device.LDAC_mode('SW', 0)
+        # Same Input Register value, but the write now loads the DAC
+        device.write_to_Input_Reg(0, 1000)
+        self.assertEqual(emulator.dac[0], 1000)
+        self.assertEqual(device.shadow.dac[0], 1000 << 4)
+        self.assertEqual(device.shadow.elided, 0)
+        device.write_to_Input_Reg(0, 1000)
+        self.assertEqual(device.shadow.elided, 1)
+
+    def test_failed_write_invalidates(self):
+        spi = FailOnceSPI()
+        device = AD56x8.AD56x8('AD5668-3', spi=spi, shadow=True)
+        with self.assertRaises(OSError):
+            device.internal_ref_mode('ON')
+        device.internal_ref_mode('ON')
+        self.assertEqual(spi.frames(), [0x08000001])
+        self.assertEqual(device.shadow.elided, 0)
+
+        spi.fail = True
+        with self.assertRaises(OSError):
+            with device.batch():
+                device.write_to_Input_Reg(0, 5)
+        device.write_to_Input_Reg(0, 5)
+        self.assertEqual(spi.frames()[-1], 0x00000050)
+        self.assertEqual(device.shadow.elided, 0)
+
+    def test_reset_invalidates(self):
+        device = self.device
+        device.internal_ref_mode('ON')
+        device.write_to_Input_Reg(3, 1)
+        device.reset()
+        device.internal_ref_mode('ON')
+        device.write_to_Input_Reg(3, 1)
+        device.reset()
+        self.assertEqual(len(self.spi.written), 6)
+        self.assertEqual(device.shadow.elided, 0)
+        self.assertIsNone(device.shadow.snapshot()['iref'])
+
+    def test_batch_and_write_frames(self):
+        device = self.device
+        with device.batch():
+            device.internal_ref_mode('ON')
+            device.internal_ref_mode('ON')
+            device.write_frames([0x08000001, 0x07000000, 0x08000001])
+        self.assertEqual(self.spi.frames(), [0x08000001, 0x07000000, 0x08000001])
+        self.assertEqual(device.shadow.elided, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
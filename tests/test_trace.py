@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_trace.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from tests.MockSPI import MockSPI, MockBulkSPI
+
+from AD56x8 import AD56x8
+from AD56x8.trace import FrameTracer, decode_frame
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+class TestFrameTracer(unittest.TestCase):
+
+    def test_decode_frame(self):
+        self.assertEqual(decode_frame(0x02312340),
+                         {'command': 2, 'name': 'CMD_WRITE_INPUT_RE_N_UPDATE_ALL',
+                          'address': 3, 'data': 0x12340})
+        self.assertEqual(decode_frame(0x07000000)['name'], 'CMD_RESET')
+        self.assertEqual(decode_frame(0x0F000000)['name'], 'CMD_0xF')
+
+    def test_records_and_disable(self):
+        spi = MockSPI()
+        tracer = FrameTracer(clock=FakeClock())
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+
+        device.enable_tracing(tracer, name='dac0')
+        device.reset()
+        device.write_to_Input_Reg(3, 0x123)
+        device.disable_tracing()
+        device.internal_ref_mode('ON')
+
+        self.assertIs(device._spi, spi)
+        self.assertEqual(len(spi.written), 3)
+        records = tracer.records()
+        self.assertEqual([r[2] for r in records], [0x07000000, 0x00312300])
+        self.assertEqual(records[0][1], 'dac0')
+        self.assertAlmostEqual(records[0][3], 0.001)
+
+    def test_ring_buffer_and_bulk(self):
+        spi = MockBulkSPI()
+        tracer = FrameTracer(capacity=4, clock=FakeClock())
+        device = AD56x8.AD56x8('AD5628-1', spi=spi)
+        device.enable_tracing(tracer)
+
+        device.write_to_Input_Regs_update_all(range(6), list(range(6)))
+
+        self.assertEqual(spi.transfers, 1)
+        self.assertEqual(len(tracer), 4)
+        frames = [r[2] for r in tracer.records()]
+        self.assertEqual(frames, [0x00200200, 0x00300300, 0x00400400, 0x02500500])
+        # Frames of one transfer split its duration
+        self.assertAlmostEqual(tracer.records()[0][3], 0.001 / 6)
+
+    def test_chrome_trace_export(self):
+        tracer = FrameTracer(clock=FakeClock())
+        devices = [AD56x8.AD56x8('AD5628-1', spi=MockSPI()) for _ in range(2)]
+        for index, device in enumerate(devices):
+            device.enable_tracing(tracer, name='dac{}'.format(index))
+            device.LDAC_mode('SW', 'ALL_DAC')
+
+        path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+        tracer.write_chrome_trace(path)
+        with open(path) as f:
+            trace = json.load(f)
+
+        spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        names = [e for e in trace['traceEvents'] if e['ph'] == 'M']
+        self.assertEqual([e['args']['name'] for e in names], ['dac0', 'dac1'])
+        self.assertEqual([e['tid'] for e in spans], [0, 1])
+        self.assertEqual(spans[0]['name'], 'CMD_LOAD_LDAC_REG')
+        self.assertEqual(spans[0]['args']['frame'], '0x060000FF')
+        self.assertAlmostEqual(spans[0]['dur'], 1000.0)
+
+    def test_chrome_trace_same_name(self):
+        tracer = FrameTracer(clock=FakeClock())
+        for _ in range(2):
+            device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+            # Both default to the model name
+            device.enable_tracing(tracer)
+            device.reset()
+
+        events = tracer.chrome_trace()['traceEvents']
+        self.assertEqual([e['tid'] for e in events if e['ph'] == 'X'], [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_vectorized.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import unittest
+
+from tests.MockSPI import MockSPI
+
+from AD56x8 import AD56x8
+
+try:
+    import numpy as np
+    from AD56x8 import vectorized
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'NumPy not installed')
+class TestVectorized(unittest.TestCase):
+
+    def test_codes_match_driver_frames(self):
+        for dac_model in AD56x8.AD56x8_MODEL_PARAMS.keys():
+            spi = MockSPI()
+            device = AD56x8.AD56x8(dac_model, spi=spi)
+            codes = np.arange(0, 1 << device.DATA_WIDTH, 97).reshape(-1, 1)
+            codes = np.hstack([codes, codes[::-1]])
+
+            frames = vectorized.codes_to_frames(dac_model, codes, channels=['DAC_C', 5])
+
+            for a, b in codes:
+                device.write_to_Input_Reg('DAC_C', int(a))
+                device.write_to_Input_Reg_update_all(5, int(b))
+            self.assertEqual(frames.dtype, np.dtype('>u4'))
+            self.assertTrue(frames.flags['C_CONTIGUOUS'])
+            self.assertEqual(frames.tobytes(), b''.join(spi.written))
+
+    def test_single_channel_and_clamping(self):
+        frames = vectorized.codes_to_frames('AD5628-1', [-5, 0, 4095, 9000], channels='DAC_B')
+        expected = [0x03100000, 0x03100000, 0x031FFF00, 0x031FFF00]
+        self.assertEqual(frames.tolist(), expected)
+
+    def test_volts(self):
+        # AD5668-1: 2.5V internal VREF gained by 2 gives 5V full scale
+        codes = vectorized.volts_to_codes('AD5668-1', [-1.0, 0.0, 2.5, 10.0])
+        self.assertEqual(codes.tolist(), [0, 0, 0x8000, 0xFFFF])
+
+        frames = vectorized.volts_to_frames('AD5668-1', np.zeros((3, 8)) + 1.25, gain=1)
+        self.assertEqual(len(frames), 24)
+        self.assertEqual(frames[7], 0x02780000)
+        self.assertEqual(frames[0], 0x00080000)
+
+    def test_write_buffer(self):
+        frames = vectorized.codes_to_frames('AD5628-1', [[1, 2], [3, 4]])
+        for buffer in (frames, frames.astype(np.uint32)):
+            spi = MockSPI()
+            device = AD56x8.AD56x8('AD5628-1', spi=spi)
+            self.assertEqual(device.write_buffer(buffer), 4)
+            self.assertEqual(spi.frames(), frames.tolist())
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            vectorized.codes_to_frames('AD5628-1', np.zeros((2, 3)), channels=[0, 1])
+        with self.assertRaises(ValueError):
+            vectorized.codes_to_frames('AD5628-1', np.zeros(4), channels=9)
+        with self.assertRaises(ValueError):
+            vectorized.codes_to_frames('AD5600', np.zeros(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_waveforms.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import unittest
+
+from tests.MockSPI import MockSPI
+
+from AD56x8 import AD56x8
+
+try:
+    import numpy as np
+    from AD56x8 import waveforms
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class TestWaveforms(unittest.TestCase):
+
+    def test_shapes(self):
+        sine = waveforms.generate('sine', 1000, 2.5, 2.5, 4000, 'AD5628-1')
+        self.assertEqual(sine.tolist(), [2048, 4095, 2048, 0])
+        ramp = waveforms.generate('ramp', 1, 2.5, 2.5, 4, 'AD5628-1')
+        self.assertEqual(ramp.tolist(), [0, 1024, 2048, 3072])
+        triangle = waveforms.generate('triangle', 1, 2.5, 2.5, 4, 'AD5628-1')
+        self.assertEqual(triangle.tolist(), [0, 2048, 4095, 2048])
+        step = waveforms.generate('step', 1, 1.0, 2.5, 4, 'AD5668-1')
+        self.assertEqual(step.tolist(), [19661, 19661, 45875, 45875])
+
+        with self.assertRaises(ValueError):
+            waveforms.generate('noise', 1, 1, 1, 4, 'AD5628-1')
+        with self.assertRaises(ValueError):
+            waveforms.generate('sine', 1000, 1, 1, 1000, 'AD5628-1')
+
+    def test_cache(self):
+        cache = waveforms.WaveformCache(maxsize=2)
+        device = AD56x8.AD56x8('AD5628-1', spi=MockSPI())
+
+        first = cache.get('sine', 100, 1, 1.25, 10000, 'AD5628-1')
+        self.assertIs(cache.get('sine', 100.0, 1, 1.25, 10000, device), first)
+        self.assertFalse(first.flags.writeable)
+        with self.assertRaises(ValueError):
+            first[0] = 0
+
+        cache.get('ramp', 100, 1, 1.25, 10000, 'AD5628-1')
+        cache.get('sine', 100, 1, 1.25, 10000, 'AD5628-1')
+        cache.get('step', 100, 1, 1.25, 10000, 'AD5628-1')
+        # ramp was the least recently used
+        self.assertIs(cache.get('sine', 100, 1, 1.25, 10000, 'AD5628-1'),
+                      first)
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 3,
+                                         'evictions': 1, 'size': 2,
+                                         'bytes': 800})
+
+        cache.get('ramp', 100, 1, 1.25, 10000, 'AD5628-1')
+        self.assertEqual(cache.stats()['misses'], 4)
+        cache.clear()
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_default_cache(self):
+        table = waveforms.waveform('triangle', 10, 1, 1, 1000, 'AD5648-3')
+        self.assertIs(waveforms.waveform('triangle', 10, 1, 1, 1000,
+                                         'AD5648-3'), table)
+        self.assertEqual(len(table), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
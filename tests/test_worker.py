@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AD65x8 Python Library - test_worker.py
+Copyright (c) 2019 David Goncalves
+MIT Licence
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import functools
+import os
+import tempfile
+import time
+import unittest
+
+from tests.MockSPI import MockSPI
+
+from AD56x8 import AD56x8
+from AD56x8.worker import OutputWorker
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FileSPI(MockSPI):
+    """Mock SPI appending every write to a file, readable by the parent."""
+
+    def __init__(self, path):
+        super(FileSPI, self).__init__()
+        self._path = path
+
+    def write(self, data):
+        with open(self._path, 'ab') as f:
+            f.write(bytes(data))
+
+
+def make_dac(path):
+    return AD56x8.AD56x8('AD5628-1', spi=FileSPI(path))
+
+
+def read_frames(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [int.from_bytes(data[i:i + 4], 'big')
+            for i in range(0, len(data), 4)]
+
+
+class TestOutputWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'frames.bin')
+        self.factory = functools.partial(make_dac, self.path)
+
+    def test_drain_and_safe_state(self):
+        worker = OutputWorker(self.factory, 'AD5628-1', rate=5000,
+                              channels=['DAC_B', 'DAC_A'], capacity=16,
+                              safe_state='1K_GND')
+        samples = [(i, 100 + i) for i in range(40)]
+        self.assertEqual(worker.write(samples), 40)
+        worker.stop()
+
+        frames = read_frames(self.path)
+        self.assertEqual(len(frames), 81)
+        self.assertEqual(frames[:2], [0x00100000, 0x02006400])
+        self.assertEqual(frames[-3:-1], [0x00102700, 0x02008B00])
+        self.assertEqual(frames[-1], 0x040001FF)
+        stats = worker.stats()
+        self.assertEqual(stats['samples'], 40)
+        self.assertEqual(stats['buffered'], 0)
+        self.assertEqual(stats['state'], 'stopped')
+
+    def test_underrun_and_immediate_stop(self):
+        with OutputWorker(self.factory, 'AD5628-1', rate=1000,
+                          safe_state=0x800) as worker:
+            worker.write(range(3))
+            time.sleep(0.2)
+            self.assertGreaterEqual(worker.stats()['underruns'], 1)
+
+            self.assertEqual(worker.write(range(100), timeout=0.5), 100)
+            worker.stop(drain=False)
+
+        frames = read_frames(self.path)
+        self.assertLess(len(frames), 104)
+        self.assertEqual(frames[0], 0x03000000)
+        self.assertEqual(frames[-1], 0x02F80000)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_numpy_samples(self):
+        with OutputWorker(self.factory, 'AD5628-1', rate=5000) as worker:
+            worker.write(np.array([1, 4095], dtype=np.uint16))
+        with OutputWorker(self.factory, 'AD5628-1', rate=5000,
+                          channels=[0, 1]) as worker:
+            worker.write(np.array([[2, 3]], dtype=np.uint16))
+
+        frames = read_frames(self.path)
+        self.assertEqual(frames, [0x03000100, 0x030FFF00,
+                                  0x00000200, 0x02100300])
+
+    def test_terminate_applies_safe_state(self):
+        worker = OutputWorker(self.factory, 'AD5628-1', rate=50,
+                              safe_state='1K_GND')
+        self.assertEqual(worker.write(range(100)), 100)
+        time.sleep(0.1)
+        # Draining would take two seconds
+        worker.stop(timeout=0.2)
+
+        frames = read_frames(self.path)
+        self.assertLess(len(frames), 50)
+        self.assertEqual(frames[-1], 0x040001FF)
+        self.assertEqual(worker.stats()['state'], 'stopped')
+
+    def test_bad_sample(self):
+        with OutputWorker(self.factory, 'AD5628-1', rate=1000,
+                          channels=[0, 1]) as worker:
+            with self.assertRaises(ValueError):
+                worker.write([(1, 2, 3)])
+        self.assertFalse(worker.alive)
+
+
+if __name__ == '__main__':
+    unittest.main()